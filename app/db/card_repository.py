@@ -1,16 +1,51 @@
 import json
+import re
+from typing import List, Optional
+from sqlalchemy import or_, text
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 from app.db.models import CreditCardModel
-from app.schemas.credit_card import CreditCard
+from app.services.cache_bus import KeyedCache, publish
+from app.services.resource_versions import bump
+from app.services.reward_engine import is_generic, match_rule
+from app.schemas.credit_card import CreditCard, StoredCreditCard, NormalizedRewardRule, Milestone, Eligibility
+from app.utils.reward_rules import NORMALIZATION_VERSION, normalize_rule, parse_fee, parse_fee_waiver_spend
+
+# Inputs up to this length probe the merchant GIN index with all their substrings
+_MAX_PROBE_LENGTH = 64
+
+# Words that do not identify a card ("HDFC Bank" == "HDFC", "... Credit Card")
+_CARD_KEY_STOPWORDS = {"bank", "ltd", "limited", "the", "credit", "card", "cards"}
+
+
+def card_key(issuer: str, card_name: str) -> str:
+    """
+    Identity of a card within a user's portfolio: normalized issuer and card
+    name, e.g. ("HDFC Bank", "HDFC Regalia Gold Credit Card") and
+    ("hdfc", "Regalia Gold") both give "hdfc|regalia gold".
+    """
+    issuer_tokens = [t for t in re.findall(r"[a-z0-9]+", (issuer or "").lower()) if t not in _CARD_KEY_STOPWORDS]
+    name_tokens = [t for t in re.findall(r"[a-z0-9]+", (card_name or "").lower()) if t not in _CARD_KEY_STOPWORDS]
+    # The issuer is often repeated in the card name
+    name_tokens = [t for t in name_tokens if t not in issuer_tokens] or name_tokens
+    return f"{' '.join(issuer_tokens)}|{' '.join(name_tokens)}"
+
 
 def add_card(db: Session, card: CreditCard, user_id: str):
-    db_card = CreditCardModel(
+    """
+    Stores a card for the user, or refreshes its terms if the user already
+    has it (same card_key): credit_cards is unique on (user_id, card_key).
+    """
+    values = dict(
         user_id=user_id,
+        card_key=card_key(card.issuer, card.card_name),
         card_name=card.card_name,
         issuer=card.issuer,
         card_type=card.card_type,
         annual_fee=card.annual_fee,
+        annual_fee_inr=parse_fee(card.annual_fee),
         fee_waiver_condition=card.fee_waiver_condition,
+        fee_waiver_spend_inr=parse_fee_waiver_spend(card.fee_waiver_condition),
         welcome_bonus=card.welcome_bonus,
         
         # --- New Simple Field ---
@@ -24,8 +59,8 @@ def add_card(db: Session, card: CreditCard, user_id: str):
         # Note: If using Pydantic v2, use .model_dump(). 
         # If using Pydantic v1, use .dict().
         
-        # Convert List[RewardRule] -> List[dict]
-        reward_rules=[r.model_dump() for r in card.reward_rules],
+        # Convert List[RewardRule] -> List[dict], with the numbers parsed once here
+        reward_rules=[normalize_rule(r.model_dump()) for r in card.reward_rules],
         
         # Convert List[Milestone] -> List[dict]
         milestone_benefits=[m.model_dump() for m in card.milestone_benefits],
@@ -35,15 +70,235 @@ def add_card(db: Session, card: CreditCard, user_id: str):
         
         # Simple Lists (SQLAlchemy JSON column handles List[str] automatically)
         excluded_categories=card.excluded_categories,
-        key_benefits=card.key_benefits
+        key_benefits=card.key_benefits,
+        normalized_version=NORMALIZATION_VERSION
     )
-    
-    db.add(db_card)
+
+    stmt = insert(CreditCardModel).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "card_key"],
+        set_={k: stmt.excluded[k] for k in values if k not in ("user_id", "card_key")}
+    )
+    db_card = db.scalars(
+        stmt.returning(CreditCardModel),
+        execution_options={"populate_existing": True}
+    ).one()
+
+    # Other workers drop their cached copy of this user's cards on commit,
+    # and the cards ETag changes with it
+    publish(f"cards:{user_id}", db)
+    bump(db, f"cards:{user_id}")
     db.commit()
-    db.refresh(db_card)
     return db_card
 
 
 def get_user_cards(db: Session, user_id: str):
     """Get all credit cards for a specific user"""
-    return db.query(CreditCardModel).filter(CreditCardModel.user_id == user_id).all()
\ No newline at end of file
+    return db.query(CreditCardModel).filter(CreditCardModel.user_id == user_id).all()
+
+
+def get_user_card_rows(db: Session, user_id: str) -> List[dict]:
+    """
+    The user's cards as plain dicts with the CardResponse fields, read
+    column by column (no ORM objects) for direct serialization.
+    """
+    rows = db.execute(text("""
+        SELECT id, card_name, issuer, card_type, annual_fee, fee_waiver_condition, welcome_bonus,
+               liability_policy, reward_program_name,
+               COALESCE(reward_rules, '[]') AS reward_rules,
+               COALESCE(milestone_benefits, '[]') AS milestone_benefits,
+               eligibility_criteria,
+               COALESCE(excluded_categories, '[]') AS excluded_categories,
+               COALESCE(key_benefits, '[]') AS key_benefits
+        FROM credit_cards
+        WHERE user_id = :user_id
+        ORDER BY id
+    """), {"user_id": user_id})
+    return [dict(row) for row in rows.mappings()]
+
+
+def get_card_by_key(db: Session, user_id: str, key: str) -> Optional[CreditCardModel]:
+    """The user's card with the given card_key, if stored"""
+    return (
+        db.query(CreditCardModel)
+        .filter(CreditCardModel.user_id == user_id, CreditCardModel.card_key == key)
+        .one_or_none()
+    )
+
+
+# user_id -> List[StoredCreditCard], invalidated through the cache bus
+_user_cards_cache = KeyedCache("cards:")
+
+
+def get_user_credit_cards(db: Session, user_id: str) -> List[StoredCreditCard]:
+    """
+    The user's cards as StoredCreditCard objects, cached per worker until a
+    write to the user's cards is published. Cards that fail to parse are
+    skipped. Callers must not mutate the returned cards.
+    """
+    cached = _user_cards_cache.get(user_id)
+    if cached is not None:
+        return list(cached)
+
+    # Taken before the read: a write published while we read is not cached over
+    generation = _user_cards_cache.generation(user_id)
+    cards = []
+    for row in get_user_cards(db, user_id):
+        try:
+            cards.append(to_credit_card(row))
+        except Exception as e:
+            print(f"Failed to parse card '{row.card_name}':", e)
+    _user_cards_cache.set(user_id, cards, generation=generation)
+    return list(cards)
+
+
+def get_catalog_cards(db: Session) -> List[StoredCreditCard]:
+    """
+    Every distinct card ever stored (one per card_key, across all users),
+    using its most recently stored terms. Cards that fail to parse are
+    skipped.
+    """
+    rows = (
+        db.query(CreditCardModel)
+        .filter(CreditCardModel.card_key.isnot(None))
+        .distinct(CreditCardModel.card_key)
+        .order_by(CreditCardModel.card_key, CreditCardModel.id.desc())
+        .all()
+    )
+    cards = []
+    for row in rows:
+        try:
+            cards.append(to_credit_card(row))
+        except Exception as e:
+            print(f"Failed to parse card '{row.card_name}':", e)
+    return cards
+
+
+def get_user_card_keys(db: Session, user_id: str) -> set:
+    """card_key of every card the user has stored"""
+    rows = db.execute(text("SELECT card_key FROM credit_cards WHERE user_id = :user_id"), {"user_id": user_id})
+    return {key for (key,) in rows if key}
+
+
+def normalize_card_row(row: CreditCardModel):
+    """(Re)computes the normalized numeric fields of a stored card in place"""
+    row.reward_rules = [normalize_rule(r) for r in row.reward_rules or []]
+    row.annual_fee_inr = parse_fee(row.annual_fee)
+    row.fee_waiver_spend_inr = parse_fee_waiver_spend(row.fee_waiver_condition)
+    row.normalized_version = NORMALIZATION_VERSION
+
+
+def to_credit_card(row: CreditCardModel) -> StoredCreditCard:
+    """Rebuild the CreditCard schema object from a stored row"""
+    # 1. Deserialize the nested JSON fields first
+    reward_rules_data = row.reward_rules if row.reward_rules else []
+    annual_fee_inr = row.annual_fee_inr
+    fee_waiver_spend_inr = row.fee_waiver_spend_inr
+    if row.normalized_version != NORMALIZATION_VERSION:
+        # Not backfilled yet: normalize in memory, the row is left untouched
+        reward_rules_data = [normalize_rule(r) for r in reward_rules_data]
+        annual_fee_inr = parse_fee(row.annual_fee)
+        fee_waiver_spend_inr = parse_fee_waiver_spend(row.fee_waiver_condition)
+    excluded_data = row.excluded_categories if row.excluded_categories else []
+    benefits_data = row.key_benefits if row.key_benefits else []
+    milestones_data = row.milestone_benefits if row.milestone_benefits else []
+    eligibility_data = row.eligibility_criteria if row.eligibility_criteria else None
+
+    # 2. Reconstruct the Pydantic Object
+    return StoredCreditCard(
+        card_name=row.card_name,
+        issuer=row.issuer,
+        card_type=row.card_type,
+        annual_fee=row.annual_fee,
+        fee_waiver_condition=row.fee_waiver_condition,
+        welcome_bonus=row.welcome_bonus,
+        reward_program_name=row.reward_program_name,
+        reward_rules=[NormalizedRewardRule(**r) for r in reward_rules_data],
+        milestone_benefits=[Milestone(**m) for m in milestones_data],
+        eligibility_criteria=Eligibility(**eligibility_data) if eligibility_data else None,
+        excluded_categories=excluded_data,
+        key_benefits=benefits_data,
+        liability_policy=row.liability_policy if row.liability_policy else None,
+        annual_fee_inr=annual_fee_inr or 0.0,
+        fee_waiver_spend_inr=fee_waiver_spend_inr
+    )
+
+
+def get_reward_rule_merchants(db: Session):
+    """Get every merchant named in stored reward_rules (across all users)"""
+    # Unnested in SQL: only the distinct names are transferred, not every card's rules
+    rows = db.execute(text("""
+        SELECT DISTINCT btrim(m #>> '{}')
+        FROM credit_cards,
+             jsonb_array_elements(CASE WHEN jsonb_typeof(reward_rules::jsonb) = 'array'
+                                       THEN reward_rules::jsonb ELSE '[]' END) r,
+             jsonb_array_elements(CASE WHEN jsonb_typeof(r->'merchants') = 'array'
+                                       THEN r->'merchants' ELSE '[]' END) m
+        WHERE jsonb_typeof(m) = 'string' AND lower(btrim(m #>> '{}')) <> 'all'
+    """))
+    return {merchant for (merchant,) in rows}
+
+
+def find_cards_for_merchant(db: Session, merchant: str, category: Optional[str] = None,
+                            user_id: Optional[str] = None, include_generic: bool = False) -> List[StoredCreditCard]:
+    """
+    Stored cards with a reward rule for the merchant that do not exclude the
+    merchant or category: the user's cards, or every stored card when
+    user_id is None.
+
+    Matching follows reward_engine.match_rule (a rule merchant inside the
+    input or the input inside a rule merchant, case-insensitive); generic
+    ("All") rules only count with include_generic. Exclusions and a superset
+    of the merchant matches are filtered in SQL (generated columns with GIN
+    indexes, see migrate_jsonb_card_rules.py), so only candidate rows are
+    loaded; the candidates are confirmed with match_rule.
+
+    A lookup helper for callers without the cards in memory: the chat's
+    reward path scores the user's cached cards (get_user_credit_cards) and
+    card suggestions use card_catalog's in-memory index, so neither calls it.
+    """
+    merchant_input = (merchant or "").lower().strip()
+    query = db.query(CreditCardModel)
+    if user_id is not None:
+        query = query.filter(CreditCardModel.user_id == user_id)
+
+    excluded = [term for term in {merchant_input, (category or "").lower()} if term]
+    if excluded:
+        query = query.filter(text(
+            "NOT (credit_cards.excluded_terms && CAST(:excluded AS text[]))"
+        ).bindparams(excluded=excluded))
+
+    if merchant_input:
+        # A rule merchant inside the input is one of the input's substrings
+        if len(merchant_input) <= _MAX_PROBE_LENGTH:
+            probes = {merchant_input[i:j] for i in range(len(merchant_input))
+                      for j in range(i + 1, len(merchant_input) + 1)}
+            if include_generic:
+                probes.add("all")
+            # (SELECT ...): estimated per probe, dozens of short substrings
+            # add up to a sequential scan; the index answers in well under 1 ms
+            contained = text(
+                "credit_cards.reward_merchants && (SELECT CAST(:probes AS text[]))"
+            ).bindparams(probes=sorted(probes))
+        else:
+            contained = text(
+                "EXISTS (SELECT 1 FROM unnest(credit_cards.reward_merchants) m "
+                "WHERE strpos(:merchant_input, m) > 0 OR (:include_generic AND m = 'all'))"
+            ).bindparams(merchant_input=merchant_input, include_generic=include_generic)
+        # The input inside a rule merchant: one of the rule merchants' substrings
+        containing = text(
+            "credit_cards.reward_merchant_substrings @> ARRAY[CAST(:merchant_input AS text)]"
+        ).bindparams(merchant_input=merchant_input)
+        query = query.filter(or_(contained, containing))
+
+    cards = []
+    for row in query.all():
+        try:
+            card = to_credit_card(row)
+        except Exception as e:
+            print(f"Failed to parse card '{row.card_name}':", e)
+            continue
+        rule = match_rule(card, merchant_input)
+        if rule and (include_generic or not is_generic(rule)):
+            cards.append(card)
+    return cards
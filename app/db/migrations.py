@@ -0,0 +1,184 @@
+"""
+Versioned schema migrations (run with `python run_all_migrations.py`).
+
+Each Migration has a version; schema_migrations records the ones applied,
+when, and how long they took, so a run only executes what is pending.
+Only one runner migrates at a time (a Postgres advisory lock), so two
+deploys starting together do not race.
+
+Steps must be idempotent (IF NOT EXISTS, guarded backfills): a migration
+that fails half way is not recorded and runs again from the start.
+
+Helpers for changing live tables without blocking writes:
+- create_index_concurrently: CREATE INDEX CONCURRENTLY outside a
+  transaction; a half-built (INVALID) index left by a failed run is dropped
+  and rebuilt
+- backfill: UPDATE in batches of BACKFILL_BATCH_SIZE rows, one short
+  transaction each, sleeping BACKFILL_PAUSE_MS between batches
+- timed: prints how long a step took
+"""
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from sqlalchemy import text
+
+from app.db.database import engine
+
+BACKFILL_BATCH_SIZE = int(os.getenv("MIGRATION_BACKFILL_BATCH_SIZE", "10000"))
+BACKFILL_PAUSE_MS = float(os.getenv("MIGRATION_BACKFILL_PAUSE_MS", "0"))
+
+# pg_advisory_lock key held while migrations run
+_LOCK_ID = 0x6D696772  # "migr"
+
+
+@dataclass
+class Migration:
+    version: str
+    name: str
+    run: Callable[[], None]
+
+
+@contextmanager
+def timed(step: str):
+    start = time.perf_counter()
+    yield
+    print(f"   ⏱  {step}: {time.perf_counter() - start:.2f}s")
+
+
+def _autocommit():
+    # No open transaction: CREATE INDEX CONCURRENTLY cannot run inside one,
+    # and waits for every transaction older than it to finish
+    return engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+
+def create_index_concurrently(name: str, table: str, definition: str, unique: bool = False) -> bool:
+    """
+    Builds index `name` on `table` (definition: "(col, ...)", "USING gin (...)",
+    optionally followed by WHERE ...) without blocking writes.
+
+    Returns:
+        False if a valid index of that name already existed.
+    """
+    with _autocommit() as conn:
+        valid = conn.execute(
+            text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"), {"name": name}
+        ).scalar()
+        if valid:
+            print(f"✅ {name} already exists")
+            return False
+        if valid is False:
+            print(f"   {name} is INVALID (interrupted build); rebuilding")
+            conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+        with timed(f"CREATE INDEX CONCURRENTLY {name}"):
+            conn.execute(text(
+                f'CREATE {"UNIQUE " if unique else ""}INDEX CONCURRENTLY "{name}" ON {table} {definition}'
+            ))
+    print(f"✅ Created {name} on {table}")
+    return True
+
+
+def backfill(table: str, assignments: str, where: str, params: Optional[dict] = None,
+             batch_size: int = None, pause_ms: float = None, key: str = "id") -> int:
+    """
+    UPDATE table SET assignments for the rows matching `where`, batch_size
+    rows per transaction (short row locks), pausing pause_ms between
+    batches so the table stays responsive. Updated rows must stop matching
+    `where`.
+
+    Returns:
+        The number of rows updated.
+    """
+    batch_size = batch_size or BACKFILL_BATCH_SIZE
+    pause_ms = BACKFILL_PAUSE_MS if pause_ms is None else pause_ms
+    statement = text(f"""
+        UPDATE {table} SET {assignments}
+        WHERE {key} IN (SELECT {key} FROM {table} WHERE {where} LIMIT :batch_size)
+    """)
+    total = 0
+    start = time.perf_counter()
+    while True:
+        with engine.begin() as conn:
+            updated = conn.execute(statement, {**(params or {}), "batch_size": batch_size}).rowcount
+        total += updated
+        if updated:
+            elapsed = time.perf_counter() - start
+            print(f"   {table}: {total} rows backfilled ({total / elapsed:.0f} rows/s)")
+        if updated < batch_size:
+            return total
+        if pause_ms:
+            time.sleep(pause_ms / 1000)
+
+
+def ensure_migrations_table():
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR PRIMARY KEY,
+                name VARCHAR NOT NULL,
+                applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                duration_ms DOUBLE PRECISION
+            )
+        """))
+
+
+def applied_migrations() -> dict:
+    """version -> (name, applied_at, duration_ms) of the recorded migrations"""
+    ensure_migrations_table()
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT version, name, applied_at, duration_ms FROM schema_migrations"))
+        return {row.version: (row.name, row.applied_at, row.duration_ms) for row in rows}
+
+
+def _record(migration: Migration, duration_ms: Optional[float]):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO schema_migrations (version, name, duration_ms) VALUES (:version, :name, :duration_ms)
+            ON CONFLICT (version) DO NOTHING
+        """), {"version": migration.version, "name": migration.name, "duration_ms": duration_ms})
+
+
+def run_migrations(migrations: List[Migration], target: Optional[str] = None, dry_run: bool = False,
+                   baseline: bool = False) -> List[Migration]:
+    """
+    Applies the pending migrations (up to and including `target`) in
+    version order and records each one as it completes. baseline records
+    them without running them (databases migrated by hand with the
+    individual scripts).
+
+    Returns:
+        The migrations that were pending.
+    """
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions) or versions != sorted(versions):
+        raise ValueError("Migration versions must be unique and in ascending order")
+
+    with _autocommit() as lock:
+        lock.execute(text("SELECT pg_advisory_lock(:id)"), {"id": _LOCK_ID})
+        try:
+            applied = applied_migrations()
+            pending = [m for m in migrations
+                       if m.version not in applied and (target is None or m.version <= target)]
+            if not pending:
+                print("✅ Database is up to date")
+            total_start = time.perf_counter()
+            for i, migration in enumerate(pending, 1):
+                print(f"\n[{i}/{len(pending)}] {migration.version} {migration.name}")
+                if dry_run:
+                    continue
+                if baseline:
+                    _record(migration, None)
+                    print(f"✅ Recorded {migration.version} as applied")
+                    continue
+                start = time.perf_counter()
+                migration.run()
+                duration_ms = (time.perf_counter() - start) * 1000
+                _record(migration, duration_ms)
+                print(f"✅ {migration.version} {migration.name} applied in {duration_ms / 1000:.2f}s")
+            if pending and not dry_run:
+                print(f"\n⏱  {len(pending)} migration(s) in {time.perf_counter() - total_start:.2f}s")
+            return pending
+        finally:
+            lock.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": _LOCK_ID})
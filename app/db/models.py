@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, JSON, Float, DateTime, Boolean
+from sqlalchemy import BigInteger, Column, Computed, Index, Integer, String, Text, JSON, Float, Date, DateTime, Boolean, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from app.db.database import Base
 from sqlalchemy.sql import func
-from pgvector.sqlalchemy import Vector  # <--- The Bridge between Python & Postgres
+from app.utils.vectors import embedding_column_type  # <--- The Bridge between Python & Postgres
 
 
 class UserAuth(Base):
@@ -19,46 +20,71 @@ class UserAuth(Base):
 
 class CreditCardModel(Base):
     __tablename__ = "credit_cards"
+    __table_args__ = (
+        # One row per card per user; add_card upserts on it
+        UniqueConstraint("user_id", "card_key", name="uq_credit_cards_user_card_key"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, index=True)  # Link cards to specific users
+    card_key = Column(String, nullable=True)  # Normalized "issuer|card name" (see card_repository.card_key)
     
     # --- Basic Info ---
     card_name = Column(String, index=True)  # Removed unique constraint - multiple users can have same card
     issuer = Column(String, index=True)
     card_type = Column(String)
     annual_fee = Column(String)
+    annual_fee_inr = Column(Float, nullable=True)  # Parsed from annual_fee at ingest time
     
     # --- Financial Nuances ---
     # Stores the raw text condition, e.g., "Spend 40k to waive"
     fee_waiver_condition = Column(Text, nullable=True)  
+    fee_waiver_spend_inr = Column(Float, nullable=True)  # Yearly spend that waives the fee
     welcome_bonus = Column(Text, nullable=True)
     liability_policy = Column(Text, nullable=True)      # New: "Zero liability if reported < 3 days"
 
-    # --- Complex Nested Data (Stored as JSON) ---
+    # --- Complex Nested Data (Stored as JSONB) ---
+    # Generated reward_merchants / reward_merchant_substrings (GIN indexed)
+    # and excluded_terms columns back the SQL filters of
+    # card_repository.find_cards_for_merchant (migrate_jsonb_card_rules.py),
+    # which no request path calls yet. They are not mapped here, so loading
+    # a card never reads them.
     # Fixed: changed from raw String to Column(String)
     reward_program_name = Column(String, nullable=True) 
     
     # Stores List[RewardRule]
     # Example: [{"category": "10X", "merchants": ["Zomato"], "cap": "500 pts"}]
-    reward_rules = Column(JSON, nullable=True)          
+    reward_rules = Column(JSONB, nullable=True)
     
     # Stores List[Milestone] - New Field
     # Example: [{"spend": "1.2L", "reward": "500 Voucher"}]
-    milestone_benefits = Column(JSON, nullable=True)    
+    milestone_benefits = Column(JSONB, nullable=True)
 
     # Stores Eligibility Object - New Field
     # Example: {"income": "4.5L", "cities": ["Delhi", "Mumbai"]}
-    eligibility_criteria = Column(JSON, nullable=True)  
+    eligibility_criteria = Column(JSONB, nullable=True)
 
     # Stores List[str]
-    excluded_categories = Column(JSON, nullable=True)   
-    key_benefits = Column(JSON, nullable=True)
+    excluded_categories = Column(JSONB, nullable=True)
+    key_benefits = Column(JSONB, nullable=True)
 
+    # Version of the numeric normalization (reward_rules numeric keys,
+    # annual_fee_inr, fee_waiver_spend_inr); NULL = not normalized yet
+    normalized_version = Column(Integer, nullable=True)
+
+
+
+TRANSACTION_SEARCH_TSV = (
+    "to_tsvector('simple', coalesce(merchant, '') || ' ' || coalesce(category, '') || ' ' || coalesce(description, ''))"
+)
 
 
 class TransactionHistory(Base):
     __tablename__ = "transaction_history"
+    __table_args__ = (
+        # Memory retrieval scans one user's recent rows
+        Index("ix_transaction_history_user_created", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, index=True)
@@ -68,16 +94,133 @@ class TransactionHistory(Base):
     category = Column(String)           # e.g., "Travel"
     amount = Column(Float)              # e.g., 450.0
     description = Column(Text)          # e.g., "Ride to Airport"
+    card_name = Column(String, nullable=True)  # Card the spend was attributed to
     
     # 🧠 Semantic Brain
     # 1536 is the standard dimension size for OpenAI's 'text-embedding-3-small'
-    embedding = Column(Vector(1536)) 
+    # (EMBEDDING_DIMENSIONS / EMBEDDING_STORAGE, see app/utils/vectors.py)
+    embedding = Column(embedding_column_type())
+    embedding_model = Column(String(80), nullable=True)  # Backend that made it, "openai:text-embedding-3-small:1536"
+
+    # Lexical search over merchant, category and description (GIN indexed);
+    # 'simple' config: merchant names are not English words to be stemmed
+    search_tsv = Column(TSVECTOR, Computed(TRANSACTION_SEARCH_TSV, persisted=True))
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+class RewardSpendLedger(Base):
+    """
+    Running spend per (user, card, reward rule, period bucket).
+    Updated incrementally when a transaction is recorded so the remaining
+    cap headroom is a single lookup at scoring time.
+    """
+    __tablename__ = "reward_spend_ledger"
+    __table_args__ = (
+        UniqueConstraint("user_id", "card_name", "rule_key", "period_key", name="uq_reward_spend_ledger_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, nullable=False)
+    card_name = Column(String, nullable=False)
+    rule_key = Column(String, nullable=False)    # Normalized RewardRule.category
+    period_key = Column(String, nullable=False)  # e.g., "2026-10", "2026-Q4", "2026"
+
+    spend = Column(Float, nullable=False, default=0)   # Spend matched to the rule
+    points = Column(Float, nullable=False, default=0)  # Accelerated points earned
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class SpendDailyRollup(Base):
+    """
+    Spend per (user, day, category, merchant, card), maintained on insert.
+    Unknown category/merchant/card are stored as '' so the key stays unique.
+    """
+    __tablename__ = "spend_daily_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", "category", "merchant", "card_name", name="uq_spend_daily_rollups_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, nullable=False)
+    day = Column(Date, nullable=False)
+    category = Column(String, nullable=False, server_default="")
+    merchant = Column(String, nullable=False, server_default="")
+    card_name = Column(String, nullable=False, server_default="")
+
+    total_amount = Column(Float, nullable=False, default=0)
+    txn_count = Column(Integer, nullable=False, default=0)
+
+
+class SpendMonthlyRollup(Base):
+    """Spend per (user, month, category, merchant, card), maintained on insert."""
+    __tablename__ = "spend_monthly_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "month", "category", "merchant", "card_name", name="uq_spend_monthly_rollups_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, nullable=False)
+    month = Column(String, nullable=False)  # e.g., "2026-10"
+    category = Column(String, nullable=False, server_default="")
+    merchant = Column(String, nullable=False, server_default="")
+    card_name = Column(String, nullable=False, server_default="")
+
+    total_amount = Column(Float, nullable=False, default=0)
+    txn_count = Column(Integer, nullable=False, default=0)
+
+
+class ResourceVersion(Base):
+    """Version counter per polled resource (e.g. "cards:<user_id>"), see resource_versions."""
+    __tablename__ = "resource_versions"
+
+    key = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class CardParseCache(Base):
+    """
+    Validated CreditCard extractions keyed on a hash of the pasted text, the
+    system prompt, the CreditCard schema and the model (see card_parse_cache).
+    """
+    __tablename__ = "card_parse_cache"
+
+    content_hash = Column(String(64), primary_key=True)
+    prompt_hash = Column(String(16), nullable=False)
+    schema_version = Column(String(16), nullable=False)
+    card_json = Column(JSON, nullable=False)
+
+    hit_count = Column(Integer, nullable=False, server_default="0")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_hit_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class SemanticAnswerCache(Base):
+    """
+    Answers to generic general_flow questions, looked up by embedding
+    similarity (see app/services/semantic_cache.py). Shared by all users.
+    """
+    __tablename__ = "semantic_answer_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    question = Column(Text, nullable=False)
+    embedding = Column(embedding_column_type(), nullable=False)
+    embedding_model = Column(String(80), nullable=True)  # Only entries of the active embedding backend are looked up
+    answer = Column(Text, nullable=False)
+    prompt_version = Column(String(16), nullable=False)  # General prompt + model
+    llm_ms = Column(Float, nullable=True)  # Time the LLM took to produce the answer
+
+    hit_count = Column(Integer, nullable=False, server_default="0")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    last_hit_at = Column(DateTime(timezone=True), nullable=True)
+
+
 class UserMemory(Base):
     __tablename__ = "user_memories"
+    __table_args__ = (
+        Index("ix_user_memories_user_created", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, index=True)
@@ -89,7 +232,8 @@ class UserMemory(Base):
     category = Column(String) 
     
     # 🧠 Semantic Brain (Vector)
-    embedding = Column(Vector(1536)) 
+    embedding = Column(embedding_column_type())
+    embedding_model = Column(String(80), nullable=True)  # Backend that made it (see app/utils/embedding_backends.py)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -73,6 +73,17 @@ def route_after_fetch_cards(state: GraphState) -> Literal["reward_calculation",
     # The user has already received the "Please add cards..." message
     return "__end__"
 
+def route_after_decision(state: GraphState) -> Literal["memory_retrieval", "__end__"]:
+    """
+    Decides whether the templated answer from decision_node is final
+    or should be followed by the LLM explanation.
+    """
+    if state.get("response_mode", "rich") == "fast":
+        # decision_node already produced the complete recommendation
+        return "__end__"
+
+    return "memory_retrieval"
+
 
 def build_graph(memory=None):
     builder = StateGraph(GraphState)
@@ -129,7 +140,7 @@ def build_graph(memory=None):
     )
     builder.add_edge("add_card", END)
 
-    # Recommendation Flow: transaction_parser -> fetch_cards -> (conditional) -> reward_calculation -> decision -> memory_retrieval -> llm_recommendation -> END
+    # Recommendation Flow: transaction_parser -> fetch_cards -> (conditional) -> reward_calculation -> decision -> (rich mode) memory_retrieval -> llm_recommendation -> END
     builder.add_edge("transaction_parser", "fetch_cards")
     
     # Conditional edge: only continue if cards were found
@@ -143,7 +154,16 @@ def build_graph(memory=None):
     )
     
     builder.add_edge("reward_calculation", "decision")
-    builder.add_edge("decision", "memory_retrieval")
+
+    # Fast mode stops at the deterministic answer, rich mode adds the LLM explanation
+    builder.add_conditional_edges(
+        "decision",
+        route_after_decision,
+        {
+            "memory_retrieval": "memory_retrieval",
+            "__end__": END
+        }
+    )
     builder.add_edge("memory_retrieval", "llm_recommendation")
     builder.add_edge("llm_recommendation", END)
 
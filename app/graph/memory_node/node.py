@@ -1,34 +1,29 @@
 from app.graph.state import GraphState
-from dotenv import load_dotenv
 from langchain_core.runnables import RunnableConfig
-from pydantic import BaseModel, Field
 from app.schemas.memory_extraction import MemoryExtraction
-from app.services.memory_service import save_general_memory
-from app.services.memory_service import semantic_search_transactions 
+from app.services.memory_service import save_general_memory, retrieve_memories
 from langchain_core.messages import SystemMessage
-from langchain_openai import ChatOpenAI
-
-load_dotenv()
-
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
-
-from app.graph.state import GraphState
-from dotenv import load_dotenv
-from langchain_core.runnables import RunnableConfig
-from pydantic import BaseModel, Field
-from app.schemas.memory_extraction import MemoryExtraction
-from app.services.memory_service import save_general_memory, semantic_search_general_memories
-from app.services.memory_service import semantic_search_transactions 
-from langchain_core.messages import SystemMessage
-from langchain_openai import ChatOpenAI
-
-load_dotenv()
-
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
+from app.utils.clients import get_llm
 
 # -------------------------
 # Memory Retrieval Node
 # -------------------------
+def format_memory_context(memories, transactions) -> str:
+    """Prompt section with the user's profile facts and relevant past transactions."""
+    sections = []
+    # General memories first (identity, preferences)
+    if memories:
+        sections.append("### USER PROFILE (Long-term Memory):\n" + "".join(
+            f"- {mem.memory_text} [{mem.category}]\n" for mem in memories
+        ))
+    if transactions:
+        sections.append("### RELEVANT PAST TRANSACTIONS:\n" + "".join(
+            f"- {mem.merchant} ({mem.category}): ₹{mem.amount} [Similarity: {mem.similarity:.2f}]\n"
+            for mem in transactions
+        ))
+    return "\n".join(sections)
+
+
 def memory_retrieval_node(state: GraphState, config: RunnableConfig):
     # Check if incognito mode
     incognito = config.get("configurable", {}).get("incognito", False)
@@ -46,47 +41,29 @@ def memory_retrieval_node(state: GraphState, config: RunnableConfig):
     
     print(f"🧠 Retrieving memories for user_id: {user_id}")
     
-    # 1. Search Transaction LTM
-    relevant_transactions = semantic_search_transactions(
-        user_id=user_id, 
-        query=last_message, 
-        threshold=0.75
-    )
-    
-    # 2. Search General Memories (name, preferences, etc.)
-    relevant_general_memories = semantic_search_general_memories(
+    # 1. General memories + past transactions (no embedding when a merchant is named)
+    relevant_general_memories, relevant_transactions, query_embedding = retrieve_memories(
         user_id=user_id,
         query=last_message,
-        threshold=0.25  # Lower threshold for general facts to catch identity queries
+        memory_threshold=0.25,  # Lower threshold for general facts to catch identity queries
+        transaction_threshold=0.75
     )
     
-    # 3. Format Context String
-    memory_context = ""
-    
-    # Add general memories first (identity, preferences)
+    # 2. Format Context String
+    memory_context = format_memory_context(relevant_general_memories, relevant_transactions)
     if relevant_general_memories:
-        memory_context += "### USER PROFILE (Long-term Memory):\n"
-        for mem in relevant_general_memories:
-            memory_context += f"- {mem.memory_text} [{mem.category}]\n"
         print(f"🧠 LTM: Injecting {len(relevant_general_memories)} general memories.")
-    
-    # Add transaction memories
     if relevant_transactions:
-        memory_context += "\n### RELEVANT PAST TRANSACTIONS:\n"
-        for mem in relevant_transactions:
-            memory_context += (
-                f"- {mem.merchant} ({mem.category}): ₹{mem.amount} "
-                f"[Similarity: {mem.similarity:.2f}]\n"
-            )
         print(f"🧠 LTM: Injecting {len(relevant_transactions)} transaction memories.")
-    
     if not relevant_general_memories and not relevant_transactions:
         print("🧠 LTM: No relevant memories found.")
 
-    # 4. Store in State to be used by the next node
+    # 3. Store in State to be used by the next node
     return {
         **state,
-        "memory_context": memory_context 
+        "memory_context": memory_context,
+        # general_llm_node's semantic cache lookup reuses it
+        "query_embedding": query_embedding
     }
 
 
@@ -116,7 +93,7 @@ def profiler_node(state: GraphState, config: RunnableConfig):
     last_msg = state["messages"][-1].content
     
     # 1. Run LLM to see if there is a fact
-    extractor = llm.with_structured_output(MemoryExtraction)
+    extractor = get_llm().with_structured_output(MemoryExtraction)
     result = extractor.invoke([
         SystemMessage(content=PROFILER_SYSTEM_PROMPT),
         last_msg
@@ -1,29 +1,24 @@
 # app/graph/nodes.py
 
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import AIMessage
 from langchain_core.messages import SystemMessage
 from app.schemas.transaction import Transaction
 from app.db.database import SessionLocal
 from app.schemas.credit_card import CreditCard
 from app.graph.state import GraphState
-from dotenv import load_dotenv
-from pprint import pprint
-import sqlite3
 import json
-from app.db.card_repository import add_card
+import time
+from app.db.card_repository import add_card, get_reward_rule_merchants
 from langchain_core.runnables import RunnableConfig
 from app.services.memory_service import save_transaction_memory
 from app.utils.CONSTANTS import FINANCE_KEYWORDS
 from app.tools.web_search import search_product_price, extract_price_from_search
-load_dotenv()
-
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
-# llm = ChatGoogleGenerativeAI(
-#     model="gemini-2.0-flash",  # Add 'models/' prefix
-#     temperature=0.2,
-# )
+from app.utils.transaction_parser import LocalTransactionParser, reports_spend
+from app.utils.clients import get_llm
+from app.services import cache_bus
+from app.services.card_parse_cache import extract_card_cached
+from app.services import semantic_cache
+from app.utils.vectors import get_text_embedding
 
 # -------------------------
 # Router Node
@@ -169,7 +164,7 @@ Think about:
 Return ONLY the flow name: add_card_flow, recommendation_flow, or general_flow
 """
 
-    response = llm.invoke([
+    response = get_llm().invoke([
         SystemMessage(content=MANAGE_REQUEST_SYSTEM_PROMPT),
         classification_prompt
     ])
@@ -186,7 +181,7 @@ Return ONLY the flow name: add_card_flow, recommendation_flow, or general_flow
                 break
         else:
             # Ultimate fallback: ask LLM again with stricter prompt
-            strict_response = llm.invoke([
+            strict_response = get_llm().invoke([
                 SystemMessage(content="You must return ONLY one of: add_card_flow, recommendation_flow, general_flow"),
                 f"User request: {last_message}\n\nReturn only the flow name:"
             ])
@@ -241,7 +236,7 @@ def finance_router_node(state: GraphState) -> GraphState:
 #         *state["messages"]
 #     ]
 
-#     response = llm.invoke(messages)
+#     response = get_llm().invoke(messages)
     print(state, "Statee finance")
 #     return {
 #         **state,
@@ -257,7 +252,41 @@ You are a general assistant.
 Answer normally and clearly.
 """
 
-def general_llm_node(state: GraphState) -> GraphState:
+def general_llm_node(state: GraphState, config: RunnableConfig) -> GraphState:
+    question = state["messages"][-1].content
+
+    # Generic questions ("what is lounge access") can be answered from the
+    # semantic cache, never when the answer would use the user's memories
+    use_cache = (
+        semantic_cache.SEMANTIC_CACHE_ENABLED
+        and not state.get("memory_context")
+        and semantic_cache.is_cacheable_question(question)
+    )
+    if semantic_cache.SEMANTIC_CACHE_ENABLED and not use_cache:
+        semantic_cache.stats.record("bypassed")
+
+    version = semantic_cache.prompt_version(GENERAL_SYSTEM_PROMPT, get_llm().model_name)
+    embedding = None
+    lookup_ms = 0.0
+    if use_cache:
+        start = time.perf_counter()
+        try:
+            # Embedded once per turn: memory retrieval already did it, unless it stopped lexically
+            embedding = state.get("query_embedding") or get_text_embedding(question)
+            cached = semantic_cache.lookup_answer(embedding, version)
+        except Exception as e:
+            print(f"⚠️ Semantic cache lookup failed: {e}")
+            cached = None
+        lookup_ms = (time.perf_counter() - start) * 1000
+
+        if cached:
+            semantic_cache.stats.record("hits", cached["llm_ms"] - lookup_ms)
+            print(f"⚡ Semantic cache hit (similarity {cached['similarity']:.3f}, {lookup_ms:.0f} ms)")
+            return {
+                **state,
+                "messages": state["messages"] + [AIMessage(content=cached["answer"])]
+            }
+
     # Build system prompt with memory context if available
     system_prompt = GENERAL_SYSTEM_PROMPT
     if state.get("memory_context"):
@@ -268,7 +297,22 @@ def general_llm_node(state: GraphState) -> GraphState:
         *state["messages"]
     ]
     # print(state, "Statee general")
-    response = llm.invoke(messages)
+    start = time.perf_counter()
+    response = get_llm().invoke(messages)
+    llm_ms = (time.perf_counter() - start) * 1000
+
+    if embedding is not None:
+        # The lookup was pure overhead on a miss
+        semantic_cache.stats.record("misses", -lookup_ms)
+        incognito = config.get("configurable", {}).get("incognito", False)
+        # The answer was generated with the whole thread in context: only a
+        # thread's first question gives an answer that is safe to share
+        earlier_turns = len(state["messages"]) > 1
+        if response.content and not incognito and not earlier_turns:
+            try:
+                semantic_cache.store_answer(question, embedding, response.content, version, llm_ms)
+            except Exception as e:
+                print(f"⚠️ Could not cache answer: {e}")
 
     return {
         **state,
@@ -292,7 +336,7 @@ def add_card_node(state: GraphState) -> GraphState:
         *state["messages"]
     ]
     # print(state, "Statee add card")
-    response = llm.invoke(messages)
+    response = get_llm().invoke(messages)
 
     return {
         **state,
@@ -316,7 +360,7 @@ def expense_decision_node(state: GraphState) -> GraphState:
         *state["messages"]
     ]
     # print(state, "Statee expense")
-    response = llm.invoke(messages)
+    response = get_llm().invoke(messages)
 
     return {
         **state,
@@ -367,14 +411,20 @@ def card_parser_node(state: GraphState) -> GraphState:
     # 3. Proceed only if text exists
     # print("Raw text:", raw_text)
 
-    structured_llm = llm.with_structured_output(CreditCard)
+    structured_llm = get_llm().with_structured_output(CreditCard)
 
     # print("Structured LLM:", structured_llm)
 
-    card_data: CreditCard = structured_llm.invoke([
-        SystemMessage(content=ADD_CARD_SYSTEM_PROMPT),
-        raw_text
-    ])
+    # Same text, prompt and schema as an earlier paste: served from Postgres
+    card_data: CreditCard = extract_card_cached(
+        raw_text,
+        ADD_CARD_SYSTEM_PROMPT,
+        lambda: structured_llm.invoke([
+            SystemMessage(content=ADD_CARD_SYSTEM_PROMPT),
+            raw_text
+        ]),
+        model=get_llm().model_name
+    )
     
     if not card_data.extracted_from_user:
          return {
@@ -421,6 +471,8 @@ def add_card_node(state: GraphState, config: RunnableConfig) -> GraphState:
     finally:
         db.close()
 
+    register_card_merchants(card_data)
+
     if hasattr(card_data, "dict"):
         card_dict = card_data.dict()
     else:
@@ -458,22 +510,84 @@ Action: Call search_product_price("iPhone 15 price in India")
 Result: Extract price from search results and set amount field
 """
 
+_local_parser = None
+
+
+def _reset_local_parser(key: str):
+    """Another worker stored a card: reseed from the database on next use."""
+    global _local_parser
+    _local_parser = None
+
+
+cache_bus.subscribe("merchants", _reset_local_parser)
+
+
+def get_local_parser() -> LocalTransactionParser:
+    """
+    Lazily builds the local transaction parser, seeded with every merchant
+    that appears in stored reward_rules.
+    """
+    global _local_parser
+    if _local_parser is None:
+        parser = LocalTransactionParser()
+        db = SessionLocal()
+        try:
+            parser.add_merchants(get_reward_rule_merchants(db))
+        except Exception as e:
+            print(f"⚠️ Could not seed merchants from reward rules: {e}")
+        finally:
+            db.close()
+        _local_parser = parser
+    return _local_parser
+
+
+def register_card_merchants(card_data):
+    """Adds the merchants of a newly stored card to the local parser."""
+    if isinstance(card_data, dict):
+        rules = card_data.get("reward_rules") or []
+    else:
+        rules = [r.model_dump() for r in card_data.reward_rules]
+
+    parser = get_local_parser()
+    for rule in rules:
+        parser.add_merchants(rule.get("merchants") or [])
+
+    # Other workers reseed their parsers; this one is already up to date
+    cache_bus.publish("merchants", local=False)
+
+
 def transaction_parser_node(state: GraphState, config: RunnableConfig):
     raw_text = state["messages"][-1].content.strip()
 
-    # First, parse the transaction to see if amount is missing
-    structured_llm = llm.with_structured_output(Transaction)
-    parsed_txn = structured_llm.invoke([
-        SystemMessage(content=TRANSACTION_PARSER_PROMPT),
-        raw_text
-    ])
+    # First, try to resolve amount/merchant/category locally
+    local_txn = get_local_parser().parse(raw_text)
+
+    if local_txn.is_complete:
+        parsed_txn = local_txn.to_transaction()
+        print(f"⚡ Parsed locally: {parsed_txn.merchant} | ₹{parsed_txn.amount} | {parsed_txn.category}")
+    else:
+        # Some field is unresolved, fall back to the LLM
+        structured_llm = get_llm().with_structured_output(Transaction)
+        parsed_txn = structured_llm.invoke([
+            SystemMessage(content=TRANSACTION_PARSER_PROMPT),
+            raw_text
+        ])
+
+        # Locally resolved fields are deterministic, keep them over the LLM's guess
+        if parsed_txn:
+            if local_txn.amount is not None:
+                parsed_txn.amount = local_txn.amount
+            if local_txn.merchant:
+                parsed_txn.merchant = local_txn.merchant
+            if local_txn.category:
+                parsed_txn.category = local_txn.category
     
     # Check if amount is missing or zero
     if parsed_txn and (parsed_txn.amount is None or parsed_txn.amount == 0):
         print(f"💰 Amount not provided. Attempting to search for price...")
         
         # Create LLM with tool binding to decide if search is needed
-        llm_with_tools = llm.bind_tools([search_product_price])
+        llm_with_tools = get_llm().bind_tools([search_product_price])
         
         # Ask LLM if it should search for price
         decision_prompt = f"""
@@ -514,33 +628,11 @@ If it's a generic expense or service (like "food", "groceries", "uber ride") wit
         else:
             print(f"🤖 LLM decided search is not needed for this query")
 
-    # --- 🧠 VECTOR MEMORY INJECTION (Skip in incognito mode) ---
-    incognito = config.get("configurable", {}).get("incognito", False)
-    
-    if parsed_txn and not incognito:
-        try:
-            # Get the user ID
-            user_id = config.get("configurable", {}).get("user_id", "default")
-            # Save to Postgres Vector DB
-            save_transaction_memory(
-                user_id=user_id,
-                merchant=parsed_txn.merchant,
-                amount=parsed_txn.amount,
-                category=parsed_txn.category,
-                desc=state["messages"][-1].content  # Save original query as description
-            )
-            print(f"✅ Saved Semantic Memory: {parsed_txn.merchant}")
-            
-        except Exception as e:
-            # CRITICAL: Do not crash the flow if DB save fails
-            print(f"⚠️ Memory Save Failed: {e}")
-    elif incognito:
-        print(f"🕵️ Incognito mode: Transaction memory not saved")
-    # ---------------------------------------
-
     return {
         **state,
         "parsed_transaction": parsed_txn,
+        # Only spend the user reports having made is recorded (see record_transaction)
+        "spend_reported": reports_spend(raw_text),
         "messages": state["messages"] + [
             AIMessage(content="Transaction parsed successfully.")
         ]
@@ -551,8 +643,8 @@ If it's a generic expense or service (like "food", "groceries", "uber ride") wit
 # -------------------------
 # Fetch User Cards Agent
 # -------------------------
-from app.schemas.credit_card import CreditCard, RewardRule, Milestone, Eligibility  # Import your Pydantic models
-from app.db.card_repository import get_user_cards
+from app.db.card_repository import get_user_credit_cards
+from app.services.spend_service import get_rule_spend
 
 def fetch_user_cards_node(state: GraphState, config: RunnableConfig) -> GraphState:
     # Get user_id from config
@@ -560,52 +652,17 @@ def fetch_user_cards_node(state: GraphState, config: RunnableConfig) -> GraphSta
     
     db = SessionLocal()
     try:
-        rows = get_user_cards(db, user_id)
+        # Cached per worker until the user's cards change (see cache_bus)
+        cards = get_user_credit_cards(db, user_id)
+        # Spend already counted towards each rule's cap in the open periods
+        rule_spend = get_rule_spend(db, user_id) if cards else {}
     finally:
         db.close()
 
-    cards = []
-
-    for row in rows:
-        try:
-            # 1. Deserialize the nested JSON fields first
-            reward_rules_data = row.reward_rules if row.reward_rules else []
-            excluded_data = row.excluded_categories if row.excluded_categories else []
-            benefits_data = row.key_benefits if row.key_benefits else []
-            
-            # Handle new fields if you added them (Milestones, Eligibility)
-            milestones_data = row.milestone_benefits if row.milestone_benefits else []
-            eligibility_data = row.eligibility_criteria if row.eligibility_criteria else None
-
-            # 2. Reconstruct the Pydantic Object
-            card = CreditCard(
-                card_name=row.card_name,
-                issuer=row.issuer,
-                card_type=row.card_type,
-                annual_fee=row.annual_fee,
-                fee_waiver_condition=row.fee_waiver_condition,
-                welcome_bonus=row.welcome_bonus,
-                reward_program_name=row.reward_program_name,
-                
-                # Pass the parsed lists/dicts
-                reward_rules=[RewardRule(**r) for r in reward_rules_data],
-                milestone_benefits=[Milestone(**m) for m in milestones_data],
-                eligibility_criteria=Eligibility(**eligibility_data) if eligibility_data else None,
-                excluded_categories=excluded_data,
-                key_benefits=benefits_data,
-                
-                liability_policy=row.liability_policy if row.liability_policy else None
-            )
-            
-            cards.append(card)
-
-        except Exception as e:
-            print(f"Failed to parse card '{row.card_name}':", e)
-            import traceback
-            traceback.print_exc()
-
     # If no cards found, prompt user to add cards
     if len(cards) == 0:
+        # The graph ends here: keep the spend history of users without cards
+        record_transaction(state, config)
         return {
             **state,
             "available_cards": [],
@@ -619,6 +676,7 @@ def fetch_user_cards_node(state: GraphState, config: RunnableConfig) -> GraphSta
     return {
         **state,
         "available_cards": cards,
+        "rule_spend": rule_spend,
         "messages": state["messages"] + [
             AIMessage(content=f"Fetched {len(cards)} cards from your portfolio.")
         ]
@@ -629,8 +687,7 @@ def fetch_user_cards_node(state: GraphState, config: RunnableConfig) -> GraphSta
 # -------------------------
 # Reward Calculation Agent
 # -------------------------
-import re
-from langchain_core.messages import AIMessage
+from app.services.reward_engine import POINT_VALUE_INR, score_transaction
 
 def reward_calculation_node(state: GraphState) -> GraphState:
     txn = state.get("parsed_transaction")
@@ -642,104 +699,17 @@ def reward_calculation_node(state: GraphState) -> GraphState:
     if not cards:
         return {**state, "messages": state["messages"] + [AIMessage(content="No cards found.")]}
 
-    # Normalize inputs
-    merchant_input = txn.merchant.lower().strip()
-    amount = float(txn.amount)
-
-    best_card = None
-    best_points = -1
-    breakdown = []
-
-    for card in cards:
-        # --- 1. EXCLUSIONS ---
-        exclusions = [e.lower() for e in card.excluded_categories] if card.excluded_categories else []
-        
-        # Handle None category
-        category_lower = txn.category.lower() if txn.category else ""
-        
-        if category_lower in exclusions or merchant_input in exclusions:
-            breakdown.append({
-                "card_name": card.card_name,
-                "points": 0,
-                "category": "Excluded",
-                "reason": "Matches exclusion"
-            })
-            continue
-
-        # --- 2. FIND BEST MATCHING RULE ---
-        applied_multiplier = 1.0
-        applied_category = "Base Reward"
-        
-        # Sort: Specific merchants first, "All" last
-        sorted_rules = sorted(
-            card.reward_rules, 
-            key=lambda r: "all" in [m.lower() for m in r.merchants]
-        )
-
-        for rule in sorted_rules:
-            rule_merchants = [m.lower() for m in rule.merchants]
-            
-            # --- MATCHING LOGIC (The Fix) ---
-            match_found = False
-            
-            # 1. Generic Match
-            if "all" in rule_merchants:
-                match_found = True
-            
-            # 2. Specific Match (Exact or Substring)
-            # Check if any DB merchant (e.g. 'nykaa') is inside User Input (e.g. 'nykaa man')
-            # OR if User Input (e.g. 'uber') is inside DB merchant (e.g. 'uber eats')
-            else:
-                for rm in rule_merchants:
-                    if rm in merchant_input or merchant_input in rm:
-                        match_found = True
-                        break
-
-            if match_found:
-                raw_mult = str(rule.multiplier).strip()
-                
-                # --- PARSING LOGIC ---
-                try:
-                    if "x" in raw_mult.lower():
-                        applied_multiplier = float(raw_mult.lower().replace("x", "").strip())
-                    elif "%" in raw_mult:
-                        # Treating 1% approx equal to 1 Point for comparison
-                        applied_multiplier = float(raw_mult.replace("%", "").strip())
-                    else:
-                        # Regex extraction for "2 travel credits..."
-                        match = re.search(r"(\d+(\.\d+)?)", raw_mult)
-                        applied_multiplier = float(match.group(1)) if match else 1.0
-
-                except Exception:
-                    applied_multiplier = 1.0
-
-                applied_category = rule.category
-                
-                # If this was a SPECIFIC match (not "all"), we stop looking.
-                # If it was "all", we keep looking in case a specific rule exists later?
-                # Actually, since we sorted "All" to the bottom, if we hit "All" here, 
-                # it means we already missed the specific ones. 
-                # BUT: Since we are iterating *sorted* list where "All" is last, 
-                # if we hit a specific match, we should break immediately.
-                if "all" not in rule_merchants:
-                    break 
-
-        # --- 3. CALCULATION ---
-        points = (amount / 50) * applied_multiplier
-
-        breakdown.append({
-            "card_name": card.card_name,
-            "multiplier": applied_multiplier,
-            "category": applied_category,
-            "points": round(points, 2)
-        })
-
-        if points > best_points:
-            best_points = points
-            best_card = card
+    # Caps are applied against the spend already recorded in the ledger
+    best_card, best_entry, breakdown = score_transaction(
+        cards,
+        merchant=txn.merchant,
+        category=txn.category,
+        amount=txn.amount,
+        rule_spend=state.get("rule_spend") or {}
+    )
 
     if best_card:
-        msg = f"Best choice: **{best_card.card_name}**.\nEarn approx **{int(best_points)} points** ({breakdown[-1]['category']})."
+        msg = f"Best choice: **{best_card.card_name}**.\nEarn approx **{int(best_entry['points'])} points** ({best_entry['category']})."
     else:
         msg = "No suitable card found."
 
@@ -756,7 +726,50 @@ def reward_calculation_node(state: GraphState) -> GraphState:
 # -------------------------
 # Decision Agent
 # -------------------------
-def decision_node(state: GraphState) -> GraphState:
+def _last_user_message(state: GraphState) -> str:
+    for message in reversed(state["messages"]):
+        if getattr(message, "type", None) == "human":
+            return message.content
+    return ""
+
+
+def _card_used(cards: list, text: str):
+    """The user's card named in the message ("paid 500 with my Regalia Gold Credit Card"), if any"""
+    text = text.lower()
+    return next((card for card in cards if card.card_name and card.card_name.lower() in text), None)
+
+
+def record_transaction(state: GraphState, config: RunnableConfig, card_name: str = None, reward: dict = None):
+    """
+    Saves the transaction to long-term memory when the user reported spend
+    they made (not for "which card should I use" questions, nor in
+    incognito). With card_name and its reward breakdown entry, the reward
+    rule's cap ledger moves in the same commit.
+    """
+    txn = state.get("parsed_transaction")
+    if not txn or not state.get("spend_reported"):
+        return
+    if config.get("configurable", {}).get("incognito", False):
+        print(f"🕵️ Incognito mode: Transaction memory not saved")
+        return
+
+    try:
+        save_transaction_memory(
+            user_id=config.get("configurable", {}).get("user_id", "default"),
+            merchant=txn.merchant,
+            amount=txn.amount,
+            category=txn.category,
+            desc=_last_user_message(state),  # Save original query as description
+            card_name=card_name,
+            reward=reward
+        )
+        print(f"✅ Saved Semantic Memory: {txn.merchant}")
+    except Exception as e:
+        # CRITICAL: Do not crash the flow if DB save fails
+        print(f"⚠️ Memory Save Failed: {e}")
+
+
+def decision_node(state: GraphState, config: RunnableConfig) -> GraphState:
 
     txn = state["parsed_transaction"]
     best_card = state.get("best_card")
@@ -764,6 +777,7 @@ def decision_node(state: GraphState) -> GraphState:
 
     # Safety check
     if not best_card:
+        record_transaction(state, config)
         return {
             **state,
             "messages": state["messages"] + [
@@ -780,12 +794,25 @@ def decision_node(state: GraphState) -> GraphState:
         None
     )
 
+    # Attributed to the card the user says they paid with, else the recommended one
+    used = _card_used(state.get("available_cards") or [], _last_user_message(state)) or best_card
+    record_transaction(state, config, used.card_name,
+                       next((b for b in breakdown if b["card_name"] == used.card_name), None))
+
     points = round(best_entry["points"], 2)
     multiplier = best_entry["multiplier"]
     category = best_entry["category"]
     
     # Calculate point value (assuming 1 point = ₹0.25 average redemption value)
-    estimated_value = round(points * 0.25, 2)
+    estimated_value = round(points * POINT_VALUE_INR, 2)
+
+    # Explain when the rule's cap limits the accelerated rate
+    cap_text = ""
+    if best_entry.get("capped"):
+        cap_text = (
+            f"\n• Only ₹{best_entry['rule_spend']:,.0f} earns {best_entry['nominal_multiplier']}x "
+            f"(cap for this period reached), the rest earns the base rate"
+        )
     
     # Get other cards for comparison
     other_cards = [b for b in breakdown if b["card_name"] != best_card.card_name]
@@ -810,7 +837,7 @@ def decision_node(state: GraphState) -> GraphState:
 
 **On ₹{amount:,.0f} at {merchant}:**
 • Earn {points} points ({multiplier}x on {category})
-• Worth ~₹{estimated_value} in rewards
+• Worth ~₹{estimated_value} in rewards{cap_text}
 
 **Redeem For:**
 • Statement credit or cashback
@@ -862,7 +889,7 @@ def decision_node(state: GraphState) -> GraphState:
 #                 ✔ Not too long
 #             """
 
-#     response = llm.invoke(prompt)
+#     response = get_llm().invoke(prompt)
 
 #     return {
 #         **state,
@@ -954,7 +981,7 @@ def llm_recommendation_node(state: GraphState) -> GraphState:
     """
 
     # 4. Invoke LLM
-    response = llm.invoke(prompt)
+    response = get_llm().invoke(prompt)
 
     return {
         **state,
@@ -1042,7 +1069,7 @@ def llm_recommendation_node(state: GraphState) -> GraphState:
 
 #     # 6. Invoke LLM
 #     print(f"DEBUG: Comparison Mode = {is_comparison}")
-#     response = llm.invoke(prompt)
+#     response = get_llm().invoke(prompt)
 
 #     return {
 #         **state,
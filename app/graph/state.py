@@ -1,6 +1,7 @@
 from typing import Any, Optional, TypedDict, List, Literal, Dict, Annotated
 # from langchain_core.messages import BaseMessage
 from app.schemas.transaction import Transaction
+from langgraph.channels import UntrackedValue
 from langgraph.graph.message import add_messages # <--- KEY IMPORT
 
 class GraphState(TypedDict):
@@ -19,14 +20,28 @@ class GraphState(TypedDict):
 
     flow_decision: Literal["add_card_flow", "recommendation_flow", "general_flow"]
 
+    # "fast" ends the recommendation flow at the templated decision,
+    # "rich" continues to the LLM explanation
+    response_mode: Literal["fast", "rich"]
+
     parsed_card: Optional[Dict[str, Any]]
 
     parsed_transaction: Optional[Transaction]
 
+    # The message reports spend already made (recorded), not a "which card" question
+    spend_reported: bool
+
     available_cards: Optional[List[Dict[str, Any]]]
 
+    # Spend already counted towards reward caps: {"<card>|<rule>|<period>": spend}
+    rule_spend: Optional[Dict[str, float]]
+
     best_card: Optional[dict]
     reward_breakdown: Optional[list]
 
     memory_context: str
 
+    # Embedding of the last message from memory retrieval, reused by the
+    # semantic cache; kept for the run only, never checkpointed
+    query_embedding: Annotated[Optional[list], UntrackedValue(Optional[list])]
+
@@ -9,6 +9,14 @@ class RewardRule(BaseModel):
     cap: Optional[str] = Field(None, description="Max points/cashback per period. Mention if shared across merchants.")
     period: Optional[str] = Field(None, description="E.g., 'Month', 'Year', 'Statement Cycle'")
 
+class NormalizedRewardRule(RewardRule):
+    """A stored RewardRule: the issuer's text plus the numbers parsed from it at ingest time."""
+    multiplier_kind: str = "x"                 # 'x', 'percent' or 'flat'
+    multiplier_value: float = 1.0
+    cap_amount: Optional[float] = None
+    cap_unit: Optional[str] = None             # 'points', 'inr' or None
+    period_type: Optional[str] = None          # See PERIODS in app/utils/reward_rules.py
+
 class Milestone(BaseModel):
     spend_threshold: str = Field(..., description="Amount required to unlock reward (e.g., 'Rs. 1.20 Lakhs')")
     reward: str = Field(..., description="What is given (e.g., 'Rs. 500 Gift Voucher')")
@@ -42,4 +50,10 @@ class CreditCard(BaseModel):
     key_benefits: List[str]
     
     # Nuance handling
-    liability_policy: Optional[str] = Field(None, description="Zero liability conditions")
\ No newline at end of file
+    liability_policy: Optional[str] = Field(None, description="Zero liability conditions")
+
+class StoredCreditCard(CreditCard):
+    """A CreditCard loaded from the database, with its normalized numeric fields."""
+    reward_rules: List[NormalizedRewardRule]
+    annual_fee_inr: float = 0.0
+    fee_waiver_spend_inr: Optional[float] = None   # Yearly spend that waives the fee
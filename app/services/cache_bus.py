@@ -0,0 +1,245 @@
+"""
+Cache invalidation bus over Postgres LISTEN/NOTIFY.
+
+Writers publish a key ("cards:<user_id>", "transactions:<user_id>", ...)
+after changing data; every worker runs a listener thread (started in the
+API lifespan) and drops the matching entries from its in-process caches.
+
+publish() called with the writer's session sends the NOTIFY inside that
+transaction and defers the local invalidation to the session's commit, so
+every worker (this one included) drops its entries exactly when the write
+becomes visible, and never for a rolled-back write.
+
+Keys:
+    cards:<user_id>          a user's cards changed
+    merchants                the set of known reward-rule merchants changed
+    transactions:<user_id>   a user's transaction history changed
+    memories:<user_id>       a user's general memories changed
+A key ending in "*" (e.g. "cards:*") invalidates every entry of that prefix.
+"""
+import json
+import os
+import select
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+
+import psycopg2
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app.db.database import engine
+
+CHANNEL = "cache_invalidation"
+
+# Identifies this process, so a worker skips its own notifications
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+_subscribers: Dict[str, List[Callable[[str], None]]] = {}
+_lock = threading.Lock()
+
+# Seconds between publish and delivery, for the last notifications received
+propagation_latencies = deque(maxlen=1000)
+
+
+def subscribe(prefix: str, callback: Callable[[str], None]):
+    """Calls callback(key) for every invalidated key starting with prefix."""
+    with _lock:
+        _subscribers.setdefault(prefix, []).append(callback)
+
+
+def _dispatch(key: str):
+    with _lock:
+        # "*" alone (listener reconnect) reaches every subscriber
+        callbacks = [cb for prefix, cbs in _subscribers.items() if key == "*" or key.startswith(prefix) for cb in cbs]
+    for callback in callbacks:
+        try:
+            callback(key)
+        except Exception as e:
+            print(f"⚠️ Cache invalidation callback failed for '{key}': {e}")
+
+
+_PENDING = "cache_bus_pending_keys"
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_pending(session):
+    for key in session.info.pop(_PENDING, ()):
+        _dispatch(key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session):
+    session.info.pop(_PENDING, None)
+
+
+def publish(key: str, db=None, local: bool = True):
+    """
+    Invalidates key on every worker. Pass the writer's session (or
+    connection, with local=False) to tie the invalidation to its
+    transaction; without one it happens right away. local=False skips this
+    worker (its caches were already updated).
+    """
+    if local:
+        if db is not None:
+            db.info.setdefault(_PENDING, []).append(key)
+        else:
+            _dispatch(key)
+
+    payload = json.dumps({"key": key, "origin": WORKER_ID, "ts": time.time()})
+    statement = text("SELECT pg_notify(:channel, :payload)")
+    params = {"channel": CHANNEL, "payload": payload}
+    try:
+        if db is not None:
+            # In a savepoint: a failed NOTIFY must not abort the writer's transaction
+            with db.begin_nested():
+                db.execute(statement, params)
+        else:
+            with engine.begin() as conn:
+                conn.execute(statement, params)
+    except Exception as e:
+        # Losing a notification only means a stale cache entry on other workers
+        print(f"⚠️ Failed to publish cache invalidation '{key}': {e}")
+
+
+class KeyedCache:
+    """
+    In-process dict cache that drops entries when "<prefix><key>" is
+    published on the bus.
+
+    A reader that loads a value from the database should take
+    generation(key) before the read and pass it to set(): if the key was
+    invalidated in between, the value may already be stale and is not
+    cached. Invalidations are remembered for the last max_tracked keys; a
+    reader that started before an older one was forgotten just skips
+    caching once.
+    """
+
+    def __init__(self, prefix: str, max_tracked: int = 10_000):
+        self.prefix = prefix
+        self.max_tracked = max_tracked
+        self._data = {}
+        # Invalidations so far; key -> number of its last one, oldest first
+        self._seq = 0
+        self._invalidated = OrderedDict()
+        # Number of the newest invalidation no longer tracked per key
+        self._floor = 0
+        self._cache_lock = threading.Lock()
+        subscribe(prefix, self._on_invalidate)
+
+    def _on_invalidate(self, key: str):
+        suffix = key[len(self.prefix):]
+        if suffix == "*" or not suffix:
+            self.clear()
+            return
+        with self._cache_lock:
+            self._seq += 1
+            self._invalidated[suffix] = self._seq
+            self._invalidated.move_to_end(suffix)
+            while len(self._invalidated) > self.max_tracked:
+                _, self._floor = self._invalidated.popitem(last=False)
+            self._data.pop(suffix, None)
+
+    def generation(self, key: str) -> int:
+        with self._cache_lock:
+            return self._seq
+
+    def get(self, key: str):
+        return self._data.get(key)
+
+    def set(self, key: str, value, generation: Optional[int] = None) -> bool:
+        """Caches value, unless key was invalidated since generation was taken."""
+        with self._cache_lock:
+            if generation is not None and self._invalidated.get(key, self._floor) > generation:
+                return False
+            self._data[key] = value
+            return True
+
+    def clear(self):
+        with self._cache_lock:
+            self._seq += 1
+            self._floor = self._seq
+            self._invalidated.clear()
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _Listener(threading.Thread):
+    """LISTENs on a dedicated (non-pooled) connection and dispatches keys."""
+
+    def __init__(self, poll_seconds: float = 1.0):
+        super().__init__(name="cache-invalidation-listener", daemon=True)
+        self.poll_seconds = poll_seconds
+        self._stop_event = threading.Event()
+        self.ready = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _connect(self):
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        conn = psycopg2.connect(dsn)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        conn.cursor().execute(f"LISTEN {CHANNEL};")
+        return conn
+
+    def _handle(self, notify):
+        try:
+            message = json.loads(notify.payload)
+        except ValueError:
+            return
+        if message.get("origin") == WORKER_ID:
+            return
+        if message.get("ts"):
+            propagation_latencies.append(time.time() - message["ts"])
+        _dispatch(message["key"])
+
+    def run(self):
+        backoff = 1.0
+        while not self._stop_event.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                self.ready.set()
+                backoff = 1.0
+                # Anything published while we were disconnected is lost: start clean
+                _dispatch("*")
+                while not self._stop_event.is_set():
+                    if select.select([conn], [], [], self.poll_seconds) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._handle(conn.notifies.pop(0))
+            except Exception as e:
+                print(f"⚠️ Cache invalidation listener error: {e} (reconnecting in {backoff:.0f}s)")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+
+_listener: Optional[_Listener] = None
+
+
+def start_listener(timeout: float = 5.0):
+    """Starts the background listener (idempotent)."""
+    global _listener
+    if _listener and _listener.is_alive():
+        return
+    _listener = _Listener()
+    _listener.start()
+    if not _listener.ready.wait(timeout):
+        print("⚠️ Cache invalidation listener not connected yet; caches on this worker may be stale")
+
+
+def stop_listener():
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener.join(timeout=5)
+        _listener = None
@@ -0,0 +1,349 @@
+"""
+"Which card should I get?" - every card in the catalog scored on a user's spend.
+
+The catalog is every distinct card ever stored (get_catalog_cards), turned
+into arrays once per worker with the optimizer's card_terms:
+
+- an inverted index from each lowercased rule merchant to its postings
+  (card, rule order, rate, fallback rate, cap group), plus every substring
+  of those merchants -> the merchants containing it, so a spend line finds
+  its rules in both directions reward_engine.match_rule allows (a rule
+  merchant inside the line, the line inside a rule merchant) without
+  looking at the cards
+- exclusion term -> cards excluding it
+- per card: generic offer, fee, fee-waiver spend; per cap group: annual cap
+  spend; milestones as (card, threshold, points)
+
+A user's profile is their last 12 months of spend from the rollups,
+annualized over the months since their first spend in that window
+(get_spend_profile); fewer than CARD_SUGGESTION_MIN_MONTHS of them is
+flagged as thin_history. Each line is resolved through the index,
+then all cards are scored in one pass over (lines x cards) arrays as if the
+card carried all of the spend: rate until the cap group's annual cap is
+used up, fallback rate beyond it, milestones reached by the card's spend,
+net of the annual fee unless the spend waives it.
+
+The catalog is rebuilt after a card write is published on the cache bus
+("cards:"), at most every CARD_CATALOG_REFRESH_SECONDS and in the
+background; until then suggestions use the previous catalog.
+"""
+import os
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+from app.db.card_repository import card_key, get_catalog_cards, get_user_card_keys
+from app.db.database import SessionLocal
+from app.services.cache_bus import subscribe
+from app.services.portfolio_optimizer import card_terms
+from app.services.reward_engine import POINT_VALUE_INR
+from app.services.spend_service import get_spend_profile
+
+CARD_CATALOG_REFRESH_SECONDS = float(os.getenv("CARD_CATALOG_REFRESH_SECONDS", "60"))
+
+# Largest profile lines scored individually; the rest earn each card's generic rate
+PROFILE_MAX_LINES = int(os.getenv("CARD_SUGGESTION_MAX_LINES", "200"))
+
+# Profiles covering fewer months are extrapolated from too little to trust
+PROFILE_MIN_MONTHS = int(os.getenv("CARD_SUGGESTION_MIN_MONTHS", "3"))
+
+# Inputs up to this length look up the index with all their substrings
+_MAX_PROBE_LENGTH = 64
+
+_NO_GROUP = -1
+
+
+class _Catalog:
+    """Immutable array view of the catalog cards."""
+
+    def __init__(self, cards: list):
+        self.cards = cards
+        self.keys = {}
+        count = len(cards)
+        self.generic_rate = np.zeros(count)
+        self.generic_fallback = np.zeros(count)
+        self.generic_group = np.full(count, _NO_GROUP, dtype=np.int64)
+        self.fee = np.zeros(count)
+        self.waiver_spend = np.full(count, np.inf)
+
+        group_ids, caps = {}, []
+        postings = {}
+        exclusions = {}
+        milestones = []
+
+        def group_of(c, key):
+            if key is None:
+                return _NO_GROUP
+            gid = group_ids.get((c, key))
+            if gid is None:
+                gid = group_ids[(c, key)] = len(caps)
+                caps.append(terms["caps"][key])
+            return gid
+
+        for c, card in enumerate(cards):
+            self.keys.setdefault(card_key(card.issuer, card.card_name), c)
+            terms = card_terms(card)
+            rate, key, fallback = terms["generic"]
+            self.generic_rate[c], self.generic_fallback[c] = rate, fallback
+            self.generic_group[c] = group_of(c, key)
+            for order, (merchants, (rate, key, fallback)) in enumerate(terms["specific"]):
+                gid = group_of(c, key)
+                for merchant in merchants:
+                    postings.setdefault(merchant, []).append((c, order, rate, fallback, gid))
+            for term in terms["exclusions"]:
+                exclusions.setdefault(term, []).append(c)
+
+            self.fee[c] = terms["fee"]
+            for threshold, points, label in terms["unlocks"]:
+                if label == "Annual fee waiver":
+                    self.waiver_spend[c] = threshold
+                else:
+                    milestones.append((c, threshold, points))
+
+        self.cap = np.array(caps, dtype=float)
+        # merchant -> (cards, rule order, rate, fallback, group) arrays
+        self.postings = {}
+        for merchant, rows in postings.items():
+            cards_, order, rate, fallback, gid = zip(*rows)
+            self.postings[merchant] = (np.array(cards_), np.array(order), np.array(rate), np.array(fallback),
+                                       np.array(gid))
+        self.containing = {}
+        for merchant in self.postings:
+            for start in range(len(merchant)):
+                for end in range(start + 1, len(merchant) + 1):
+                    self.containing.setdefault(merchant[start:end], set()).add(merchant)
+        self.exclusions = {term: np.array(cards_) for term, cards_ in exclusions.items()}
+        self.milestone_card = np.array([m[0] for m in milestones], dtype=np.int64)
+        self.milestone_threshold = np.array([m[1] for m in milestones], dtype=float)
+        self.milestone_points = np.array([m[2] for m in milestones], dtype=float)
+
+    def __len__(self):
+        return len(self.cards)
+
+    def matching_merchants(self, merchant_input: str) -> set:
+        """Indexed rule merchants that match the input (see match_rule)."""
+        if len(merchant_input) <= _MAX_PROBE_LENGTH:
+            probes = {merchant_input[i:j] for i in range(len(merchant_input))
+                      for j in range(i + 1, len(merchant_input) + 1)}
+            probes.add("")
+            found = {m for m in probes if m in self.postings}
+        else:
+            found = {m for m in self.postings if m in merchant_input}
+        return found | self.containing.get(merchant_input, set())
+
+    def line_offers(self, merchant_input: str):
+        """
+        First matching specific rule of every card that has one, as arrays
+        (cards, rate, fallback, group), or None.
+        """
+        merchants = self.matching_merchants(merchant_input) if merchant_input else ()
+        if not merchants:
+            return None
+        cards_, order, rate, fallback, gid = (np.concatenate(parts) for parts in
+                                              zip(*(self.postings[m] for m in merchants)))
+        # Rules in card order, then rule order: the first row of each card wins
+        ranked = np.lexsort((order, cards_))
+        first = ranked[np.unique(cards_[ranked], return_index=True)[1]]
+        return cards_[first], rate[first], fallback[first], gid[first]
+
+
+def score_lines(catalog: _Catalog, lines: List[dict]) -> dict:
+    """
+    Annual value of every catalog card carrying all of the given spend.
+
+    Args:
+        lines: [{"merchant", "category", "annual_amount"}]
+
+    Returns:
+        Arrays over the catalog cards: "spend" (eligible), "points",
+        "milestone_points", "fee_waived", "net_inr", plus "line_points"
+        (lines x cards) for explaining a card's value.
+    """
+    count = len(catalog)
+    amounts = np.array([line["annual_amount"] for line in lines], dtype=float)
+    rate = np.tile(catalog.generic_rate, (len(lines), 1))
+    fallback = np.tile(catalog.generic_fallback, (len(lines), 1))
+    group = np.tile(catalog.generic_group, (len(lines), 1))
+    eligible = np.ones((len(lines), count), dtype=bool)
+
+    for i, line in enumerate(lines):
+        category = (line.get("category") or "").lower().strip()
+        # Lines with neither merchant nor category earn the generic rate
+        merchant_input = (line.get("merchant") or category).lower().strip()
+        offers = catalog.line_offers(merchant_input)
+        if offers is not None:
+            cards_, rate_, fallback_, gid = offers
+            rate[i, cards_], fallback[i, cards_], group[i, cards_] = rate_, fallback_, gid
+        for term in {category, merchant_input} - {""}:
+            excluded = catalog.exclusions.get(term)
+            if excluded is not None:
+                eligible[i, excluded] = False
+
+    spend = np.where(eligible, amounts[:, None], 0.0)
+    capped = group != _NO_GROUP
+    # Share of each cap group's spend within its annual cap
+    group_spend = np.bincount(group[capped], weights=spend[capped], minlength=len(catalog.cap))
+    within = np.ones(len(catalog.cap))
+    over = group_spend > catalog.cap
+    within[over] = catalog.cap[over] / group_spend[over]
+    share = np.ones_like(spend)
+    share[capped] = within[group[capped]]
+
+    line_points = spend * (share * rate + (1.0 - share) * fallback)
+    points = line_points.sum(axis=0)
+    card_spend = spend.sum(axis=0)
+
+    reached = catalog.milestone_threshold <= card_spend[catalog.milestone_card] + 1e-6
+    milestone_points = np.bincount(catalog.milestone_card[reached], weights=catalog.milestone_points[reached],
+                                   minlength=count)
+    fee_waived = card_spend + 1e-6 >= catalog.waiver_spend
+    fee_paid = np.where(fee_waived, 0.0, catalog.fee)
+    return {
+        "spend": card_spend,
+        "points": points,
+        "milestone_points": milestone_points,
+        "fee_waived": fee_waived,
+        "net_inr": (points + milestone_points) * POINT_VALUE_INR - fee_paid,
+        "line_points": line_points,
+    }
+
+
+def _trim_profile(lines: List[dict]) -> List[dict]:
+    """The PROFILE_MAX_LINES largest lines, the rest pooled into one unlabeled line."""
+    if len(lines) <= PROFILE_MAX_LINES:
+        return lines
+    lines = sorted(lines, key=lambda line: line["annual_amount"], reverse=True)
+    rest = sum(line["annual_amount"] for line in lines[PROFILE_MAX_LINES:])
+    return lines[:PROFILE_MAX_LINES] + [{"merchant": None, "category": None, "annual_amount": rest}]
+
+
+class CardCatalog:
+    def __init__(self, refresh_seconds: float = CARD_CATALOG_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._catalog: Optional[_Catalog] = None
+        self._built_at = 0.0
+        self._stale = True
+        self._rebuilding = False
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.last_build_ms = 0.0
+        self.suggestions = 0
+        self.suggestion_ms = 0.0
+        subscribe("cards:", self._on_invalidate)
+
+    def _on_invalidate(self, key: str):
+        self._stale = True
+
+    def _build(self):
+        start = time.perf_counter()
+        # Cleared first: a write published during the load marks it stale again
+        self._stale = False
+        db = SessionLocal()
+        try:
+            cards = get_catalog_cards(db)
+        finally:
+            db.close()
+        catalog = _Catalog(cards)
+        self._catalog, self._built_at = catalog, time.monotonic()
+        self.builds += 1
+        self.last_build_ms = (time.perf_counter() - start) * 1000
+        return catalog
+
+    def _rebuild_in_background(self):
+        try:
+            with self._lock:
+                self._build()
+        except Exception as e:
+            self._stale = True
+            print(f"⚠️ Card catalog rebuild failed: {e}")
+        finally:
+            self._rebuilding = False
+
+    def get(self) -> _Catalog:
+        """The current catalog; the first call builds it."""
+        catalog = self._catalog
+        if catalog is None:
+            with self._lock:
+                return self._catalog or self._build()
+        if self._stale and not self._rebuilding and time.monotonic() - self._built_at >= self.refresh_seconds:
+            self._rebuilding = True
+            threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+        return catalog
+
+    def suggest(self, user_id: str, limit: int = 10, include_owned: bool = False) -> dict:
+        """
+        The catalog cards worth most on the user's last 12 months of spend,
+        best first. Cards the user already has are left out unless
+        include_owned.
+        """
+        catalog = self.get()
+        start = time.perf_counter()
+        db = SessionLocal()
+        try:
+            profile = get_spend_profile(db, user_id)
+            owned_keys = get_user_card_keys(db, user_id)
+        finally:
+            db.close()
+
+        covered = profile["months_covered"]
+        result = {"catalog_size": len(catalog), "profile_months": covered,
+                  "months_with_spend": profile["months_with_spend"],
+                  "thin_history": covered < PROFILE_MIN_MONTHS,
+                  "annual_spend": round(sum(line["annual_amount"] for line in profile["lines"]), 2),
+                  "suggestions": []}
+        if not profile["lines"] or not len(catalog):
+            return result
+
+        lines = _trim_profile(profile["lines"])
+        scores = score_lines(catalog, lines)
+        owned = np.zeros(len(catalog), dtype=bool)
+        owned[[catalog.keys[key] for key in owned_keys if key in catalog.keys]] = True
+
+        net = np.where(owned & (not include_owned), -np.inf, scores["net_inr"])
+        limit = min(limit, int(np.isfinite(net).sum()))
+        top = np.argpartition(-net, limit - 1)[:limit] if limit else np.array([], dtype=np.int64)
+        top = top[np.argsort(-net[top], kind="stable")]
+
+        for c in top:
+            card = catalog.cards[c]
+            earners = np.argsort(-scores["line_points"][:, c])[:3]
+            result["suggestions"].append({
+                "card_name": card.card_name,
+                "issuer": card.issuer,
+                "annual_fee": card.annual_fee,
+                "annual_fee_inr": float(catalog.fee[c]),
+                "fee_waived": bool(scores["fee_waived"][c]),
+                "annual_reward_points": round(float(scores["points"][c]), 2),
+                "annual_rewards_inr": round(float(scores["points"][c]) * POINT_VALUE_INR, 2),
+                "annual_milestone_value_inr": round(float(scores["milestone_points"][c]) * POINT_VALUE_INR, 2),
+                "net_annual_value_inr": round(float(scores["net_inr"][c]), 2),
+                "owned": bool(owned[c]),
+                "top_earners": [
+                    {"merchant": lines[i]["merchant"], "category": lines[i]["category"],
+                     "annual_amount": round(lines[i]["annual_amount"], 2),
+                     "annual_points": round(float(scores["line_points"][i, c]), 2)}
+                    for i in earners if scores["line_points"][i, c] > 0
+                ],
+            })
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.suggestions += 1
+        self.suggestion_ms += elapsed_ms
+        result["elapsed_ms"] = round(elapsed_ms, 2)
+        return result
+
+    def report(self) -> dict:
+        catalog = self._catalog
+        return {
+            "cards": len(catalog) if catalog else 0,
+            "indexed_merchants": len(catalog.postings) if catalog else 0,
+            "builds": self.builds,
+            "last_build_ms": round(self.last_build_ms, 1),
+            "stale": self._stale,
+            "suggestions": self.suggestions,
+            "avg_suggestion_ms": round(self.suggestion_ms / self.suggestions, 2) if self.suggestions else 0.0,
+        }
+
+
+card_catalog = CardCatalog()
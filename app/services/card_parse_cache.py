@@ -0,0 +1,95 @@
+"""
+Postgres cache for structured card extraction.
+
+Users paste the same issuer text again and again; the structured LLM call
+behind /add_card costs seconds and tokens each time. Results are cached in
+card_parse_cache under a hash of:
+    normalized text + system prompt + CreditCard schema + model name
+so editing the prompt or the schema (or switching models) changes every
+key and the old entries are simply never read again.
+"""
+import hashlib
+import json
+import re
+import unicodedata
+from typing import Callable, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from app.db.database import SessionLocal
+from app.schemas.credit_card import CreditCard
+
+
+def _sha256(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+# Changes whenever a field of CreditCard (or a nested model) changes
+SCHEMA_VERSION = _sha256(json.dumps(CreditCard.model_json_schema(), sort_keys=True))[:16]
+
+
+def normalize_card_text(raw: str) -> str:
+    """Unicode-normalized text with whitespace collapsed (case is kept: it matters for names)."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", raw or "")).strip()
+
+
+def card_parse_key(raw: str, system_prompt: str, model: str = "") -> str:
+    return _sha256("\x00".join([normalize_card_text(raw), _sha256(system_prompt), SCHEMA_VERSION, model]))
+
+
+def get_cached_card(content_hash: str) -> Optional[CreditCard]:
+    """Cached extraction for the key (counting the hit), or None."""
+    with SessionLocal() as db:
+        row = db.execute(text("""
+            UPDATE card_parse_cache
+            SET hit_count = hit_count + 1, last_hit_at = now()
+            WHERE content_hash = :content_hash
+            RETURNING card_json
+        """), {"content_hash": content_hash}).fetchone()
+        db.commit()
+    if row is None:
+        return None
+    try:
+        return CreditCard.model_validate(row.card_json)
+    except ValidationError:
+        # Written by an incompatible schema under the same key: treat as a miss
+        return None
+
+
+def store_cached_card(content_hash: str, system_prompt: str, card: CreditCard):
+    with SessionLocal() as db:
+        db.execute(text("""
+            INSERT INTO card_parse_cache (content_hash, prompt_hash, schema_version, card_json)
+            VALUES (:content_hash, :prompt_hash, :schema_version, CAST(:card_json AS JSON))
+            ON CONFLICT (content_hash)
+            DO UPDATE SET card_json = EXCLUDED.card_json, created_at = now()
+        """), {
+            "content_hash": content_hash,
+            "prompt_hash": _sha256(system_prompt)[:16],
+            "schema_version": SCHEMA_VERSION,
+            "card_json": json.dumps(card.model_dump(mode="json"))
+        })
+        db.commit()
+
+
+def extract_card_cached(raw: str, system_prompt: str, extract: Callable[[], CreditCard], model: str = "") -> CreditCard:
+    """
+    Returns the cached CreditCard for (raw, system_prompt), or runs
+    extract() and caches its validated result. Cache errors never fail the
+    parse; they only cost the LLM call.
+    """
+    content_hash = card_parse_key(raw, system_prompt, model)
+    try:
+        cached = get_cached_card(content_hash)
+        if cached is not None:
+            print(f"⚡ Card extraction cache hit ({content_hash[:12]})")
+            return cached
+    except Exception as e:
+        print(f"⚠️ Card parse cache lookup failed: {e}")
+
+    card = extract()
+    try:
+        store_cached_card(content_hash, system_prompt, CreditCard.model_validate(card.model_dump()))
+    except Exception as e:
+        print(f"⚠️ Could not cache card extraction: {e}")
+    return card
@@ -0,0 +1,149 @@
+"""
+Background health snapshot for the liveness / readiness probes.
+
+Probes read a snapshot that a background task refreshes every
+HEALTH_REFRESH_SECONDS, so load-balancer polling never touches the
+database. One refresh uses one pooled connection and one query.
+
+"status" (/health) keeps its original meaning: healthy while the database
+is reachable and the graph is initialized. "ready" (/readyz) additionally
+requires the checkpoint tables, a pool below POOL_SATURATION_LIMIT and a
+fresh snapshot.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from app.db.database import engine
+
+HEALTH_REFRESH_SECONDS = float(os.getenv("HEALTH_REFRESH_SECONDS", "10"))
+
+# Snapshot older than this many refresh intervals is treated as not ready
+HEALTH_STALE_INTERVALS = 3
+
+# Pool usage (checked out / capacity) at which the instance reports not ready
+POOL_SATURATION_LIMIT = float(os.getenv("HEALTH_POOL_SATURATION_LIMIT", "0.9"))
+
+CHECKPOINT_TABLES = ("checkpoints", "checkpoint_blobs", "checkpoint_writes")
+
+
+def _pool_status() -> dict:
+    pool = engine.pool
+    try:
+        checked_out = pool.checkedout()
+        capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    except AttributeError:
+        # Pools without sizing (NullPool, StaticPool)
+        return {"checked_out": None, "capacity": None, "saturation": 0.0}
+    return {
+        "checked_out": checked_out,
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3) if capacity else 0.0
+    }
+
+
+def collect_health(graph_ready: bool) -> dict:
+    """Runs the checks once (blocking)."""
+    snapshot = {
+        "database": "disconnected",
+        "checkpoint_tables": "unknown",
+        "graph": "initialized" if graph_ready else "not_initialized",
+        "pool": _pool_status(),
+    }
+
+    start = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            # Connectivity and table presence in one round-trip
+            row = conn.execute(text("""
+                SELECT
+                    to_regclass('public.checkpoints') IS NOT NULL,
+                    to_regclass('public.checkpoint_blobs') IS NOT NULL,
+                    to_regclass('public.checkpoint_writes') IS NOT NULL
+            """)).fetchone()
+        snapshot["database"] = "connected"
+        tables = [name for name, present in zip(CHECKPOINT_TABLES, row) if present]
+        snapshot["checkpoint_tables"] = tables if tables else "missing"
+    except Exception as e:
+        snapshot["database"] = f"error: {str(e)}"
+    snapshot["database_latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    snapshot["checked_at"] = datetime.now(timezone.utc).isoformat()
+    snapshot["_checked_monotonic"] = time.monotonic()
+    return snapshot
+
+
+class HealthMonitor:
+    """Keeps a health snapshot fresh in a background asyncio task."""
+
+    def __init__(self, refresh_seconds: float = HEALTH_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.snapshot: Optional[dict] = None
+        self._graph_ready: Callable[[], bool] = lambda: False
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh(self):
+        self.snapshot = await asyncio.to_thread(collect_health, self._graph_ready())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"⚠️ Health refresh failed: {e}")
+
+    async def start(self, graph_ready: Callable[[], bool]):
+        """Takes a first snapshot, then refreshes in the background."""
+        self._graph_ready = graph_ready
+        await self.refresh()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def report(self) -> dict:
+        """
+        The current snapshot with its age, the health status and the
+        readiness verdict. Never touches the database.
+        """
+        if self.snapshot is None:
+            return {"status": "unhealthy", "ready": False, "reasons": ["no health snapshot yet"]}
+
+        report = {k: v for k, v in self.snapshot.items() if not k.startswith("_")}
+        age = time.monotonic() - self.snapshot["_checked_monotonic"]
+        report["snapshot_age_seconds"] = round(age, 2)
+
+        # Unhealthy: the app cannot serve at all
+        down = []
+        if report["database"] != "connected":
+            down.append("database unreachable")
+        if not self._graph_ready():
+            down.append("graph not initialized")
+
+        reasons = list(down)
+        if report["checkpoint_tables"] != list(CHECKPOINT_TABLES):
+            reasons.append("checkpoint tables missing")
+        if report["pool"]["saturation"] >= POOL_SATURATION_LIMIT:
+            reasons.append("connection pool saturated")
+        if age > self.refresh_seconds * HEALTH_STALE_INTERVALS:
+            reasons.append("health snapshot is stale")
+
+        report["graph"] = "initialized" if self._graph_ready() else "not_initialized"
+        report["ready"] = not reasons
+        report["status"] = "healthy" if not down else "unhealthy"
+        if reasons:
+            report["reasons"] = reasons
+        return report
+
+
+health_monitor = HealthMonitor()
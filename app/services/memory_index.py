@@ -0,0 +1,280 @@
+"""
+In-process per-user vector index for memory search.
+
+Most users have a few hundred memories and transactions, yet every vector
+search was a Postgres round-trip over their rows. With
+MEMORY_INDEX_ENABLED=true, the first search for a user loads their
+embeddings (normalized, float32, one contiguous matrix per user and kind)
+and later searches are a single matrix-vector product in this process.
+
+- Users with more than MEMORY_INDEX_MAX_ROWS rows of a kind stay on
+  pgvector (search() returns None and the caller runs the SQL).
+- Entries are evicted least-recently-used once their total size exceeds
+  MEMORY_INDEX_BUDGET_MB.
+- save_*_memory in this worker appends the new row in place (add()).
+  Other workers drop their entry on the cache bus
+  ("transactions:<user_id>" / "memories:<user_id>") and reload it on the
+  next search, as does a statement import here.
+
+Kinds: "memories" (user_memories) and "transactions" (transaction_history).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from app.db.database import SessionLocal
+from app.services.cache_bus import subscribe
+from app.utils.vectors import EMBEDDING_STORAGE, embedding_model_id
+
+MEMORY_INDEX_ENABLED = os.getenv("MEMORY_INDEX_ENABLED", "false").lower() == "true"
+MEMORY_INDEX_BUDGET_MB = float(os.getenv("MEMORY_INDEX_BUDGET_MB", "256"))
+MEMORY_INDEX_MAX_ROWS = int(os.getenv("MEMORY_INDEX_MAX_ROWS", "5000"))
+
+# Rough size of the Python row tuple kept next to each vector
+_ROW_OVERHEAD_BYTES = 400
+
+# kind -> (table, columns returned with each hit)
+_SOURCES = {
+    "memories": ("user_memories", "id, memory_text, category, created_at"),
+    "transactions": ("transaction_history", "id, merchant, amount, category, description, created_at"),
+}
+
+
+class _Entry:
+    """One user's rows of one kind. oversized entries only remember to use SQL."""
+
+    def __init__(self, rows: list, matrix: np.ndarray, created: np.ndarray, oversized: bool = False):
+        self.rows = rows  # Column tuples (see _SOURCES), row i <-> matrix[i]
+        self.matrix = matrix  # (capacity, dims) float32, unit rows; the first `size` rows are live
+        self.created = created  # (capacity,) created_at as epoch seconds
+        self.size = len(rows)
+        self.ids = {row[0] for row in rows}
+        self.oversized = oversized
+
+    @classmethod
+    def too_big(cls):
+        return cls([], np.zeros((0, 0), np.float32), np.zeros(0), oversized=True)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + self.created.nbytes + self.size * _ROW_OVERHEAD_BYTES
+
+    def snapshot(self):
+        return self.rows[:self.size], self.matrix[:self.size], self.created[:self.size]
+
+    def append(self, row: tuple, vector: np.ndarray, created: float):
+        if self.size == len(self.matrix):
+            # Grow by doubling; readers keep the arrays they already took
+            capacity = max(2 * self.size, 16)
+            # An entry loaded with no rows has no width yet: take the vector's
+            matrix = np.zeros((capacity, self.matrix.shape[1] or vector.shape[0]), np.float32)
+            if self.size:
+                matrix[:self.size] = self.matrix[:self.size]
+            created_at = np.zeros(capacity)
+            created_at[:self.size] = self.created[:self.size]
+            self.matrix, self.created = matrix, created_at
+        self.matrix[self.size] = vector
+        self.created[self.size] = created
+        self.rows = self.rows + [row]
+        self.ids.add(row[0])
+        self.size += 1
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _parse_vectors(blobs: List[bytes]) -> np.ndarray:
+    """
+    Binary send format of n vector / halfvec values -> (n, dims) float32.
+    Each value is a 4-byte header (dims, unused) and big-endian floats;
+    about 5x faster to load than the text format.
+    """
+    if not blobs:
+        return np.zeros((0, 0), np.float32)
+    dtype = np.dtype(">f2" if EMBEDDING_STORAGE == "halfvec" else ">f4")
+    flat = np.frombuffer(b"".join(bytes(b) for b in blobs), dtype=dtype).reshape(len(blobs), -1)
+    return flat[:, 4 // dtype.itemsize:].astype(np.float32)
+
+
+class MemoryIndex:
+    def __init__(self, budget_mb: float = MEMORY_INDEX_BUDGET_MB, max_rows: int = MEMORY_INDEX_MAX_ROWS):
+        self.budget_bytes = int(budget_mb * 2**20)
+        self.max_rows = max_rows
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        # Loads in flight; a write meanwhile flags theirs stale so it is not kept
+        self._loading = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.searches = 0
+        self.loads = 0
+        self.fallbacks = 0
+        self.evictions = 0
+        for kind in _SOURCES:
+            subscribe(f"{kind}:", self._on_invalidate)
+
+    # -- cache maintenance ---------------------------------------------------
+
+    def _on_invalidate(self, key: str):
+        kind, _, user_id = key.partition(":")
+
+        def matches(k):
+            return key == "*" or (k[0] == kind and user_id in ("*", "", k[1]))
+
+        with self._lock:
+            for k in [k for k in self._entries if matches(k)]:
+                self._bytes -= self._entries.pop(k).nbytes
+            for k in self._loading:
+                if matches(k):
+                    self._loading[k] = False
+
+    def clear(self):
+        self._on_invalidate("*")
+
+    def _load(self, kind: str, user_id: str) -> _Entry:
+        table, columns = _SOURCES[kind]
+        params = {"user_id": user_id, "embedding_model": embedding_model_id()}
+        with SessionLocal() as db:
+            count = db.execute(text(f"""
+                SELECT count(*) FROM {table}
+                WHERE user_id = :user_id AND embedding_model = :embedding_model AND embedding IS NOT NULL
+            """), params).scalar()
+            if count > self.max_rows:
+                return _Entry.too_big()
+            result = db.execute(text(f"""
+                SELECT {columns}, extract(epoch FROM created_at) AS created_epoch,
+                       {EMBEDDING_STORAGE}_send(embedding) AS vector
+                FROM {table}
+                WHERE user_id = :user_id AND embedding_model = :embedding_model AND embedding IS NOT NULL
+                ORDER BY id
+            """), params).fetchall()
+        width = len(columns.split(","))
+        rows = [tuple(r[:width]) for r in result]
+        created = np.array([float(r.created_epoch or 0) for r in result])
+        return _Entry(rows, _unit(_parse_vectors([r.vector for r in result])), created)
+
+    def _get(self, kind: str, user_id: str) -> _Entry:
+        key = (kind, user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+            self._loading[key] = True
+
+        try:
+            entry = self._load(kind, user_id)
+        except Exception:
+            with self._lock:
+                self._loading.pop(key, None)
+            raise
+        with self._lock:
+            self.loads += 1
+            if self._loading.pop(key, False) and key not in self._entries:
+                self._entries[key] = entry
+                self._bytes += entry.nbytes
+                self._evict()
+        return entry
+
+    def _evict(self):
+        """Drops least recently used entries over the budget (caller holds the lock)."""
+        while self._bytes > self.budget_bytes and len(self._entries) > 1:
+            key, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.nbytes
+            self.evictions += 1
+
+    # -- public API ----------------------------------------------------------
+
+    def search(self, kind: str, user_id: str, vector: list, limit: int, threshold: float,
+               recency_weight: float = 0.0, half_life_days: float = 90.0,
+               max_age_days: Optional[float] = None) -> Optional[list]:
+        """
+        Top rows by cosine similarity >= threshold, as (row, similarity, score)
+        with score = similarity x recency factor (see memory_service), best
+        first. None when the user is served by pgvector instead.
+        """
+        if not MEMORY_INDEX_ENABLED:
+            return None
+        try:
+            entry = self._get(kind, user_id)
+        except Exception as e:
+            print(f"⚠️ Memory index load failed for {user_id}: {e}")
+            entry = None
+        if entry is None or entry.oversized:
+            with self._lock:
+                self.fallbacks += 1
+            return None
+
+        rows, matrix, created = entry.snapshot()
+        with self._lock:
+            self.searches += 1
+        if not rows:
+            return []
+
+        query = _unit(np.asarray(vector, dtype=np.float32))
+        similarity = matrix @ query
+        age_days = (time.time() - created) / 86400.0
+        score = similarity * (1 - recency_weight + recency_weight * np.power(0.5, age_days / half_life_days))
+
+        mask = similarity >= threshold
+        if max_age_days is not None:
+            mask &= age_days < max_age_days
+        candidates = np.flatnonzero(mask)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-score[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-score[candidates], kind="stable")]
+        return [(rows[i], float(similarity[i]), float(score[i])) for i in candidates]
+
+    def add(self, kind: str, user_id: str, row: tuple, vector: list, created: float = None):
+        """
+        Appends a row saved by this worker to the user's entry, if loaded.
+        Never raises: the row is already committed, so on failure the entry
+        is dropped and reloaded by the next search.
+        """
+        try:
+            self._add(kind, user_id, row, vector, created)
+        except Exception as e:
+            print(f"⚠️ Memory index update failed for {user_id}, dropping the entry: {e}")
+            with self._lock:
+                self._entries.pop((kind, user_id), None)
+                self._bytes = sum(entry.nbytes for entry in self._entries.values())
+
+    def _add(self, kind: str, user_id: str, row: tuple, vector: list, created: float = None):
+        key = (kind, user_id)
+        with self._lock:
+            if key in self._loading:
+                self._loading[key] = False
+            entry = self._entries.get(key)
+            if entry is None or entry.oversized or row[0] in entry.ids:
+                return
+            if entry.size >= self.max_rows:
+                self._bytes -= self._entries.pop(key).nbytes
+                return
+            self._entries.move_to_end(key)
+            self._bytes -= entry.nbytes
+            entry.append(row, _unit(np.asarray(vector, dtype=np.float32)), created or time.time())
+            self._bytes += entry.nbytes
+            self._evict()
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": MEMORY_INDEX_ENABLED,
+                "users": len({user for _, user in self._entries}),
+                "entries": len(self._entries),
+                "memory_mb": round(self._bytes / 2**20, 2),
+                "budget_mb": round(self.budget_bytes / 2**20, 1),
+                "max_rows": self.max_rows,
+                "searches": self.searches,
+                "loads": self.loads,
+                "fallbacks": self.fallbacks,
+                "evictions": self.evictions,
+            }
+
+
+memory_index = MemoryIndex()
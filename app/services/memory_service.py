@@ -1,15 +1,36 @@
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import List, NamedTuple
 from sqlalchemy import text
-from app.db.database import SessionLocal
+from app.db.database import SessionLocal, engine
 from app.db.models import TransactionHistory, UserMemory
-from app.utils.vectors import get_text_embedding
+from app.utils.vectors import embedding_model_id, get_text_embedding
+from app.services.spend_service import record_rule_spend, record_spend_rollups
+from app.services.cache_bus import publish
 
-def save_transaction_memory(user_id: str, merchant: str, amount: float, category: str, desc: str = ""):
+def transaction_semantic_text(merchant: str, category: str, desc: str = "") -> str:
+    """Text that is embedded for a transaction (see save_transaction_memory)."""
+    # Combining fields helps the AI understand the *full* context
+    return f"Merchant: {merchant}, Category: {category}, Description: {desc}"
+
+
+def save_transaction_memory(user_id: str, merchant: str, amount: float, category: str, desc: str = "",
+                            card_name: str = None, reward: dict = None):
     """
     Saves a transaction with its semantic meaning.
+    
+    Args:
+        card_name: Card the spend is attributed to (optional).
+        reward: Breakdown entry from the reward engine for that card. When it
+                names a reward rule, the rule's spend ledger is updated in the
+                same commit.
     """
     # 1. Create rich context for the vector
-    # Combining fields helps the AI understand the *full* context
-    semantic_text = f"Merchant: {merchant}, Category: {category}, Description: {desc}"
+    semantic_text = transaction_semantic_text(merchant, category, desc)
     
     # 2. Generate Vector
     vector = get_text_embedding(semantic_text)
@@ -22,13 +43,47 @@ def save_transaction_memory(user_id: str, merchant: str, amount: float, category
             amount=amount,
             category=category,
             description=desc,
-            embedding=vector  # <--- Storing the 'brain'
+            card_name=card_name,
+            embedding=vector,  # <--- Storing the 'brain'
+            embedding_model=embedding_model_id()
         )
         db.add(txn)
+
+        # Keep the spend rollups and the cap ledger in step with the recorded spend
+        record_spend_rollups(
+            db,
+            user_id=user_id,
+            amount=amount,
+            category=category,
+            merchant=merchant,
+            card_name=card_name
+        )
+        if card_name and reward and reward.get("rule_key") and reward.get("period_key"):
+            record_rule_spend(
+                db,
+                user_id=user_id,
+                card_name=card_name,
+                rule_key=reward["rule_key"],
+                period_key=reward["period_key"],
+                spend=amount,
+                points=reward.get("rule_points", 0.0)
+            )
+
+        db.flush()
+        row = (txn.id, merchant, amount, category, desc, datetime.now(timezone.utc))
+        # This worker's index gets the row below; other workers reload theirs
+        publish(f"transactions:{user_id}", db, local=False)
         db.commit()
+        _memory_index().add("transactions", user_id, row, vector, time.time())
         print(f"🧠 Saved memory for: {merchant}")
 
 
+def _memory_index():
+    """The in-process vector index, imported on first use (it loads numpy)."""
+    from app.services.memory_index import memory_index
+    return memory_index
+
+
 def semantic_search_transactions(user_id: str, query: str, limit: int = 5, threshold: float = 0.75):
     """
     Finds past transactions that match the user's current query.
@@ -42,6 +97,11 @@ def semantic_search_transactions(user_id: str, query: str, limit: int = 5, thres
     """
     # 1. Convert User Query to Vector
     query_vector = get_text_embedding(query)
+
+    # In-process index, when enabled and the user is small enough
+    hits = _memory_index().search("transactions", user_id, query_vector, limit, threshold)
+    if hits is not None:
+        return [RetrievedTransaction(*row, similarity, "vector") for row, similarity, _ in hits]
     
     # 2. SQL Query with Threshold Logic
     # We calculate 'similarity' as (1 - cosine_distance)
@@ -49,6 +109,7 @@ def semantic_search_transactions(user_id: str, query: str, limit: int = 5, thres
     sql = text("""
         WITH calculated_scores AS (
             SELECT 
+                id,
                 merchant, 
                 amount, 
                 category, 
@@ -56,7 +117,7 @@ def semantic_search_transactions(user_id: str, query: str, limit: int = 5, thres
                 created_at,
                 1 - (embedding <=> :vector) as similarity
             FROM transaction_history
-            WHERE user_id = :user_id
+            WHERE user_id = :user_id AND embedding_model = :embedding_model
         )
         SELECT * FROM calculated_scores
         WHERE similarity >= :threshold
@@ -68,6 +129,7 @@ def semantic_search_transactions(user_id: str, query: str, limit: int = 5, thres
         results = db.execute(sql, {
             "user_id": user_id, 
             "vector": str(query_vector), 
+            "embedding_model": embedding_model_id(),
             "threshold": threshold,
             "limit": limit
         }).fetchall()
@@ -75,6 +137,155 @@ def semantic_search_transactions(user_id: str, query: str, limit: int = 5, thres
     return results
 
 
+# ---------------------------------------------------------------------------
+# Hybrid transaction retrieval
+# ---------------------------------------------------------------------------
+
+# Chat words that never identify a merchant, category or description
+_QUERY_STOPWORDS = {
+    "the", "and", "for", "with", "from", "how", "much", "many", "did", "does", "was", "were", "have", "has",
+    "what", "when", "where", "which", "who", "why", "last", "this", "that", "week", "month", "year", "today",
+    "yesterday", "spend", "spent", "spending", "paid", "pay", "bought", "buy", "order", "ordered", "use",
+    "used", "card", "cards", "money", "total", "about", "any", "all", "you", "your", "can", "tell", "show",
+    "get", "got", "past", "recent", "recently", "time", "times", "there", "are", "just", "also"
+}
+
+# word_similarity() above which a query word is taken to name a stored merchant
+LEXICAL_MERCHANT_THRESHOLD = 0.6
+
+# Reciprocal-rank fusion constant (the usual 60): score = sum(1 / (k + rank))
+RRF_K = 60
+
+
+class RetrievedTransaction(NamedTuple):
+    id: int
+    merchant: str
+    amount: float
+    category: str
+    description: str
+    created_at: object
+    similarity: float  # Cosine similarity, or the lexical score for lexical-only hits
+    source: str  # "lexical", "vector" or "both"
+
+
+class _RetrievalStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.embedding_calls = 0
+        self.embedding_calls_avoided = 0
+
+    def record(self, embedding_calls: int, baseline_calls: int = 1):
+        """baseline_calls: embeddings the lookup took before hybrid / combined retrieval."""
+        with self._lock:
+            self.queries += 1
+            self.embedding_calls += embedding_calls
+            self.embedding_calls_avoided += baseline_calls - embedding_calls
+
+    def report(self) -> dict:
+        return {
+            "queries": self.queries,
+            "embedding_calls": self.embedding_calls,
+            "embedding_calls_avoided": self.embedding_calls_avoided,
+        }
+
+
+retrieval_stats = _RetrievalStats()
+
+
+def query_tokens(query: str) -> List[str]:
+    """Lowercase words of the query worth matching lexically."""
+    words = re.findall(r"[a-z0-9]+", (query or "").lower())
+    return list(dict.fromkeys(w for w in words if len(w) >= 3 and w not in _QUERY_STOPWORDS))
+
+
+@lru_cache(maxsize=None)
+def has_trigram_support() -> bool:
+    """pg_trgm installed (fuzzy merchant matching); otherwise prefix matching only."""
+    try:
+        with engine.connect() as conn:
+            return bool(conn.execute(text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")).scalar())
+    except Exception:
+        return False
+
+
+def _lexical_select(tokens: List[str]) -> str:
+    """
+    SELECT of the lexical transaction search (needs :user_id, :tokens,
+    :tsquery and :lexical_limit). Rows carry merchant_score (how well a
+    query word names the merchant, 0..1) and similarity, the best of
+    merchant_score and the full-text rank.
+    """
+    if has_trigram_support():
+        merchant_score = """
+            coalesce((SELECT max(word_similarity(tok, lower(merchant)))
+                      FROM unnest(CAST(:tokens AS text[])) AS tok), 0)"""
+        fuzzy_match = "OR lower(merchant) %> ANY(CAST(:tokens AS text[]))"
+    else:
+        merchant_score = """
+            CASE WHEN to_tsvector('simple', coalesce(merchant, '')) @@ to_tsquery('simple', :tsquery)
+                 THEN 1.0 ELSE 0.0 END"""
+        fuzzy_match = ""
+
+    return f"""
+        SELECT id, merchant, amount, category, description, created_at, merchant_score,
+               GREATEST(merchant_score, text_score) AS similarity
+        FROM (
+            SELECT id, merchant, amount, category, description, created_at,
+                   {merchant_score} AS merchant_score,
+                   ts_rank_cd(search_tsv, to_tsquery('simple', :tsquery)) AS text_score
+            FROM transaction_history
+            WHERE user_id = :user_id
+              AND (search_tsv @@ to_tsquery('simple', :tsquery) {fuzzy_match})
+        ) lexical
+        ORDER BY merchant_score DESC, text_score DESC, created_at DESC
+        LIMIT :lexical_limit
+    """
+
+
+def _lexical_params(tokens: List[str]) -> dict:
+    return {"tokens": tokens, "tsquery": " | ".join(f"{t}:*" for t in tokens)}
+
+
+def lexical_search_transactions(user_id: str, query: str, limit: int = 5) -> list:
+    """
+    Transactions whose merchant, category or description match words of the
+    query (full-text prefix match), or whose merchant is a fuzzy match of a
+    query word (trigram word similarity). No embedding call.
+    """
+    tokens = query_tokens(query)
+    if not tokens:
+        return []
+    with SessionLocal() as db:
+        return db.execute(text(_lexical_select(tokens)), {
+            "user_id": user_id, "lexical_limit": limit, **_lexical_params(tokens)
+        }).fetchall()
+
+
+def _rrf_merge(ranked_lists: dict, limit: int) -> List[RetrievedTransaction]:
+    """Reciprocal-rank fusion of {source: [rows]} keyed on transaction id."""
+    scores, rows, sources = {}, {}, {}
+    for source, ranked in ranked_lists.items():
+        for rank, row in enumerate(ranked, start=1):
+            scores[row.id] = scores.get(row.id, 0.0) + 1.0 / (RRF_K + rank)
+            sources.setdefault(row.id, set()).add(source)
+            # Prefer the vector row: it carries the cosine similarity
+            if row.id not in rows or source == "vector":
+                rows[row.id] = row
+
+    merged = []
+    for txn_id in sorted(scores, key=scores.get, reverse=True)[:limit]:
+        row = rows[txn_id]
+        source = "both" if len(sources[txn_id]) > 1 else next(iter(sources[txn_id]))
+        merged.append(RetrievedTransaction(row.id, row.merchant, row.amount, row.category, row.description,
+                                           row.created_at, float(row.similarity), source))
+    return merged
+
+
+def _names_merchant(lexical_rows) -> bool:
+    return any(row.merchant_score >= LEXICAL_MERCHANT_THRESHOLD for row in lexical_rows)
+
+
 def save_general_memory(user_id: str, text: str, category: str = "general"):
     """
     Saves a non-financial fact about the user.
@@ -88,10 +299,16 @@ def save_general_memory(user_id: str, text: str, category: str = "general"):
             user_id=user_id,
             memory_text=text,
             category=category,
-            embedding=vector
+            embedding=vector,
+            embedding_model=embedding_model_id()
         )
         db.add(memory)
+        db.flush()
+        row = (memory.id, text, category, datetime.now(timezone.utc))
+        # This worker's index gets the row below; other workers reload theirs
+        publish(f"memories:{user_id}", db, local=False)
         db.commit()
+        _memory_index().add("memories", user_id, row, vector, time.time())
         print(f"🧠 Saved General Memory: '{text}'")
 
 
@@ -107,6 +324,11 @@ def semantic_search_general_memories(user_id: str, query: str, limit: int = 5, t
     """
     # 1. Convert User Query to Vector
     query_vector = get_text_embedding(query)
+
+    # In-process index, when enabled and the user is small enough
+    hits = _memory_index().search("memories", user_id, query_vector, limit, threshold)
+    if hits is not None:
+        return [RetrievedMemory(*row, similarity, similarity) for row, similarity, _ in hits]
     
     # 2. SQL Query with Threshold Logic
     sql = text("""
@@ -117,7 +339,7 @@ def semantic_search_general_memories(user_id: str, query: str, limit: int = 5, t
                 created_at,
                 1 - (embedding <=> :vector) as similarity
             FROM user_memories
-            WHERE user_id = :user_id
+            WHERE user_id = :user_id AND embedding_model = :embedding_model
         )
         SELECT * FROM calculated_scores
         WHERE similarity >= :threshold
@@ -129,8 +351,129 @@ def semantic_search_general_memories(user_id: str, query: str, limit: int = 5, t
         results = db.execute(sql, {
             "user_id": user_id, 
             "vector": str(query_vector), 
+            "embedding_model": embedding_model_id(),
             "threshold": threshold,
             "limit": limit
         }).fetchall()
         
-    return results
\ No newline at end of file
+    return results
+
+# ---------------------------------------------------------------------------
+# Combined memory retrieval (memory_retrieval_node)
+# ---------------------------------------------------------------------------
+
+# Ranking: similarity x (1 - RECENCY_WEIGHT + RECENCY_WEIGHT x 0.5 ^ (age / half-life))
+RECENCY_WEIGHT = float(os.getenv("MEMORY_RECENCY_WEIGHT", "0.3"))
+RECENCY_HALF_LIFE_DAYS = float(os.getenv("MEMORY_RECENCY_HALF_LIFE_DAYS", "90"))
+
+# Older transactions are not searched; bounds the (user_id, created_at) range scan
+TRANSACTION_HORIZON_DAYS = float(os.getenv("MEMORY_TRANSACTION_HORIZON_DAYS", "730"))
+
+_RECENCY_FACTOR = """
+    (1 - :recency_weight + :recency_weight
+         * power(0.5, extract(epoch FROM now() - created_at) / 86400.0 / :half_life_days))"""
+
+_MEMORY_BRANCH = f"""
+    SELECT 'memory' AS source, id, memory_text, NULL::varchar AS merchant, NULL::float8 AS amount, category,
+           NULL::text AS description, created_at, similarity, 0.0::float8 AS merchant_score,
+           similarity * {_RECENCY_FACTOR} AS score
+    FROM (
+        SELECT id, memory_text, category, created_at, 1 - (embedding <=> :vector) AS similarity
+        FROM user_memories
+        WHERE user_id = :user_id AND embedding_model = :embedding_model
+    ) m
+    WHERE similarity >= :memory_threshold
+    ORDER BY score DESC
+    LIMIT :memory_limit
+"""
+
+_TRANSACTION_VECTOR_BRANCH = f"""
+    SELECT 'vector' AS source, id, NULL::text AS memory_text, merchant, amount, category,
+           description, created_at, similarity, 0.0::float8 AS merchant_score,
+           similarity * {_RECENCY_FACTOR} AS score
+    FROM (
+        SELECT id, merchant, amount, category, description, created_at, 1 - (embedding <=> :vector) AS similarity
+        FROM transaction_history
+        WHERE user_id = :user_id AND embedding_model = :embedding_model
+          AND created_at > now() - make_interval(secs => :horizon_seconds)
+    ) t
+    WHERE similarity >= :transaction_threshold
+    ORDER BY score DESC
+    LIMIT :transaction_limit
+"""
+
+
+class RetrievedMemory(NamedTuple):
+    id: int
+    memory_text: str
+    category: str
+    created_at: object
+    similarity: float
+    score: float  # Similarity weighted by recency
+
+
+def _retrieve_from_database(user_id: str, vector: list, memory_limit: int, transaction_limit: int,
+                            memory_threshold: float, transaction_threshold: float):
+    """The vector branches of retrieve_memories as one UNION ALL: (memories, transaction rows)."""
+    params = {
+        "user_id": user_id,
+        "vector": str(vector),
+        "embedding_model": embedding_model_id(),
+        "memory_threshold": memory_threshold,
+        "memory_limit": memory_limit,
+        "transaction_threshold": transaction_threshold,
+        "transaction_limit": transaction_limit,
+        "recency_weight": RECENCY_WEIGHT,
+        "half_life_days": RECENCY_HALF_LIFE_DAYS,
+        "horizon_seconds": TRANSACTION_HORIZON_DAYS * 86400,
+    }
+    with SessionLocal() as db:
+        rows = db.execute(text(f"({_MEMORY_BRANCH}) UNION ALL ({_TRANSACTION_VECTOR_BRANCH})"), params).fetchall()
+
+    memories = [RetrievedMemory(r.id, r.memory_text, r.category, r.created_at, float(r.similarity), float(r.score))
+                for r in rows if r.source == "memory"]
+    return memories, [r for r in rows if r.source == "vector"]
+
+
+def retrieve_memories(user_id: str, query: str, memory_limit: int = 5, transaction_limit: int = 5,
+                      memory_threshold: float = 0.25, transaction_threshold: float = 0.75):
+    """
+    General memories and past transactions relevant to the user's message.
+
+    1. Lexical transaction search (tsvector / trigram indexes, no embedding).
+    2. If a query word names one of the user's merchants ("swiggy",
+       "swigy", "amazon"), those hits are the answer: no embedding call and
+       no general memories.
+    3. Otherwise the query is embedded once and a single UNION ALL returns
+       the best general memories and the best transactions by vector
+       similarity, each branch with its own threshold and limit, ranked by
+       similarity weighted with a recency decay on created_at. Lexical and
+       vector transactions are merged with reciprocal-rank fusion.
+
+    When the in-process index serves the user (memory_index), the vector
+    branches run there instead of the database.
+
+    Returns:
+        (List[RetrievedMemory], List[RetrievedTransaction], query vector or
+        None when the query was not embedded)
+    """
+    lexical = lexical_search_transactions(user_id, query, transaction_limit)
+    if _names_merchant(lexical):
+        retrieval_stats.record(embedding_calls=0, baseline_calls=2)
+        return [], _rrf_merge({"lexical": lexical}, transaction_limit), None
+
+    vector = get_text_embedding(query)
+    retrieval_stats.record(embedding_calls=1, baseline_calls=2)
+
+    memory_hits = _memory_index().search("memories", user_id, vector, memory_limit, memory_threshold,
+                                      RECENCY_WEIGHT, RECENCY_HALF_LIFE_DAYS)
+    transaction_hits = _memory_index().search("transactions", user_id, vector, transaction_limit,
+                                           transaction_threshold, RECENCY_WEIGHT, RECENCY_HALF_LIFE_DAYS,
+                                           max_age_days=TRANSACTION_HORIZON_DAYS)
+    if memory_hits is not None and transaction_hits is not None:
+        memories = [RetrievedMemory(*row, similarity, score) for row, similarity, score in memory_hits]
+        vector_rows = [RetrievedTransaction(*row, similarity, "vector") for row, similarity, _ in transaction_hits]
+    else:
+        memories, vector_rows = _retrieve_from_database(user_id, vector, memory_limit, transaction_limit,
+                                                        memory_threshold, transaction_threshold)
+    return memories, _rrf_merge({"lexical": lexical, "vector": vector_rows}, transaction_limit), vector
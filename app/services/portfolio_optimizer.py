@@ -0,0 +1,355 @@
+"""
+Spend allocation across a user's cards.
+
+Given a projected monthly spend per merchant / category, assigns the spend
+to cards so the portfolio earns as much as possible over a year: reward
+points (each rule only until its cap for the period is used up), milestone
+unlocks and annual-fee waivers, net of fees.
+
+Rules are turned into numbers once per request, then the allocation is a
+greedy over marginal gains:
+
+1. Rate pass: spend is handed out in order of reward rate; a card's
+   accelerated rate is used only while the rule's cap has headroom. On ties
+   the line that loses most by missing its best card goes first.
+2. Unlock pass: for each card, price the cheapest spend that could move
+   onto it to reach its next milestones / fee waiver (points lost on the
+   donor cards, plus any of their unlocks that would be lost) and apply the
+   best move while it pays off.
+
+Spend is assumed to be spread evenly over the months of the year.
+"""
+import time
+from typing import List
+
+from app.services.reward_engine import POINT_VALUE_INR, fee_terms, is_generic, rule_terms
+from app.utils.reward_rules import (
+    PERIOD_TRANSACTION,
+    PERIOD_YEAR,
+    SPEND_PER_POINT_UNIT,
+    cap_spend_limit,
+    parse_cap,
+    parse_number,
+    parse_period,
+    periods_per_year,
+    rule_key,
+)
+
+PRIMARY, FALLBACK = 0, 1
+
+# Upper bound on unlock moves (each applied move must increase the total)
+MAX_UNLOCK_MOVES = 200
+
+
+def _line_offer(terms: dict, merchant_input: str, category: str):
+    """
+    What a card earns on one spend line.
+
+    Returns:
+        (primary rate, cap key, fallback rate) in points per rupee, or None
+        if the line is excluded on this card. The primary rate applies
+        until the cap key's headroom runs out, the fallback rate after that.
+    """
+    if category in terms["exclusions"] or merchant_input in terms["exclusions"]:
+        return None
+
+    # Same precedence as reward_engine.match_rule: specific merchants first
+    for merchants, offer in terms["specific"]:
+        for rm in merchants:
+            if rm in merchant_input or merchant_input in rm:
+                return offer
+    return terms["generic"]
+
+
+def card_terms(card) -> dict:
+    """Numeric view of a card: line offers per rule, annual caps and unlocks."""
+    caps = {}
+    offers = {}
+    generic_rule = next((r for r in card.reward_rules if is_generic(r)), None)
+    generic_rate = (rule_terms(generic_rule)["multiplier_value"] if generic_rule else 1.0) / SPEND_PER_POINT_UNIT
+
+    for rule in card.reward_rules:
+        terms = rule_terms(rule)
+        rate = terms["multiplier_value"] / SPEND_PER_POINT_UNIT
+        # Spend beyond a specific rule's cap earns the generic rate, beyond the generic cap nothing
+        fallback = 0.0 if is_generic(rule) else generic_rate
+
+        cap_spend = cap_spend_limit(terms["multiplier_kind"], terms["multiplier_value"],
+                                    terms["cap_amount"], terms["cap_unit"])
+        # Per-transaction caps depend on ticket sizes we don't know
+        if cap_spend is None or terms["period"] == PERIOD_TRANSACTION:
+            offers[id(rule)] = (rate, None, rate)
+            continue
+
+        key = (card.card_name, rule_key(rule.category))
+        annual_cap = cap_spend * periods_per_year(terms["period"])
+        # Rules sharing a key share a cap; keep the smallest stated cap
+        caps[key] = min(caps.get(key, annual_cap), annual_cap)
+        offers[id(rule)] = (rate, key, fallback)
+
+    specific = [
+        ([m.lower() for m in rule.merchants], offers[id(rule)])
+        for rule in card.reward_rules if not is_generic(rule)
+    ]
+    base_rate = 1.0 / SPEND_PER_POINT_UNIT
+
+    unlocks = []
+    for milestone in card.milestone_benefits or []:
+        threshold = parse_number(milestone.spend_threshold)
+        value, unit = parse_cap(milestone.reward)
+        if not threshold or not value:
+            continue
+        points = value / POINT_VALUE_INR if unit == "inr" else value
+        # Milestones are annual unless stated otherwise
+        per_year = periods_per_year(parse_period(milestone.period) or PERIOD_YEAR)
+        unlocks.append((threshold * per_year, points * per_year, f"Milestone: {milestone.reward}"))
+
+    fee, waiver_spend = fee_terms(card)
+    if fee and waiver_spend:
+        unlocks.append((waiver_spend, fee / POINT_VALUE_INR, "Annual fee waiver"))
+
+    unlocks.sort(key=lambda u: u[0])
+    return {
+        "exclusions": {e.lower() for e in card.excluded_categories or []},
+        "specific": specific,
+        "generic": offers[id(generic_rule)] if generic_rule else (base_rate, None, base_rate),
+        "caps": caps,
+        "unlocks": unlocks,
+        "fee": fee
+    }
+
+
+def _unlock_value(unlocks: list, spend_from: float, spend_to: float) -> float:
+    """Points of the unlocks whose threshold lies in (spend_from, spend_to]."""
+    return sum(value for threshold, value, _ in unlocks if spend_from < threshold <= spend_to)
+
+
+class _Allocation:
+    def __init__(self, lines: List[dict], cards: list):
+        self.lines = lines
+        self.cards = cards
+        self.terms = [card_terms(card) for card in cards]
+
+        # offers[l][c] -> (primary rate, cap key, fallback rate) | None
+        self.offers = []
+        for line in lines:
+            merchant_input = (line.get("merchant") or line.get("category") or "").lower().strip()
+            category = (line.get("category") or "").lower().strip()
+            self.offers.append([_line_offer(terms, merchant_input, category) for terms in self.terms])
+
+        self.headroom = {}
+        for terms in self.terms:
+            self.headroom.update(terms["caps"])
+
+        self.pieces = {}     # (line, card, tier) -> annual spend
+        self.spend = [0.0] * len(cards)
+        self.unallocated = [0.0] * len(lines)
+
+    def rate(self, l: int, c: int, tier: int) -> float:
+        offer = self.offers[l][c]
+        return offer[0] if tier == PRIMARY else offer[2]
+
+    def assign(self, l: int, c: int, tier: int, amount: float):
+        if amount <= 0:
+            return
+        key = (l, c, tier)
+        self.pieces[key] = self.pieces.get(key, 0.0) + amount
+        self.spend[c] += amount
+        cap_key = self.offers[l][c][1]
+        if tier == PRIMARY and cap_key is not None:
+            self.headroom[cap_key] -= amount
+
+    def release(self, l: int, c: int, tier: int, amount: float):
+        key = (l, c, tier)
+        self.pieces[key] -= amount
+        if self.pieces[key] <= 1e-9:
+            del self.pieces[key]
+        self.spend[c] -= amount
+        cap_key = self.offers[l][c][1]
+        if tier == PRIMARY and cap_key is not None:
+            self.headroom[cap_key] += amount
+
+    # --- 1. Rate pass ---
+    def rate_pass(self):
+        offers = []
+        for l, line_offers in enumerate(self.offers):
+            best_by_card = sorted((o[0] for o in line_offers if o), reverse=True)
+            regret = best_by_card[0] - best_by_card[1] if len(best_by_card) > 1 else (best_by_card[0] if best_by_card else 0.0)
+            for c, offer in enumerate(line_offers):
+                if offer is None:
+                    continue
+                offers.append((offer[0], regret, l, c, PRIMARY))
+                if offer[1] is not None:
+                    offers.append((offer[2], regret, l, c, FALLBACK))
+        offers.sort(key=lambda o: (-o[0], -o[1]))
+
+        remaining = [line["amount"] * 12 for line in self.lines]
+        for rate, _, l, c, tier in offers:
+            if remaining[l] <= 0:
+                continue
+            amount = remaining[l]
+            cap_key = self.offers[l][c][1]
+            if tier == PRIMARY and cap_key is not None:
+                amount = min(amount, max(self.headroom[cap_key], 0.0))
+            self.assign(l, c, tier, amount)
+            remaining[l] -= amount
+
+        self.unallocated = remaining
+
+    # --- 2. Unlock pass ---
+    def _plan_moves(self, c: int):
+        """
+        Cheapest spend that could move onto card c, as (loss per rupee,
+        line, donor card, donor tier, amount), cheapest first.
+        """
+        candidates = []
+        for (l, d, tier), amount in self.pieces.items():
+            offer = self.offers[l][c]
+            if d == c or offer is None:
+                continue
+            candidates.append((self.rate(l, d, tier) - offer[0], l, d, tier, amount))
+        candidates.sort(key=lambda m: m[0])
+        return candidates
+
+    def _best_move(self, c: int):
+        """Best (net gain, moves) for reaching one of card c's unlocks."""
+        unlocks = self.terms[c]["unlocks"]
+        pending = [u for u in unlocks if u[0] > self.spend[c] + 1e-6]
+        if not pending:
+            return None
+
+        candidates = self._plan_moves(c)
+        best = None
+        for threshold, _, _ in pending:
+            need = threshold - self.spend[c]
+            moves, loss = [], 0.0
+            headroom = {}
+            moved_from = {}
+            for _, l, d, tier, amount in candidates:
+                if need <= 1e-6:
+                    break
+                take = min(amount, need)
+                primary, cap_key, fallback = self.offers[l][c]
+                if cap_key is not None:
+                    room = max(headroom.get(cap_key, self.headroom[cap_key]), 0.0)
+                    primary_part = min(take, room)
+                    headroom[cap_key] = room - primary_part
+                else:
+                    primary_part = take
+                gained = primary_part * primary + (take - primary_part) * fallback
+                loss += take * self.rate(l, d, tier) - gained
+                moves.append((l, d, tier, take, primary_part))
+                moved_from[d] = moved_from.get(d, 0.0) + take
+                need -= take
+            if need > 1e-6:
+                break   # Not enough movable spend for this or any higher threshold
+
+            gain = _unlock_value(unlocks, self.spend[c], threshold)
+            for d, moved in moved_from.items():
+                loss += _unlock_value(self.terms[d]["unlocks"], self.spend[d] - moved, self.spend[d])
+            net = gain - loss
+            if net > 1e-6 and (best is None or net > best[0]):
+                best = (net, moves)
+        return best
+
+    def unlock_pass(self):
+        for _ in range(MAX_UNLOCK_MOVES):
+            best = None
+            best_card = None
+            for c in range(len(self.cards)):
+                move = self._best_move(c)
+                if move and (best is None or move[0] > best[0]):
+                    best, best_card = move, c
+            if best is None:
+                return
+            for l, d, tier, take, primary_part in best[1]:
+                self.release(l, d, tier, take)
+                self.assign(l, best_card, PRIMARY, primary_part)
+                self.assign(l, best_card, FALLBACK, take - primary_part)
+
+    # --- Report ---
+    def report(self) -> dict:
+        line_splits = [[] for _ in self.lines]
+        card_points = [0.0] * len(self.cards)
+        for (l, c, tier), amount in self.pieces.items():
+            points = amount * self.rate(l, c, tier)
+            card_points[c] += points
+            line_splits[l].append((c, amount, points))
+
+        allocation = []
+        for l, line in enumerate(self.lines):
+            merged = {}
+            for c, amount, points in line_splits[l]:
+                entry = merged.setdefault(c, [0.0, 0.0])
+                entry[0] += amount
+                entry[1] += points
+            splits = sorted(
+                ({"card_name": self.cards[c].card_name,
+                  "monthly_amount": round(amount / 12, 2),
+                  "monthly_points": round(points / 12, 2)} for c, (amount, points) in merged.items()),
+                key=lambda s: s["monthly_amount"],
+                reverse=True
+            )
+            allocation.append({
+                "merchant": line.get("merchant"),
+                "category": line.get("category"),
+                "monthly_amount": line["amount"],
+                "splits": splits,
+                "unallocated": round(self.unallocated[l] / 12, 2)
+            })
+
+        cards = []
+        totals = {"points": 0.0, "unlocks": 0.0, "fees": 0.0}
+        for c, card in enumerate(self.cards):
+            terms = self.terms[c]
+            reached = [u for u in terms["unlocks"] if u[0] <= self.spend[c] + 1e-6]
+            fee_waived = any(label == "Annual fee waiver" for _, _, label in reached)
+            milestone_points = sum(value for _, value, label in reached if label != "Annual fee waiver")
+            fee_paid = 0.0 if fee_waived else terms["fee"]
+            net = (card_points[c] + milestone_points) * POINT_VALUE_INR - fee_paid
+
+            totals["points"] += card_points[c]
+            totals["unlocks"] += milestone_points * POINT_VALUE_INR
+            totals["fees"] += fee_paid
+            cards.append({
+                "card_name": card.card_name,
+                "monthly_spend": round(self.spend[c] / 12, 2),
+                "annual_reward_points": round(card_points[c], 2),
+                "milestones_unlocked": [label for _, _, label in reached if label != "Annual fee waiver"],
+                "annual_fee": terms["fee"],
+                "fee_waived": fee_waived,
+                "net_annual_value_inr": round(net, 2)
+            })
+
+        return {
+            "allocation": allocation,
+            "cards": cards,
+            "annual_reward_points": round(totals["points"], 2),
+            "annual_milestone_value_inr": round(totals["unlocks"], 2),
+            "annual_fees_inr": round(totals["fees"], 2),
+            "net_annual_value_inr": round(totals["points"] * POINT_VALUE_INR + totals["unlocks"] - totals["fees"], 2)
+        }
+
+
+def optimize_allocation(cards: list, lines: List[dict]) -> dict:
+    """
+    Assigns projected monthly spend to cards.
+
+    Args:
+        cards: The user's CreditCard objects.
+        lines: [{"merchant": Optional[str], "category": Optional[str],
+                 "amount": monthly INR}]
+
+    Returns:
+        Per-line card splits (monthly), per-card yearly totals (points,
+        milestones, fee waived, net value) and portfolio totals.
+    """
+    start = time.perf_counter()
+
+    allocation = _Allocation(lines, cards)
+    allocation.rate_pass()
+    allocation.unlock_pass()
+    result = allocation.report()
+
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
@@ -0,0 +1,110 @@
+"""
+Version counters behind the ETags of the polled endpoints.
+
+resource_versions holds one counter per resource, bumped in the same
+transaction as every write that changes what the endpoint returns:
+
+    cards:<user_id>      card added or refreshed (add_card, SQLite import)
+    threads:<user_id>    thread created or deleted
+    thread:<thread_id>   a turn finished, or the thread was deleted
+
+A GET reads the counter (one primary-key lookup, none of the main tables)
+and answers If-None-Match with 304 Not Modified while the ETag still
+matches. The counter is read before the data, so a write racing the read
+can only cost the client one extra full response, never a stale 304.
+Resources never written have version 0.
+"""
+import threading
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import text
+from app.db.database import engine
+
+# Private: responses are per user; no-cache: clients revalidate every time
+CACHE_CONTROL = "private, no-cache"
+
+_BUMP = text("""
+    INSERT INTO resource_versions (key, version) VALUES (:key, 1)
+    ON CONFLICT (key) DO UPDATE SET version = resource_versions.version + 1, updated_at = now()
+""")
+
+
+def bump(db, *keys: str):
+    """Bumps the versions of keys within the caller's transaction (session or connection)."""
+    for key in dict.fromkeys(keys):
+        db.execute(_BUMP, {"key": key})
+
+
+def bump_now(*keys: str):
+    """bump() in a transaction of its own, for writes made outside SQLAlchemy (checkpoints)."""
+    with engine.begin() as conn:
+        bump(conn, *keys)
+
+
+def get_version(key: str) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT version FROM resource_versions WHERE key = :key"), {"key": key}).scalar() or 0
+
+
+def resource_etag(key: str, tag: str = "") -> str:
+    """
+    Weak ETag of the resource's current version (weak: the body may be sent
+    gzipped or not). tag names anything else the representation depends on.
+    """
+    return f'W/"{get_version(key)}{"-" + tag if tag else ""}"'
+
+
+def _matches(header: str, etag: str) -> bool:
+    """Weak comparison of If-None-Match against etag"""
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+class ConditionalStats:
+    """Per endpoint: GETs served, how many came with If-None-Match, how many got 304."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, endpoint: str, conditional: bool, not_modified: bool):
+        with self._lock:
+            counts = self._counts.setdefault(endpoint, [0, 0, 0])
+            counts[0] += 1
+            counts[1] += conditional
+            counts[2] += not_modified
+
+    def report(self) -> dict:
+        with self._lock:
+            counts = {endpoint: list(c) for endpoint, c in self._counts.items()}
+        requests = sum(c[0] for c in counts.values())
+        not_modified = sum(c[2] for c in counts.values())
+        return {
+            "requests": requests,
+            "conditional": sum(c[1] for c in counts.values()),
+            "not_modified": not_modified,
+            "not_modified_ratio": round(not_modified / requests, 3) if requests else 0.0,
+            "by_endpoint": {
+                endpoint: {"requests": c[0], "conditional": c[1], "not_modified": c[2],
+                           "not_modified_ratio": round(c[2] / c[0], 3) if c[0] else 0.0}
+                for endpoint, c in counts.items()
+            },
+        }
+
+
+conditional_stats = ConditionalStats()
+
+
+def not_modified(request: Request, etag: Optional[str], endpoint: str) -> bool:
+    """Whether the request's If-None-Match still matches etag; counted in conditional_stats."""
+    header = request.headers.get("if-none-match")
+    unchanged = bool(header and etag and _matches(header, etag))
+    conditional_stats.record(endpoint, header is not None, unchanged)
+    return unchanged
+
+
+def etag_headers(etag: Optional[str]) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL} if etag else {}
@@ -0,0 +1,181 @@
+"""
+Reward scoring for a single transaction across a user's cards.
+
+Caps are applied at the margin: only the spend that still fits in a
+rule's cap headroom for the current period earns the accelerated rate,
+the rest earns the card's base rate. Headroom comes from the running
+spend ledger (see app/services/spend_service.py), so scoring is a dict
+lookup per rule.
+"""
+from datetime import datetime
+from typing import Optional
+
+from app.schemas.credit_card import NormalizedRewardRule, StoredCreditCard
+from app.services.spend_service import ledger_key
+from app.utils.reward_rules import (
+    PERIOD_TRANSACTION,
+    SPEND_PER_POINT_UNIT,
+    cap_spend_limit,
+    normalize_rule,
+    parse_fee,
+    parse_fee_waiver_spend,
+    period_key,
+    rule_key,
+)
+
+# Average redemption value of one reward point
+POINT_VALUE_INR = 0.25
+
+
+def rule_terms(rule) -> dict:
+    """
+    Numeric view of a RewardRule.
+
+    Stored rules (NormalizedRewardRule) carry the numbers parsed at ingest
+    time; only rules that were never stored (e.g. fresh from the parser)
+    are parsed here.
+    """
+    if not isinstance(rule, NormalizedRewardRule):
+        rule = NormalizedRewardRule(**normalize_rule(rule.model_dump()))
+    return {
+        "multiplier_kind": rule.multiplier_kind,
+        "multiplier_value": rule.multiplier_value,
+        "cap_amount": rule.cap_amount,
+        "cap_unit": rule.cap_unit,
+        "period": rule.period_type,
+    }
+
+
+def fee_terms(card) -> tuple:
+    """(annual fee INR, yearly spend that waives it or None)"""
+    if isinstance(card, StoredCreditCard):
+        return card.annual_fee_inr, card.fee_waiver_spend_inr
+    return parse_fee(card.annual_fee), parse_fee_waiver_spend(card.fee_waiver_condition)
+
+
+def is_generic(rule) -> bool:
+    return "all" in [m.lower() for m in rule.merchants]
+
+
+def match_rule(card, merchant_input: str):
+    """
+    Finds the reward rule that applies to a merchant.
+    Specific merchant rules win over generic ("All") rules.
+    """
+    generic_rule = None
+
+    for rule in card.reward_rules:
+        if is_generic(rule):
+            generic_rule = generic_rule or rule
+            continue
+
+        # Check if any DB merchant (e.g. 'nykaa') is inside User Input (e.g. 'nykaa man')
+        # OR if User Input (e.g. 'uber') is inside DB merchant (e.g. 'uber eats')
+        for rm in (m.lower() for m in rule.merchants):
+            if rm in merchant_input or merchant_input in rm:
+                return rule
+
+    return generic_rule
+
+
+def score_card(card, merchant: str, category: Optional[str], amount: float,
+               rule_spend: Optional[dict] = None, when: Optional[datetime] = None) -> dict:
+    """
+    Scores one card for a transaction.
+
+    Returns a breakdown entry with the points earned, the effective and
+    nominal multipliers and the spend that counts towards the rule's cap.
+    """
+    rule_spend = rule_spend or {}
+    merchant_input = (merchant or "").lower().strip()
+    category_lower = category.lower() if category else ""
+
+    # --- 1. EXCLUSIONS ---
+    exclusions = [e.lower() for e in card.excluded_categories] if card.excluded_categories else []
+    if category_lower in exclusions or merchant_input in exclusions:
+        return {
+            "card_name": card.card_name,
+            "multiplier": 0,
+            "points": 0,
+            "category": "Excluded",
+            "reason": "Matches exclusion"
+        }
+
+    # --- 2. FIND BEST MATCHING RULE ---
+    rule = match_rule(card, merchant_input)
+    if not rule:
+        points = (amount / SPEND_PER_POINT_UNIT) * 1.0
+        return {
+            "card_name": card.card_name,
+            "multiplier": 1.0,
+            "nominal_multiplier": 1.0,
+            "category": "Base Reward",
+            "points": round(points, 2)
+        }
+
+    terms = rule_terms(rule)
+    multiplier = terms["multiplier_value"]
+
+    # Spend beyond the cap falls back to the card's generic rule (if this isn't it)
+    base_multiplier = 0.0
+    if not is_generic(rule):
+        generic_rule = next((r for r in card.reward_rules if is_generic(r)), None)
+        base_multiplier = rule_terms(generic_rule)["multiplier_value"] if generic_rule else 1.0
+
+    # --- 3. CAP HEADROOM ---
+    key = rule_key(rule.category)
+    bucket = None if terms["period"] == PERIOD_TRANSACTION else period_key(terms["period"], when)
+    cap_spend = cap_spend_limit(terms["multiplier_kind"], multiplier, terms["cap_amount"], terms["cap_unit"])
+
+    headroom = None
+    eligible_spend = amount
+    if cap_spend is not None:
+        already_spent = rule_spend.get(ledger_key(card.card_name, key, bucket), 0.0) if bucket else 0.0
+        headroom = max(cap_spend - already_spent, 0.0)
+        eligible_spend = min(amount, headroom)
+
+    # --- 4. CALCULATION ---
+    accelerated_points = (eligible_spend / SPEND_PER_POINT_UNIT) * multiplier
+    overflow_points = ((amount - eligible_spend) / SPEND_PER_POINT_UNIT) * base_multiplier
+    points = accelerated_points + overflow_points
+    effective_multiplier = points * SPEND_PER_POINT_UNIT / amount if amount else multiplier
+
+    return {
+        "card_name": card.card_name,
+        "multiplier": round(effective_multiplier, 2),
+        "nominal_multiplier": multiplier,
+        "category": rule.category,
+        "points": round(points, 2),
+        "rule_key": key,
+        "period_key": bucket,
+        "rule_spend": eligible_spend,
+        "rule_points": round(accelerated_points, 2),
+        "cap_headroom": headroom,
+        "capped": eligible_spend < amount
+    }
+
+
+def score_transaction(cards, merchant: str, category: Optional[str], amount: float,
+                      rule_spend: Optional[dict] = None, when: Optional[datetime] = None):
+    """
+    Scores every card for a transaction.
+
+    Returns:
+        (best_card, best_entry, breakdown)
+    """
+    amount = float(amount or 0)
+    best_card = None
+    best_entry = None
+    breakdown = []
+
+    for card in cards:
+        entry = score_card(card, merchant, category, amount, rule_spend, when)
+        breakdown.append(entry)
+
+        if entry["category"] == "Excluded":
+            continue
+        if best_entry is None or entry["points"] > best_entry["points"]:
+            best_card = card
+            best_entry = entry
+
+    return best_card, best_entry, breakdown
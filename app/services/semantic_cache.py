@@ -0,0 +1,151 @@
+"""
+Semantic answer cache for generic general_flow questions.
+
+"What is lounge access?" and "how does airport lounge access work" get the
+same answer for every user, yet each one ran general_llm_node with the
+full history. Answers to questions that look standalone and impersonal are
+stored with the question's embedding; a later question within
+SEMANTIC_CACHE_THRESHOLD cosine similarity, and younger than
+SEMANTIC_CACHE_TTL_HOURS, is answered from the cache.
+
+The caller must bypass the cache whenever memory_context is non-empty, and
+must only store answers to a thread's first message (later answers are
+generated with the earlier turns in context): an answer built from a
+user's facts must never be served to anyone else.
+
+Entries are tied to a prompt version (general prompt + model), so editing
+GENERAL_SYSTEM_PROMPT starts a fresh cache.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from app.db.database import SessionLocal
+from app.utils.vectors import embedding_model_id
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL_HOURS = float(os.getenv("SEMANTIC_CACHE_TTL_HOURS", "72"))
+
+# Longer messages are rarely generic definitions
+MAX_CACHEABLE_CHARS = 300
+
+# First person: the answer depends on who is asking
+_PERSONAL = re.compile(r"\b(i|i'm|im|i've|i'd|me|my|mine|myself|we|our|us)\b")
+# Refers back to the conversation: the answer depends on the history
+_FOLLOW_UP = re.compile(r"\b(it|its|that|this|these|those|they|them|above|previous|earlier|again|else|more)\b")
+# Amounts and dates make a question specific
+_SPECIFIC = re.compile(r"\d")
+
+
+def is_cacheable_question(question: str) -> bool:
+    """Standalone, impersonal question whose answer is the same for everyone."""
+    q = question.strip().lower()
+    if not q or len(q) > MAX_CACHEABLE_CHARS:
+        return False
+    return not (_PERSONAL.search(q) or _FOLLOW_UP.search(q) or _SPECIFIC.search(q))
+
+
+def prompt_version(system_prompt: str, model: str = "") -> str:
+    return hashlib.sha256(f"{system_prompt}\x00{model}".encode("utf-8")).hexdigest()[:16]
+
+
+class SemanticCacheStats:
+    """Per-worker counters reported by GET /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.saved_ms = 0.0
+
+    def record(self, outcome: str, saved_ms: float = 0.0):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.saved_ms += saved_ms
+
+    def report(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "latency_saved_ms": round(self.saved_ms, 1),
+            "avg_latency_saved_ms": round(self.saved_ms / self.hits, 1) if self.hits else 0.0,
+            "threshold": SEMANTIC_CACHE_THRESHOLD,
+            "ttl_hours": SEMANTIC_CACHE_TTL_HOURS,
+        }
+
+
+stats = SemanticCacheStats()
+
+
+def lookup_answer(embedding: list, version: str) -> Optional[dict]:
+    """
+    Closest live entry above the threshold, counting the hit, in one
+    round-trip. Returns {"answer", "similarity", "llm_ms"} or None.
+    """
+    with SessionLocal() as db:
+        row = db.execute(text("""
+            WITH best AS (
+                SELECT id, 1 - (embedding <=> :vector) AS similarity
+                FROM semantic_answer_cache
+                WHERE prompt_version = :version AND embedding_model = :embedding_model
+                  AND created_at > now() - make_interval(secs => :ttl_seconds)
+                ORDER BY embedding <=> :vector
+                LIMIT 1
+            )
+            UPDATE semantic_answer_cache c
+            SET hit_count = c.hit_count + 1, last_hit_at = now()
+            FROM best
+            WHERE c.id = best.id AND best.similarity >= :threshold
+            RETURNING c.answer, best.similarity, c.llm_ms
+        """), {
+            "vector": str(embedding),
+            "version": version,
+            "embedding_model": embedding_model_id(),
+            "ttl_seconds": SEMANTIC_CACHE_TTL_HOURS * 3600,
+            "threshold": SEMANTIC_CACHE_THRESHOLD
+        }).fetchone()
+        db.commit()
+    if row is None:
+        return None
+    return {"answer": row.answer, "similarity": float(row.similarity), "llm_ms": row.llm_ms or 0.0}
+
+
+def store_answer(question: str, embedding: list, answer: str, version: str, llm_ms: float):
+    """Stores an answer and drops expired entries."""
+    with SessionLocal() as db:
+        db.execute(text("""
+            DELETE FROM semantic_answer_cache
+            WHERE created_at <= now() - make_interval(secs => :ttl_seconds)
+        """), {"ttl_seconds": SEMANTIC_CACHE_TTL_HOURS * 3600})
+        db.execute(text("""
+            INSERT INTO semantic_answer_cache (question, embedding, embedding_model, answer, prompt_version, llm_ms)
+            VALUES (:question, :vector, :embedding_model, :answer, :version, :llm_ms)
+        """), {
+            "question": question,
+            "vector": str(embedding),
+            "embedding_model": embedding_model_id(),
+            "answer": answer,
+            "version": version,
+            "llm_ms": llm_ms
+        })
+        db.commit()
+
+
+def cache_summary() -> dict:
+    """Size and lifetime hit counts of the shared cache."""
+    with SessionLocal() as db:
+        row = db.execute(text("""
+            SELECT count(*) AS entries, coalesce(sum(hit_count), 0) AS total_hits
+            FROM semantic_answer_cache
+            WHERE created_at > now() - make_interval(secs => :ttl_seconds)
+        """), {"ttl_seconds": SEMANTIC_CACHE_TTL_HOURS * 3600}).fetchone()
+    return {"entries": row.entries, "total_hits": int(row.total_hits)}
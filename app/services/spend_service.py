@@ -0,0 +1,245 @@
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.utils.reward_rules import current_period_keys
+
+
+def ledger_key(card_name: str, rule_key: str, period_key: str) -> str:
+    """Key of a ledger entry in the dict returned by get_rule_spend."""
+    return f"{card_name}|{rule_key}|{period_key}"
+
+
+def record_rule_spend(db: Session, user_id: str, card_name: str, rule_key: str,
+                      period_key: str, spend: float, points: float = 0.0):
+    """
+    Adds spend to the running ledger of a reward rule.
+    Runs inside the caller's session; the caller commits.
+    """
+    db.execute(text("""
+        INSERT INTO reward_spend_ledger (user_id, card_name, rule_key, period_key, spend, points, updated_at)
+        VALUES (:user_id, :card_name, :rule_key, :period_key, :spend, :points, now())
+        ON CONFLICT (user_id, card_name, rule_key, period_key)
+        DO UPDATE SET
+            spend = reward_spend_ledger.spend + EXCLUDED.spend,
+            points = reward_spend_ledger.points + EXCLUDED.points,
+            updated_at = now();
+    """), {
+        "user_id": user_id,
+        "card_name": card_name,
+        "rule_key": rule_key,
+        "period_key": period_key,
+        "spend": spend,
+        "points": points
+    })
+
+
+def get_rule_spend(db: Session, user_id: str, period_keys: list = None) -> dict:
+    """
+    Loads the user's ledger entries for the open period buckets.
+
+    Returns:
+        {"<card_name>|<rule_key>|<period_key>": spend}
+        Reads only reward_spend_ledger, never transaction_history.
+    """
+    period_keys = period_keys or current_period_keys()
+
+    rows = db.execute(text("""
+        SELECT card_name, rule_key, period_key, spend
+        FROM reward_spend_ledger
+        WHERE user_id = :user_id
+        AND period_key = ANY(:period_keys)
+    """), {"user_id": user_id, "period_keys": list(period_keys)}).fetchall()
+
+    return {
+        ledger_key(row.card_name, row.rule_key, row.period_key): row.spend
+        for row in rows
+    }
+
+
+# -------------------------
+# Spend Rollups
+# -------------------------
+def _rollup_params(user_id: str, amount: float, category: str = None, merchant: str = None,
+                   card_name: str = None, day=None, count: int = 1) -> dict:
+    return {
+        "user_id": user_id,
+        "day": day,
+        "category": (category or "").strip().lower(),
+        "merchant": (merchant or "").strip(),
+        "card_name": (card_name or "").strip(),
+        "amount": float(amount or 0),
+        "count": count
+    }
+
+
+def record_spend_rollups(db: Session, user_id: str, amount: float, category: str = None,
+                         merchant: str = None, card_name: str = None, day=None, count: int = 1):
+    """
+    Adds spend to the daily and monthly rollups (day defaults to today).
+    Runs inside the caller's session; the caller commits.
+    """
+    params = _rollup_params(user_id, amount, category, merchant, card_name, day, count)
+
+    db.execute(text("""
+        INSERT INTO spend_daily_rollups (user_id, day, category, merchant, card_name, total_amount, txn_count)
+        VALUES (:user_id, COALESCE(CAST(:day AS date), CURRENT_DATE), :category, :merchant, :card_name, :amount, :count)
+        ON CONFLICT (user_id, day, category, merchant, card_name)
+        DO UPDATE SET
+            total_amount = spend_daily_rollups.total_amount + EXCLUDED.total_amount,
+            txn_count = spend_daily_rollups.txn_count + EXCLUDED.txn_count;
+    """), params)
+
+    db.execute(text("""
+        INSERT INTO spend_monthly_rollups (user_id, month, category, merchant, card_name, total_amount, txn_count)
+        VALUES (:user_id, to_char(COALESCE(CAST(:day AS date), CURRENT_DATE), 'YYYY-MM'), :category, :merchant, :card_name, :amount, :count)
+        ON CONFLICT (user_id, month, category, merchant, card_name)
+        DO UPDATE SET
+            total_amount = spend_monthly_rollups.total_amount + EXCLUDED.total_amount,
+            txn_count = spend_monthly_rollups.txn_count + EXCLUDED.txn_count;
+    """), params)
+
+
+def rebuild_spend_rollups(db: Session, user_id: str = None):
+    """
+    Recomputes the rollups from transaction_history (batch job).
+    Rebuilds every user unless user_id is given. The caller commits.
+    """
+    where = "WHERE user_id = :user_id" if user_id else ""
+    params = {"user_id": user_id}
+
+    db.execute(text(f"DELETE FROM spend_daily_rollups {where}"), params)
+    db.execute(text(f"DELETE FROM spend_monthly_rollups {where}"), params)
+
+    db.execute(text(f"""
+        INSERT INTO spend_daily_rollups (user_id, day, category, merchant, card_name, total_amount, txn_count)
+        SELECT
+            user_id,
+            CAST(created_at AS date),
+            LOWER(TRIM(COALESCE(category, ''))),
+            TRIM(COALESCE(merchant, '')),
+            TRIM(COALESCE(card_name, '')),
+            SUM(COALESCE(amount, 0)),
+            COUNT(*)
+        FROM transaction_history
+        {where}
+        GROUP BY 1, 2, 3, 4, 5
+    """), params)
+
+    db.execute(text(f"""
+        INSERT INTO spend_monthly_rollups (user_id, month, category, merchant, card_name, total_amount, txn_count)
+        SELECT user_id, to_char(day, 'YYYY-MM'), category, merchant, card_name, SUM(total_amount), SUM(txn_count)
+        FROM spend_daily_rollups
+        {where}
+        GROUP BY 1, 2, 3, 4, 5
+    """), params)
+
+
+def get_spend_profile(db: Session, user_id: str, months: int = 12) -> dict:
+    """
+    The user's spend per (merchant, category) over the last `months`
+    calendar months (current one included), scaled to a year by the months
+    covered: from the first month with spend in the window through the
+    current one, quiet months included. Served from the monthly rollups.
+
+    Returns:
+        {"months_covered", "months_with_spend", "lines": [{"merchant",
+         "category", "annual_amount"}]} with unknown merchant / category as
+        None.
+    """
+    today = date.today()
+    current = today.year * 12 + today.month - 1
+    start = current + 1 - months
+    since = f"{start // 12:04d}-{start % 12 + 1:02d}"
+
+    rows = db.execute(text("""
+        WITH recent AS (
+            SELECT month, merchant, category, total_amount FROM spend_monthly_rollups
+            WHERE user_id = :user_id AND month >= :since
+        )
+        SELECT merchant, category, SUM(total_amount) AS amount,
+               (SELECT min(month) FROM recent) AS first_month,
+               (SELECT count(DISTINCT month) FROM recent) AS months
+        FROM recent
+        GROUP BY merchant, category
+        HAVING SUM(total_amount) > 0
+    """), {"user_id": user_id, "since": since}).fetchall()
+
+    covered = with_spend = 0
+    if rows:
+        year, month = map(int, rows[0].first_month.split("-"))
+        covered = min(current - (year * 12 + month - 1) + 1, months)
+        with_spend = rows[0].months
+    scale = 12 / max(covered, 1)
+    return {
+        "months_covered": covered,
+        "months_with_spend": with_spend,
+        "lines": [
+            {"merchant": row.merchant or None, "category": row.category or None, "annual_amount": row.amount * scale}
+            for row in rows
+        ]
+    }
+
+
+def get_spend_breakdown(db: Session, user_id: str, month: str = None, day=None, category: str = None) -> dict:
+    """
+    Spend breakdown for one month (default: current month) or one day,
+    served from the rollups. Cost depends on the number of distinct
+    (category, merchant, card) combinations in the period, not on the
+    size of transaction_history.
+
+    by_card only lists spend recorded with a card; the rest (users without
+    cards, statements imported without card_name) is totalled in
+    unattributed.
+    """
+    if not day:
+        month = month or date.today().strftime("%Y-%m")
+
+    params = {"user_id": user_id, "month": month, "day": day, "category": (category or "").strip().lower()}
+    category_filter = "AND category = :category" if category else ""
+
+    if day:
+        sql = f"""
+            SELECT CAST(day AS text) AS period, category, merchant, card_name, total_amount, txn_count
+            FROM spend_daily_rollups
+            WHERE user_id = :user_id AND day = CAST(:day AS date) {category_filter}
+        """
+    else:
+        sql = f"""
+            SELECT month AS period, category, merchant, card_name, total_amount, txn_count
+            FROM spend_monthly_rollups
+            WHERE user_id = :user_id AND month = :month {category_filter}
+        """
+
+    rows = db.execute(text(sql), params).fetchall()
+
+    by_category, by_merchant, by_card = {}, {}, {}
+    unattributed = {"amount": 0.0, "count": 0}
+    total, count = 0.0, 0
+    for row in rows:
+        total += row.total_amount
+        count += row.txn_count
+        buckets = ((by_category, row.category), (by_merchant, row.merchant), (by_card, row.card_name))
+        for bucket, key in buckets:
+            if bucket is by_card and not key:
+                entry = unattributed
+            else:
+                entry = bucket.setdefault(key or "unknown", {"amount": 0.0, "count": 0})
+            entry["amount"] += row.total_amount
+            entry["count"] += row.txn_count
+
+    def _sorted(bucket, label):
+        return sorted(
+            ({label: key, "amount": round(v["amount"], 2), "count": v["count"]} for key, v in bucket.items()),
+            key=lambda item: item["amount"],
+            reverse=True
+        )
+
+    return {
+        "period": str(day) if day else month,
+        "total": round(total, 2),
+        "count": count,
+        "by_category": _sorted(by_category, "category"),
+        "by_merchant": _sorted(by_merchant, "merchant"),
+        "by_card": _sorted(by_card, "card_name"),
+        "unattributed": {"amount": round(unattributed["amount"], 2), "count": unattributed["count"]}
+    }
@@ -0,0 +1,466 @@
+"""
+Bank / card statement import.
+
+The CSV is read row by row and handled in batches of STATEMENT_BATCH_SIZE:
+merchant and category are resolved with the local transaction parser,
+every debit is scored against the user's cards, the batch is embedded with
+one API call and COPY'd into transaction_history together with its spend
+rollups. Only the current batch is kept in memory; the per-row report is
+streamed back as it is produced.
+
+Caps start from the user's reward ledger for the periods the statement
+covers, and rows already in transaction_history (a re-import, overlapping
+statements) are skipped, so importing a file twice changes nothing.
+"""
+import csv
+import io
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional
+
+from sqlalchemy import text
+
+from app.db.database import SessionLocal
+from app.services.cache_bus import publish
+from app.services.memory_service import transaction_semantic_text
+from app.services.reward_engine import POINT_VALUE_INR, score_card, score_transaction
+from app.services.spend_service import get_rule_spend, ledger_key, record_rule_spend, record_spend_rollups
+from app.utils.reward_rules import SPEND_PER_POINT_UNIT, current_period_keys
+from app.utils.transaction_parser import LocalTransactionParser
+from app.utils.vectors import embedding_model_id, get_text_embeddings
+
+STATEMENT_BATCH_SIZE = 500
+
+# Header names used by Indian bank / card statement exports (normalized)
+DATE_COLUMNS = {"date", "txn date", "transaction date", "value date", "posting date", "tran date"}
+DESCRIPTION_COLUMNS = {"description", "narration", "details", "particulars", "transaction details",
+                       "merchant", "remarks"}
+AMOUNT_COLUMNS = {"amount", "amount inr", "amount rs", "debit", "debit amount", "withdrawal",
+                  "withdrawal amt", "withdrawal amount"}
+CREDIT_COLUMNS = {"credit", "credit amount", "deposit", "deposit amt", "deposit amount"}
+TYPE_COLUMNS = {"type", "dr cr", "cr dr", "debit credit"}
+CATEGORY_COLUMNS = {"category"}
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d-%m-%y",
+                "%d %b %Y", "%d-%b-%Y", "%d-%b-%y", "%d %B %Y")
+
+# How far into the file the header row may appear (banks add a preamble)
+MAX_HEADER_SEARCH_ROWS = 30
+
+# Payment-channel tokens that are never the merchant ("UPI/SWIGGY/4711")
+_CHANNEL_WORDS = {"upi", "pos", "neft", "imps", "rtgs", "ecom", "ach", "nach", "ref", "txn",
+                  "vps", "mps", "pur", "purchase", "payment", "to", "by", "via", "at", "in"}
+
+
+@dataclass
+class StatementRow:
+    line: int
+    when: Optional[datetime] = None
+    description: str = ""
+    amount: Optional[float] = None
+    category: Optional[str] = None
+    skip_reason: Optional[str] = None
+
+
+def _normalize_header(cell: str) -> str:
+    return " ".join(re.sub(r"[^a-z ]", " ", cell.lower()).split())
+
+
+def _find_column(header: List[str], names: set) -> Optional[int]:
+    for index, cell in enumerate(header):
+        if cell in names:
+            return index
+    return None
+
+
+def _parse_statement_amount(raw: str):
+    """'1,234.50' -> (1234.5, False), '500.00 Cr' -> (500.0, True), '' -> (None, False)"""
+    text = (raw or "").strip().lower()
+    if not text:
+        return None, False
+    match = re.search(r"-?\d[\d,]*(?:\.\d+)?", text)
+    if not match:
+        return None, False
+    value = float(match.group(0).replace(",", ""))
+    is_credit = bool(re.search(r"\bcr\b", text)) or value < 0
+    return abs(value), is_credit
+
+
+class _DateParser:
+    """Tries the format that worked last first (statements use one format)."""
+
+    def __init__(self):
+        self.formats = list(DATE_FORMATS)
+
+    def parse(self, raw: str) -> Optional[datetime]:
+        text = (raw or "").strip()
+        # Drop a time part ("02/01/2026 14:31:07")
+        text = text.split(" ")[0] if re.match(r"^\S+\s+\d{1,2}:\d{2}", text) else text
+        for index, fmt in enumerate(self.formats):
+            try:
+                value = datetime.strptime(text, fmt)
+            except ValueError:
+                continue
+            if index:
+                self.formats.insert(0, self.formats.pop(index))
+            return value
+        return None
+
+
+class _ImportedRows:
+    """
+    Rows the user already has in transaction_history, counted per day by
+    (description, amount). A day is loaded the first time one of its rows is
+    seen, before this import writes any row of that day. A row is a
+    duplicate while its count is not used up, so identical purchases on the
+    same day are still kept as often as the statement lists them.
+    """
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.days = {}
+
+    def _load(self, day: datetime) -> dict:
+        with SessionLocal() as db:
+            result = db.execute(text("""
+                SELECT description, round(amount::numeric, 2) AS amount, count(*) AS n
+                FROM transaction_history
+                WHERE user_id = :user_id AND created_at >= :start AND created_at < :end
+                GROUP BY 1, 2
+            """), {"user_id": self.user_id, "start": day, "end": day + timedelta(days=1)}).fetchall()
+        return {(r.description, float(r.amount)): r.n for r in result}
+
+    def claim(self, row: StatementRow) -> bool:
+        """True if the row was imported before (and uses up one match)."""
+        day = datetime.combine(row.when.date(), datetime.min.time())
+        if day not in self.days:
+            self.days[day] = self._load(day)
+        counts = self.days[day]
+        key = (row.description, round(row.amount, 2))
+        if counts.get(key, 0) > 0:
+            counts[key] -= 1
+            return True
+        return False
+
+
+def read_statement(lines: Iterable[str]) -> Iterator[StatementRow]:
+    """
+    Streams the debit rows of a CSV statement.
+
+    Accepts any iterable of text lines (an open file, a TextIOWrapper around
+    an upload) and never materializes the whole file. Credits (payments,
+    refunds) are skipped silently; malformed rows are yielded with a
+    skip_reason.
+
+    Raises:
+        ValueError: If no header row with a date, description and amount
+            column is found.
+    """
+    reader = csv.reader(lines)
+    dates = _DateParser()
+
+    columns = None
+    for row in reader:
+        header = [_normalize_header(cell) for cell in row]
+        columns = {
+            "date": _find_column(header, DATE_COLUMNS),
+            "description": _find_column(header, DESCRIPTION_COLUMNS),
+            "amount": _find_column(header, AMOUNT_COLUMNS),
+            "credit": _find_column(header, CREDIT_COLUMNS),
+            "type": _find_column(header, TYPE_COLUMNS),
+            "category": _find_column(header, CATEGORY_COLUMNS),
+        }
+        if None not in (columns["date"], columns["description"], columns["amount"]):
+            break
+        columns = None
+        if reader.line_num >= MAX_HEADER_SEARCH_ROWS:
+            break
+
+    if columns is None:
+        raise ValueError("Could not find a header row with date, description and amount columns")
+
+    def cell(row, key):
+        index = columns[key]
+        return row[index].strip() if index is not None and index < len(row) else ""
+
+    for row in reader:
+        if not any(value.strip() for value in row):
+            continue
+
+        line = reader.line_num
+        amount, is_credit = _parse_statement_amount(cell(row, "amount"))
+        if amount is None:
+            # Separate debit / credit columns: an empty debit means a credit row
+            if cell(row, "credit"):
+                continue
+            yield StatementRow(line=line, skip_reason="missing amount")
+            continue
+
+        if is_credit or cell(row, "type").lower() in ("cr", "credit"):
+            continue
+
+        when = dates.parse(cell(row, "date"))
+        if when is None:
+            yield StatementRow(line=line, skip_reason=f"invalid date '{cell(row, 'date')}'")
+            continue
+
+        yield StatementRow(
+            line=line,
+            when=when,
+            description=cell(row, "description"),
+            amount=amount,
+            category=cell(row, "category").lower() or None
+        )
+
+
+def _fallback_merchant(description: str) -> str:
+    """Readable merchant name for descriptions the parser does not know."""
+    words = [w for w in re.findall(r"[a-z&']+", description.lower()) if w not in _CHANNEL_WORDS and len(w) > 1]
+    return " ".join(words[:3]).title() or "Unknown"
+
+
+def _copy_value(value) -> str:
+    """Escapes one value for COPY ... FROM STDIN (text format)."""
+    if value is None:
+        return "\\N"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def _flush_batch(user_id: str, batch: List[dict], embed: bool) -> int:
+    """
+    Writes one batch: transaction_history via COPY, spend rollups and the
+    statement card's cap ledger, in a single commit.
+
+    Returns:
+        The number of rows whose embedding could not be generated.
+    """
+    embeddings = [None] * len(batch)
+    model = None
+    failed = 0
+    if embed:
+        try:
+            embeddings = get_text_embeddings([
+                transaction_semantic_text(item["merchant"], item["category"], item["description"])
+                for item in batch
+            ])
+            model = embedding_model_id()
+        except Exception as e:
+            # Rows are still imported; they just won't show up in semantic search
+            print(f"⚠️ Statement embedding batch failed: {e}")
+            failed = len(batch)
+
+    buffer = io.StringIO()
+    rollups = {}
+    ledger = {}
+    for item, vector in zip(batch, embeddings):
+        buffer.write("\t".join(_copy_value(v) for v in (
+            user_id,
+            item["merchant"],
+            item["category"],
+            item["amount"],
+            item["description"],
+            item["card_name"],
+            "[" + ",".join(map(str, vector)) + "]" if vector else None,
+            model if vector else None,
+            item["when"].isoformat()
+        )) + "\n")
+
+        key = (item["when"].date(), item["category"], item["merchant"], item["card_name"])
+        totals = rollups.setdefault(key, [0.0, 0])
+        totals[0] += item["amount"]
+        totals[1] += 1
+
+        if item.get("rule_key") and item.get("period_key"):
+            spend = ledger.setdefault((item["card_name"], item["rule_key"], item["period_key"]), [0.0, 0.0])
+            spend[0] += item["amount"]
+            spend[1] += item["rule_points"]
+    buffer.seek(0)
+
+    with SessionLocal() as db:
+        cursor = db.connection().connection.cursor()
+        cursor.copy_expert(
+            "COPY transaction_history (user_id, merchant, category, amount, description, card_name, embedding, "
+            "embedding_model, created_at) "
+            "FROM STDIN",
+            buffer
+        )
+
+        for (day, category, merchant, card_name), (amount, count) in rollups.items():
+            record_spend_rollups(db, user_id=user_id, amount=amount, category=category,
+                                 merchant=merchant, card_name=card_name, day=day, count=count)
+        for (card_name, rule, period), (spend, points) in ledger.items():
+            record_rule_spend(db, user_id=user_id, card_name=card_name, rule_key=rule,
+                              period_key=period, spend=spend, points=points)
+
+        publish(f"transactions:{user_id}", db)
+        db.commit()
+
+    return failed
+
+
+def import_statement(user_id: str, lines: Iterable[str], cards: list, parser: LocalTransactionParser,
+                     statement_card: Optional[str] = None, persist: bool = True, embed: bool = True,
+                     batch_size: int = STATEMENT_BATCH_SIZE) -> Iterator[dict]:
+    """
+    Imports a CSV statement and reports the best card for every row.
+
+    Args:
+        cards: The user's CreditCard objects.
+        parser: Local transaction parser used to resolve merchant/category.
+        statement_card: Card the statement belongs to. Missed rewards are
+            measured against it; without it they are measured against the
+            base rate (1 point per Rs. 50).
+        persist: Write the rows to transaction_history (and rollups/ledger).
+            Rows already there (same day, description and amount) are
+            skipped.
+        embed: Embed the rows (batched) when persisting.
+
+    Yields:
+        {"type": "row", ...} per debit, {"type": "skipped", ...} per
+        malformed or already imported row and one final
+        {"type": "summary", ...}. If the import fails part-way, an
+        {"type": "error", ...} event is yielded instead of the summary;
+        batches written before the failure stay committed.
+
+    Caps start from the user's reward ledger for each period the rows fall
+    in and are tracked across the statement, separately for the card
+    actually used and for the best-card plan.
+    """
+    card_by_name = {card.card_name: card for card in cards}
+    used_card = card_by_name.get(statement_card) if statement_card else None
+
+    best_ledger, used_ledger = {}, {}
+    seeded_periods = set()
+    imported_rows = _ImportedRows(user_id) if persist else None
+    batch = []
+    rows = skipped = duplicates = imported = embedding_failures = 0
+    total_spend = best_points = used_points = 0.0
+    missed_by_merchant = {}
+    best_card_counts = {}
+    start = time.perf_counter()
+
+    def _track(ledger, entry, amount):
+        if entry.get("rule_key") and entry.get("period_key"):
+            key = ledger_key(entry["card_name"], entry["rule_key"], entry["period_key"])
+            ledger[key] = ledger.get(key, 0.0) + amount
+
+    def _seed(when):
+        # Spend already on the ledger counts against this statement's caps
+        periods = [key for key in current_period_keys(when) if key not in seeded_periods]
+        if periods:
+            with SessionLocal() as db:
+                spend = get_rule_spend(db, user_id, periods)
+            best_ledger.update(spend)
+            used_ledger.update(spend)
+            seeded_periods.update(periods)
+
+    try:
+        for row in read_statement(lines):
+            if row.skip_reason:
+                skipped += 1
+                yield {"type": "skipped", "line": row.line, "reason": row.skip_reason}
+                continue
+            if imported_rows and imported_rows.claim(row):
+                duplicates += 1
+                yield {"type": "skipped", "line": row.line, "reason": "already imported"}
+                continue
+
+            _seed(row.when)
+            local = parser.parse(row.description)
+            merchant = local.merchant or _fallback_merchant(row.description)
+            category = row.category or local.category
+
+            best_card, best_entry, _ = score_transaction(
+                cards, merchant, category, row.amount, best_ledger, when=row.when
+            )
+            if best_entry:
+                _track(best_ledger, best_entry, row.amount)
+
+            if used_card:
+                used_entry = score_card(used_card, merchant, category, row.amount, used_ledger, when=row.when)
+                _track(used_ledger, used_entry, row.amount)
+            else:
+                used_entry = {"points": row.amount / SPEND_PER_POINT_UNIT}
+
+            row_best = best_entry["points"] if best_entry else 0.0
+            missed = max(row_best - used_entry["points"], 0.0)
+
+            rows += 1
+            total_spend += row.amount
+            best_points += row_best
+            used_points += used_entry["points"]
+            if missed > 0:
+                missed_by_merchant[merchant] = missed_by_merchant.get(merchant, 0.0) + missed
+            if best_card:
+                best_card_counts[best_card.card_name] = best_card_counts.get(best_card.card_name, 0) + 1
+
+            yield {
+                "type": "row",
+                "line": row.line,
+                "date": row.when.date().isoformat(),
+                "description": row.description,
+                "merchant": merchant,
+                "category": category,
+                "amount": row.amount,
+                "best_card": best_card.card_name if best_card else None,
+                "best_points": round(row_best, 2),
+                "best_multiplier": best_entry["multiplier"] if best_entry else None,
+                "used_card": statement_card,
+                "used_points": round(used_entry["points"], 2),
+                "missed_points": round(missed, 2),
+                "missed_inr": round(missed * POINT_VALUE_INR, 2)
+            }
+
+            if persist:
+                batch.append({
+                    "when": row.when,
+                    "merchant": merchant,
+                    "category": category,
+                    "amount": row.amount,
+                    "description": row.description,
+                    "card_name": statement_card,
+                    "rule_key": used_entry.get("rule_key") if used_card else None,
+                    "period_key": used_entry.get("period_key") if used_card else None,
+                    "rule_points": used_entry.get("rule_points", 0.0)
+                })
+                if len(batch) >= batch_size:
+                    embedding_failures += _flush_batch(user_id, batch, embed)
+                    imported += len(batch)
+                    batch = []
+
+        if batch:
+            embedding_failures += _flush_batch(user_id, batch, embed)
+            imported += len(batch)
+    except Exception as e:
+        print(f"❌ Statement import failed for {user_id}: {e}")
+        yield {"type": "error", "message": str(e), "rows": rows, "imported": imported}
+        return
+
+    elapsed = time.perf_counter() - start
+    missed_points = max(best_points - used_points, 0.0)
+    top_missed = sorted(missed_by_merchant.items(), key=lambda item: item[1], reverse=True)[:10]
+
+    yield {
+        "type": "summary",
+        "rows": rows,
+        "imported": imported,
+        "skipped": skipped,
+        "duplicates": duplicates,
+        "embedding_failures": embedding_failures,
+        "total_spend": round(total_spend, 2),
+        "best_points": round(best_points, 2),
+        "used_points": round(used_points, 2),
+        "missed_points": round(missed_points, 2),
+        "missed_inr": round(missed_points * POINT_VALUE_INR, 2),
+        "top_missed_merchants": [
+            {"merchant": merchant, "missed_points": round(points, 2),
+             "missed_inr": round(points * POINT_VALUE_INR, 2)}
+            for merchant, points in top_missed
+        ],
+        "best_card_rows": best_card_counts,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed, 1) if elapsed > 0 else None
+    }
@@ -1,14 +1,9 @@
 """
 Web search tool for finding product prices using Tavily API
 """
-from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.tools import tool
 import re
-import os
-
-# Initialize Tavily search with API key
-os.environ["TAVILY_API_KEY"] = "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"
-tavily_search = TavilySearchResults(max_results=5)
+from app.utils.clients import get_tavily_search
 
 @tool
 def search_product_price(product_name: str) -> str:
@@ -24,7 +19,7 @@ def search_product_price(product_name: str) -> str:
     try:
         # Add "price in India" to get more relevant results
         query = f"{product_name} price in India"
-        results = tavily_search.invoke(query)
+        results = get_tavily_search().invoke(query)
         
         # Tavily returns a list of dicts with 'content' and 'url'
         # Combine all content into a single string
@@ -34,4 +34,44 @@ FINANCE_KEYWORDS = {
     # --- Common High-Volume Merchants (Optional but helpful for intent detection) ---
     "amazon", "flipkart", "myntra", "ajio", "zomato", "swiggy",
     "uber", "ola", "makemytrip", "bookmyshow", "blinkit", "zepto"
+}
+
+# --- Merchant -> Category (seed for the local transaction parser) ---
+# Keys are display names, matching is case/space insensitive
+MERCHANT_CATEGORIES = {
+    "Amazon": "shopping", "Flipkart": "shopping", "Myntra": "shopping",
+    "Ajio": "shopping", "Nykaa": "shopping", "Tata CLiQ": "shopping",
+    "Zomato": "food", "Swiggy": "food", "Dominos": "food", "Starbucks": "food",
+    "Blinkit": "groceries", "Zepto": "groceries", "BigBasket": "groceries",
+    "Swiggy Instamart": "groceries", "DMart": "groceries",
+    "Uber": "travel", "Ola": "travel", "Rapido": "travel",
+    "MakeMyTrip": "travel", "Goibibo": "travel", "Cleartrip": "travel",
+    "IRCTC": "travel", "Yatra": "travel", "IndiGo": "travel", "Air India": "travel",
+    "BookMyShow": "entertainment", "Netflix": "entertainment",
+    "Spotify": "entertainment", "Hotstar": "entertainment",
+    "Indian Oil": "fuel", "HP Petrol": "fuel", "Bharat Petroleum": "fuel",
+}
+
+# Alternate spellings / abbreviations -> display name in MERCHANT_CATEGORIES
+MERCHANT_ALIASES = {
+    "amzn": "Amazon", "amazon.in": "Amazon",
+    "mmt": "MakeMyTrip", "make my trip": "MakeMyTrip",
+    "bms": "BookMyShow", "book my show": "BookMyShow",
+    "big basket": "BigBasket", "instamart": "Swiggy Instamart",
+    "domino's": "Dominos", "d mart": "DMart",
+    "indigo airlines": "IndiGo", "disney hotstar": "Hotstar",
+    "iocl": "Indian Oil", "bpcl": "Bharat Petroleum", "hpcl": "HP Petrol",
+}
+
+# Words in a message that pin down the category on their own
+CATEGORY_KEYWORDS = {
+    "food": ["food", "dinner", "lunch", "breakfast", "restaurant", "dining", "meal", "pizza", "biryani", "coffee"],
+    "groceries": ["grocery", "groceries", "vegetables", "fruits"],
+    "travel": ["flight", "flights", "hotel", "hotels", "cab", "taxi", "train", "bus", "trip", "travel", "ride"],
+    "fuel": ["fuel", "petrol", "diesel"],
+    "shopping": ["shopping", "clothes", "shoes", "electronics", "laptop"],
+    "entertainment": ["movie", "movies", "concert", "subscription"],
+    "utilities": ["electricity", "utility", "utilities", "recharge", "broadband", "wifi"],
+    "rent": ["rent"],
+    "insurance": ["insurance", "premium"],
 }
\ No newline at end of file
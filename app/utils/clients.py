@@ -0,0 +1,58 @@
+"""
+Shared clients for external services, built on first use.
+
+The provider SDKs are imported inside the getters, so importing the graph
+(or a script that never calls an LLM) does not pay for them, and every
+module shares one client per service instead of building its own.
+"""
+import os
+from functools import lru_cache
+
+# Development key used when TAVILY_API_KEY is not set in the environment
+_TAVILY_DEV_KEY = "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"
+
+
+@lru_cache(maxsize=None)
+def get_llm():
+    """Chat model used by every node (gpt-4o-mini)."""
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
+
+
+@lru_cache(maxsize=None)
+def get_embedding_model():
+    """
+    Embedding backend for transactions and memories (EMBEDDING_BACKEND).
+    openai: 'text-embedding-3-small' is cheaper and faster than ada-002,
+    asked for EMBEDDING_DIMENSIONS when the columns store fewer than 1536.
+    """
+    from app.utils import embedding_backends
+    from app.utils.vectors import (EMBEDDING_BACKEND, EMBEDDING_DIMENSIONS, EMBEDDING_LOCAL_WORKERS,
+                                   EMBEDDING_MIXED_WIDTHS, EMBEDDING_MODEL_PATH)
+    if EMBEDDING_BACKEND == "openai":
+        backend = embedding_backends.OpenAIBackend("text-embedding-3-small", EMBEDDING_DIMENSIONS)
+    elif EMBEDDING_BACKEND == "hashing":
+        backend = embedding_backends.HashingBackend(EMBEDDING_DIMENSIONS)
+    elif EMBEDDING_BACKEND == "local":
+        backend = embedding_backends.LocalBackend(EMBEDDING_MODEL_PATH, EMBEDDING_LOCAL_WORKERS)
+    else:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {EMBEDDING_BACKEND!r} (openai, local or hashing)")
+    if backend.dimensions != EMBEDDING_DIMENSIONS and not EMBEDDING_MIXED_WIDTHS:
+        raise ValueError(f"{backend.model_id} returns {backend.dimensions} dimensions but the embedding columns "
+                         f"hold {EMBEDDING_DIMENSIONS}: set EMBEDDING_DIMENSIONS or EMBEDDING_MIXED_WIDTHS=true")
+    return backend
+
+
+@lru_cache(maxsize=None)
+def get_embedding_batcher():
+    """Batches concurrent single-text embeddings into one request (app/utils/embedding_batcher.py)."""
+    from app.utils.embedding_batcher import EmbeddingBatcher
+    return EmbeddingBatcher(lambda texts: get_embedding_model().embed_documents(texts))
+
+
+@lru_cache(maxsize=None)
+def get_tavily_search():
+    """Tavily web search used for product price lookups."""
+    os.environ.setdefault("TAVILY_API_KEY", _TAVILY_DEV_KEY)
+    from langchain_community.tools.tavily_search import TavilySearchResults
+    return TavilySearchResults(max_results=5)
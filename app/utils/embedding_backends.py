@@ -0,0 +1,149 @@
+"""
+Embedding backends, selected with EMBEDDING_BACKEND (see get_embedding_model
+in app/utils/clients.py).
+
+Every backend has LangChain's interface (embed_query / embed_documents) and
+a model_id ("<backend>:<model>:<dimensions>") that is stored with each
+embedding row: searches only compare rows of the active model, so rows of
+several backends can share a table.
+
+- openai:  text-embedding-3-small over the API (network round-trip, per-token cost)
+- local:   a sentence-transformers model loaded from EMBEDDING_MODEL_PATH,
+           run on CPU in a pool of EMBEDDING_LOCAL_WORKERS processes
+           (needs `pip install sentence-transformers`)
+- hashing: deterministic feature hashing of words and character trigrams,
+           no model or network; for tests and offline development only
+
+This module imports nothing from the app, so local worker processes start
+quickly.
+"""
+import hashlib
+import importlib.util
+import math
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+
+class EmbeddingBackend:
+    name = ""
+    model = ""
+    dimensions = 0
+
+    @property
+    def model_id(self) -> str:
+        return f"{self.name}:{self.model}:{self.dimensions}"
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+
+class OpenAIBackend(EmbeddingBackend):
+    name = "openai"
+
+    def __init__(self, model: str = "text-embedding-3-small", dimensions: int = 1536):
+        from langchain_openai import OpenAIEmbeddings
+        self.model = model
+        self.dimensions = dimensions
+        # Shortened (and renormalized) by the API when fewer than 1536 are asked for
+        if dimensions != 1536:
+            self._client = OpenAIEmbeddings(model=model, dimensions=dimensions)
+        else:
+            self._client = OpenAIEmbeddings(model=model)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._client.embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._client.embed_documents(texts)
+
+
+class HashingBackend(EmbeddingBackend):
+    """
+    Signed feature hashing: each word (weight 1) and character trigram of a
+    word (weight 0.5) adds +-weight to one of `dimensions` buckets, then the
+    vector is scaled to unit length. Texts sharing words or spellings are
+    similar; nothing is semantic.
+    """
+    name = "hashing"
+    model = "v1"
+
+    def __init__(self, dimensions: int = 1536):
+        self.dimensions = dimensions
+
+    def _features(self, text: str):
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            yield word, 1.0
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3], 0.5
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            vector = [0.0] * self.dimensions
+            for feature, weight in self._features(text):
+                digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+                vector[digest % self.dimensions] += weight if digest >> 63 else -weight
+            norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+            vectors.append([v / norm for v in vector])
+        return vectors
+
+
+# -- local model, one copy per worker process ----------------------------------
+
+_local_model = None
+
+
+def _init_local_worker(path: str, threads: int):
+    global _local_model
+    from sentence_transformers import SentenceTransformer
+    try:
+        import torch
+        # The pool is the parallelism: keep workers from oversubscribing the cores
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _local_model = SentenceTransformer(path, device="cpu")
+
+
+def _local_dimensions() -> int:
+    return _local_model.get_sentence_embedding_dimension()
+
+
+def _local_embed(texts: List[str]) -> List[List[float]]:
+    return _local_model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).tolist()
+
+
+class LocalBackend(EmbeddingBackend):
+    name = "local"
+
+    def __init__(self, path: str, workers: int = 2, batch_size: int = 32):
+        if not path or not os.path.exists(path):
+            raise ValueError(f"EMBEDDING_MODEL_PATH does not exist: {path!r}")
+        # Checked here: a worker failing its import only reports a broken pool
+        if importlib.util.find_spec("sentence_transformers") is None:
+            raise RuntimeError("EMBEDDING_BACKEND=local needs sentence-transformers (pip install sentence-transformers)")
+        self.model = os.path.basename(os.path.normpath(path))
+        self.batch_size = batch_size
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        # spawn: forking a process with open connections and threads is unsafe
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_local_worker,
+            initargs=(path, threads)
+        )
+        self.dimensions = self._pool.submit(_local_dimensions).result()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        chunks = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        return [vector for chunk in self._pool.map(_local_embed, chunks) for vector in chunk]
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
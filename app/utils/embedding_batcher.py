@@ -0,0 +1,159 @@
+"""
+Micro-batching for single-text embeddings.
+
+Under load, many requests call get_text_embedding for one string at nearly
+the same moment, each paying a full round-trip to the embedding API.
+EmbeddingBatcher queues those calls; a dispatcher thread waits up to
+EMBEDDING_BATCH_WAIT_MS after the first one (or until
+EMBEDDING_BATCH_MAX_SIZE are queued), sends them as one embed_documents
+request and hands each caller its own vector. Identical texts in a batch
+are embedded once. Up to EMBEDDING_BATCH_CONCURRENCY batches are in flight
+at a time. A caller waits at most EMBEDDING_BATCH_TIMEOUT_SECONDS for its
+vector; a failed batch (an error, or fewer vectors than texts) fails every
+caller in it.
+
+embed_bulk() is the explicit API for imports and backfills: the caller
+already has all its texts, so they are sent in chunks of
+EMBEDDING_BULK_BATCH_SIZE without waiting.
+
+report() (GET /metrics) gives the batch-size distribution and how many
+upstream calls batching saved.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, List
+
+EMBEDDING_BATCH_ENABLED = os.getenv("EMBEDDING_BATCH_ENABLED", "true").lower() == "true"
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64"))
+EMBEDDING_BATCH_CONCURRENCY = int(os.getenv("EMBEDDING_BATCH_CONCURRENCY", "4"))
+EMBEDDING_BULK_BATCH_SIZE = int(os.getenv("EMBEDDING_BULK_BATCH_SIZE", "256"))
+EMBEDDING_BATCH_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_BATCH_TIMEOUT_SECONDS", "60"))
+
+# Upper bounds of the batch-size histogram buckets
+_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def _check_count(texts: list, vectors: list):
+    if len(vectors) != len(texts):
+        raise ValueError(f"Embedding backend returned {len(vectors)} vectors for {len(texts)} texts")
+
+
+def _bucket(size: int) -> str:
+    for bound in _BUCKETS:
+        if size <= bound:
+            return str(bound) if bound <= 2 else f"{bound // 2 + 1}-{bound}"
+    return f">{_BUCKETS[-1]}"
+
+
+class EmbeddingBatcher:
+    def __init__(self, embed_documents: Callable[[List[str]], List[List[float]]],
+                 max_wait_ms: float = EMBEDDING_BATCH_WAIT_MS, max_batch: int = EMBEDDING_BATCH_MAX_SIZE,
+                 concurrency: int = EMBEDDING_BATCH_CONCURRENCY,
+                 timeout_seconds: float = EMBEDDING_BATCH_TIMEOUT_SECONDS):
+        self._embed_documents = embed_documents
+        self.timeout = timeout_seconds
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="embedding-batch")
+        self._dispatcher = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.upstream_calls = 0
+        self.deduplicated = 0
+        self.batch_sizes = {}
+        self.bulk_calls = 0
+        self.bulk_texts = 0
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None:
+            with self._lock:
+                if self._dispatcher is None:
+                    self._dispatcher = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                    self._dispatcher.start()
+
+    def embed(self, text: str) -> List[float]:
+        """One text's vector, sent upstream together with concurrent calls."""
+        self._ensure_dispatcher()
+        future = Future()
+        self._queue.put((text, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise TimeoutError(f"No embedding within {self.timeout:g}s") from None
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._executor.submit(self._send, batch)
+            except BaseException as e:
+                self._fail(batch, e)
+
+    @staticmethod
+    def _fail(batch: list, error: BaseException):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def _send(self, batch: list):
+        # Nothing may leave a future pending: its caller would wait for the full timeout
+        try:
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            with self._lock:
+                self.requests += len(batch)
+                self.upstream_calls += 1
+                self.deduplicated += len(batch) - len(texts)
+                bucket = _bucket(len(batch))
+                self.batch_sizes[bucket] = self.batch_sizes.get(bucket, 0) + 1
+            vectors = self._embed_documents(texts)
+            _check_count(texts, vectors)
+            by_text = dict(zip(texts, vectors))
+            for text, future in batch:
+                future.set_result(by_text[text])
+        except BaseException as e:
+            self._fail(batch, e)
+            if not isinstance(e, Exception):
+                raise
+
+    def embed_bulk(self, texts: List[str], batch_size: int = EMBEDDING_BULK_BATCH_SIZE) -> List[List[float]]:
+        """Vectors for many texts in order, in upstream requests of batch_size texts."""
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            chunk = texts[start:start + batch_size]
+            chunk_vectors = self._embed_documents(chunk)
+            _check_count(chunk, chunk_vectors)
+            vectors.extend(chunk_vectors)
+            with self._lock:
+                self.bulk_calls += 1
+                self.bulk_texts += len(chunk)
+        return vectors
+
+    def report(self) -> dict:
+        with self._lock:
+            order = {_bucket(b): i for i, b in enumerate(_BUCKETS)}
+            return {
+                "enabled": EMBEDDING_BATCH_ENABLED,
+                "requests": self.requests,
+                "upstream_calls": self.upstream_calls,
+                "upstream_calls_saved": self.requests - self.upstream_calls,
+                "call_reduction": round(1 - self.upstream_calls / self.requests, 3) if self.requests else 0.0,
+                "avg_batch_size": round(self.requests / self.upstream_calls, 2) if self.upstream_calls else 0.0,
+                "deduplicated": self.deduplicated,
+                "batch_sizes": dict(sorted(self.batch_sizes.items(), key=lambda kv: order.get(kv[0], len(order)))),
+                "bulk_calls": self.bulk_calls,
+                "bulk_texts": self.bulk_texts,
+                "max_wait_ms": self.max_wait * 1000,
+                "max_batch": self.max_batch,
+            }
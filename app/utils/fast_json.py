@@ -0,0 +1,54 @@
+"""
+orjson responses for the large list endpoints (cards, threads).
+
+Those endpoints built a pydantic object per row, which FastAPI validated
+again through response_model before encoding it with the json module.
+json_response encodes plain dicts / rows once with orjson (datetimes as
+ISO 8601, like isoformat()) and gzips bodies of at least GZIP_MIN_BYTES
+when the client accepts it. Routes keep response_model for the OpenAPI
+schema: FastAPI skips it when the route returns a Response.
+
+Compression is per response rather than a GZipMiddleware, which would
+also wrap the streamed (NDJSON / SSE) endpoints.
+"""
+import gzip
+import os
+from typing import Optional
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+
+
+def accepts_gzip(request: Request) -> bool:
+    """Whether Accept-Encoding allows gzip (and does not set q=0 for it)."""
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            q = params.strip().lower()
+            if not q.startswith("q="):
+                return True
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return True
+    return False
+
+
+def json_response(content, request: Optional[Request] = None, status_code: int = 200,
+                  headers: Optional[dict] = None) -> Response:
+    """
+    content encoded with orjson, gzipped when it is at least GZIP_MIN_BYTES
+    and the request accepts gzip.
+    """
+    body = orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    headers = dict(headers or {})
+    if request is not None:
+        headers["Vary"] = "Accept-Encoding"
+        if len(body) >= GZIP_MIN_BYTES and accepts_gzip(request):
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+            headers["Content-Encoding"] = "gzip"
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,214 @@
+"""
+Helpers to turn the free-text fields of a RewardRule into numbers.
+
+RewardRule stores what the issuer wrote ("10X", "5%", "500 pts", "Statement
+Cycle"). The reward engine needs multipliers, cap amounts and a period it
+can bucket spend into.
+"""
+import re
+from datetime import datetime
+from typing import Optional, Tuple
+
+# Points are earned per Rs. 50 spent (the engine's base unit)
+SPEND_PER_POINT_UNIT = 50
+
+_NUMBER_RE = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(k|l|lakhs?|lacs?|cr|crores?)?(?![a-z])", re.IGNORECASE)
+_NUMBER_UNITS = {"k": 1_000, "l": 100_000, "lakh": 100_000, "lakhs": 100_000,
+                 "lac": 100_000, "lacs": 100_000, "cr": 10_000_000,
+                 "crore": 10_000_000, "crores": 10_000_000}
+
+
+def parse_number(raw: str) -> Optional[float]:
+    """'1,000' -> 1000.0, '1.2 Lakhs' -> 120000.0, 'no cap' -> None"""
+    match = _NUMBER_RE.search(raw or "")
+    if not match:
+        return None
+    value = float(match.group(1).replace(",", ""))
+    unit = (match.group(2) or "").lower()
+    return value * _NUMBER_UNITS.get(unit, 1)
+
+
+def parse_multiplier(raw) -> Tuple[str, float]:
+    """
+    '10X' -> ('x', 10.0), '5%' -> ('percent', 5.0),
+    '2 travel credits' -> ('flat', 2.0). Falls back to ('x', 1.0).
+    """
+    raw_mult = str(raw or "").strip()
+
+    match = re.search(r"(\d+(?:\.\d+)?)\s*%", raw_mult)
+    if match:
+        # Treating 1% approx equal to 1 Point for comparison
+        return "percent", float(match.group(1))
+
+    match = re.search(r"(\d+(?:\.\d+)?)\s*x\b", raw_mult, re.IGNORECASE)
+    if match:
+        return "x", float(match.group(1))
+
+    # Regex extraction for "2 travel credits..."
+    match = re.search(r"(\d+(\.\d+)?)", raw_mult)
+    if match:
+        return "flat", float(match.group(1))
+    return "x", 1.0
+
+
+def parse_cap(raw) -> Tuple[Optional[float], Optional[str]]:
+    """
+    '500 pts' -> (500.0, 'points'), 'Rs. 1,000 cashback' -> (1000.0, 'inr'),
+    'No cap' / None -> (None, None)
+    """
+    if not raw:
+        return None, None
+
+    text = str(raw).lower()
+    amount = parse_number(text)
+    if amount is None:
+        return None, None
+
+    if re.search(r"₹|\brs\b|\binr\b|rupee|cashback|statement credit", text):
+        return amount, "inr"
+    if re.search(r"\bpts?\b|point|\brp\b|reward|mile|coin|credit", text):
+        return amount, "points"
+    return amount, None
+
+
+# Period enum values
+PERIOD_TRANSACTION = "transaction"
+PERIOD_DAY = "day"
+PERIOD_WEEK = "week"
+PERIOD_MONTH = "month"
+PERIOD_QUARTER = "quarter"
+PERIOD_YEAR = "year"
+
+PERIODS = (PERIOD_TRANSACTION, PERIOD_DAY, PERIOD_WEEK, PERIOD_MONTH, PERIOD_QUARTER, PERIOD_YEAR)
+
+
+def parse_period(raw) -> Optional[str]:
+    """'Statement Cycle' -> 'month', 'Annual' -> 'year', None -> None"""
+    text = str(raw or "").lower()
+    if not text:
+        return None
+    if "transaction" in text:
+        return PERIOD_TRANSACTION
+    if "quarter" in text:
+        return PERIOD_QUARTER
+    if "year" in text or "annual" in text or "anniversary" in text:
+        return PERIOD_YEAR
+    if "month" in text or "statement" in text or "billing" in text or "cycle" in text:
+        return PERIOD_MONTH
+    if "week" in text:
+        return PERIOD_WEEK
+    if "day" in text or "daily" in text:
+        return PERIOD_DAY
+    return None
+
+
+def period_key(period: Optional[str], when: Optional[datetime] = None) -> str:
+    """
+    Bucket key of the period containing `when`.
+    Caps without a stated period are treated as monthly (statement cycle),
+    which is how Indian issuers apply most accelerated-reward caps.
+    """
+    when = when or datetime.now()
+    period = period or PERIOD_MONTH
+
+    if period == PERIOD_YEAR:
+        return f"{when.year}"
+    if period == PERIOD_QUARTER:
+        return f"{when.year}-Q{(when.month - 1) // 3 + 1}"
+    if period == PERIOD_WEEK:
+        iso = when.isocalendar()
+        return f"{iso[0]}-W{iso[1]:02d}"
+    if period == PERIOD_DAY:
+        return when.strftime("%Y-%m-%d")
+    if period == PERIOD_TRANSACTION:
+        return PERIOD_TRANSACTION
+    return when.strftime("%Y-%m")
+
+
+# How many of each period fit in a year (None / unknown -> monthly)
+PERIODS_PER_YEAR = {
+    PERIOD_DAY: 365,
+    PERIOD_WEEK: 52,
+    PERIOD_MONTH: 12,
+    PERIOD_QUARTER: 4,
+    PERIOD_YEAR: 1,
+}
+
+
+def periods_per_year(period: Optional[str]) -> int:
+    return PERIODS_PER_YEAR.get(period or PERIOD_MONTH, 12)
+
+
+def current_period_keys(when: Optional[datetime] = None) -> list:
+    """Keys of every period bucket that is open right now."""
+    return [period_key(p, when) for p in PERIODS if p != PERIOD_TRANSACTION]
+
+
+def rule_key(category: str) -> str:
+    """Stable ledger key of a reward rule within a card."""
+    return " ".join(str(category or "").lower().split())
+
+
+def cap_spend_limit(mult_kind: str, mult_value: float,
+                    cap_amount: Optional[float], cap_unit: Optional[str]) -> Optional[float]:
+    """
+    Converts a cap into the amount of spend (INR) that can still earn the
+    rule's rate in one period. None means uncapped.
+    """
+    if cap_amount is None or mult_value <= 0:
+        return None
+
+    if cap_unit == "inr" or (cap_unit is None and mult_kind == "percent"):
+        if mult_kind == "percent":
+            # Cashback cap: spend * pct / 100 <= cap
+            return cap_amount * 100 / mult_value
+        # A rupee cap on a points rule is read as a spend ceiling
+        return cap_amount
+
+    # Points cap: spend / 50 * multiplier <= cap
+    return cap_amount * SPEND_PER_POINT_UNIT / mult_value
+
+
+def parse_fee(raw) -> float:
+    """
+    'Rs. 2,500 + GST' -> 2500.0, 'Lifetime Free' / 'Nil' / None -> 0.0
+    """
+    text = str(raw or "").lower()
+    if not text or re.search(r"\bfree\b|\bnil\b|\bnone\b|\bzero\b", text):
+        return 0.0
+    return parse_number(text) or 0.0
+
+
+# -------------------------
+# Ingest-time normalization
+# -------------------------
+# Bump when the parsing above changes; the backfill re-normalizes older rows
+NORMALIZATION_VERSION = 1
+
+
+def normalize_rule(rule: dict) -> dict:
+    """
+    A stored reward rule: the raw fields plus the numbers parsed from them.
+    Done once when a card is written, so scoring never re-parses text.
+    """
+    multiplier_kind, multiplier_value = parse_multiplier(rule.get("multiplier"))
+    cap_amount, cap_unit = parse_cap(rule.get("cap"))
+    return {
+        **rule,
+        "multiplier_kind": multiplier_kind,
+        "multiplier_value": multiplier_value,
+        "cap_amount": cap_amount,
+        "cap_unit": cap_unit,
+        "period_type": parse_period(rule.get("period")),
+    }
+
+
+def parse_fee_waiver_spend(raw) -> Optional[float]:
+    """
+    Yearly spend (INR) that waives the annual fee.
+    'Spend Rs. 3 Lakhs in a year' -> 300000.0, 'Rs. 25,000 per quarter' -> 100000.0
+    """
+    amount = parse_number(str(raw or ""))
+    if not amount:
+        return None
+    return amount * periods_per_year(parse_period(raw) or PERIOD_YEAR)
@@ -0,0 +1,319 @@
+"""
+Local transaction pre-parser.
+
+Resolves amount, merchant and category from short messages like
+"2k on Swiggy", "1 lakh flight on MakeMyTrip" or "₹499 Netflix" without
+an LLM call. transaction_parser_node only falls back to the LLM for the
+fields this parser leaves unresolved.
+
+reports_spend() tells spend the user made ("paid 500 at Swiggy") from a
+question about spend they plan ("which card for 2k on Swiggy?").
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from app.schemas.transaction import Transaction
+from app.utils.CONSTANTS import (
+    CATEGORY_KEYWORDS,
+    FINANCE_KEYWORDS,
+    MERCHANT_ALIASES,
+    MERCHANT_CATEGORIES,
+)
+
+# -------------------------
+# Amount Grammar
+# -------------------------
+# ₹499 | Rs. 500 | 500rs | 500/- | 2k | 2.5 K | 1 lakh | 1.5L | 1,00,000 | 2 crore
+# A bare "l" only means lakh after a decimal ("1.5L"); "2l milk" is litres
+AMOUNT_RE = re.compile(
+    r"""
+    (?<![\w.,])
+    (?:(?P<pre>₹|rs\.?|inr|rupees?)\s*)?
+    (?P<num>\d{1,3}(?:,\d{2,3})+(?:\.\d+)?|\d+(?:\.\d+)?)
+    (?:\s*(?P<unit>k|thousand|lakhs?|lacs?|l|crores?|cr)(?![a-z]))?
+    (?:\s*(?P<post>rs\b\.?|rupees?\b|inr\b|/-)|(?!\w))
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+UNIT_MULTIPLIERS = {
+    "k": 1_000, "thousand": 1_000,
+    "l": 100_000, "lac": 100_000, "lacs": 100_000, "lakh": 100_000, "lakhs": 100_000,
+    "cr": 10_000_000, "crore": 10_000_000, "crores": 10_000_000,
+}
+
+# A bare number only counts as an amount after an amount word ("paid 5000"),
+# or before one of AMOUNT_CUES_AFTER when no other word leads up to it
+# ("5000 on Amazon", not "iPhone 15 on Amazon")
+AMOUNT_CUES_BEFORE = {
+    "spend", "spent", "spending", "spends", "pay", "paid", "paying", "worth",
+    "for", "of", "bill", "cost", "costs", "price", "amount", "total",
+}
+AMOUNT_CUES_AFTER = {"on", "at"}
+
+# Bare numbers below this are counts/models ("iPhone 15", "2 tickets"), not amounts
+MIN_BARE_AMOUNT = 10
+
+
+def parse_amount(text: str) -> Optional[float]:
+    """
+    Extracts the transaction amount in INR using the Indian amount grammar.
+    Returns None if no amount is found.
+    """
+    bare_amount = None
+
+    for match in AMOUNT_RE.finditer(text):
+        value = float(match.group("num").replace(",", ""))
+        unit = (match.group("unit") or "").lower()
+        if unit == "l" and "." not in match.group("num"):
+            continue
+        value *= UNIT_MULTIPLIERS.get(unit, 1)
+
+        # Currency markers or units make the number unambiguous
+        if match.group("pre") or match.group("post") or unit:
+            return value
+
+        if bare_amount is None and value >= MIN_BARE_AMOUNT and _has_amount_cue(text, match):
+            bare_amount = value
+
+    return bare_amount
+
+
+def _has_amount_cue(text: str, match: re.Match) -> bool:
+    words_before = re.findall(r"[a-z]+", text[:match.start()].lower())
+    words_after = re.findall(r"[a-z]+", text[match.end():].lower())
+
+    if words_before and words_before[-1] in AMOUNT_CUES_BEFORE:
+        return True
+    # Straight after a product / model word ("iphone 15", "galaxy s24 ultra 5"):
+    # not an amount we can be sure of, leave it to the LLM
+    if re.search(r"[a-z]\s*$", text[:match.start()].lower()):
+        return False
+    return bool(words_after) and words_after[0] in AMOUNT_CUES_AFTER
+
+
+# -------------------------
+# Spend Reports
+# -------------------------
+# Past-tense spend verbs: the user is telling us about money already spent
+SPENT_WORDS = {
+    "spent", "paid", "bought", "ordered", "purchased", "booked", "recharged",
+    "charged", "swiped", "renewed", "subscribed", "topped",
+}
+# Any of these makes the message a question or a plan, even with a spend verb
+HYPOTHETICAL_WORDS = {
+    "which", "should", "would", "could", "shall", "will", "want", "wanna", "planning",
+    "plan", "going", "thinking", "considering", "best", "recommend", "suggest", "if",
+}
+
+
+def reports_spend(text: str) -> bool:
+    """
+    Whether the message reports spend already made ("spent 2k on Swiggy"),
+    as opposed to asking which card to use. Anything without a past-tense
+    spend verb, or with a question, counts as hypothetical.
+    """
+    words = set(re.findall(r"[a-z]+", text.lower()))
+    return bool(words & SPENT_WORDS) and not words & HYPOTHETICAL_WORDS and "?" not in text
+
+
+# -------------------------
+# Merchant Trie
+# -------------------------
+def normalize_merchant_key(name: str) -> str:
+    """'Make My Trip' / 'makemytrip.com' -> 'makemytrip'"""
+    key = name.lower().strip()
+    key = re.sub(r"\.(com|in|co\.in)$", "", key)
+    return re.sub(r"[^a-z0-9]", "", key)
+
+
+class MerchantTrie:
+    """
+    Character trie over normalized merchant keys.
+    Supports exact lookup, unique prefix completion and fuzzy lookup
+    within a small edit distance (typos like "swigy" or "zomatto").
+    """
+
+    def __init__(self):
+        self.root: Dict = {}
+        self.size = 0
+
+    def insert(self, key: str, value: str):
+        if not key:
+            return
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+        if "$" not in node:
+            self.size += 1
+        node["$"] = value
+
+    def get(self, key: str) -> Optional[str]:
+        node = self._walk(key)
+        return node.get("$") if node is not None else None
+
+    def complete(self, prefix: str) -> Optional[str]:
+        """Returns the merchant only if the prefix identifies exactly one."""
+        node = self._walk(prefix)
+        if node is None:
+            return None
+        values = self._collect(node, limit=2)
+        return values[0] if len(values) == 1 else None
+
+    def fuzzy(self, key: str, max_edits: int = 1) -> Optional[str]:
+        """Closest merchant within max_edits (Levenshtein), None if ambiguous."""
+        best: List = []
+        first_row = list(range(len(key) + 1))
+        for char, child in self.root.items():
+            if char != "$":
+                self._fuzzy_search(child, char, key, first_row, max_edits, best)
+
+        if not best:
+            return None
+        best.sort(key=lambda item: item[0])
+        if len(best) > 1 and best[0][0] == best[1][0] and best[0][1] != best[1][1]:
+            return None
+        return best[0][1]
+
+    def _fuzzy_search(self, node, char, key, previous_row, max_edits, best):
+        row = [previous_row[0] + 1]
+        for i in range(1, len(key) + 1):
+            cost = 0 if key[i - 1] == char else 1
+            row.append(min(row[i - 1] + 1, previous_row[i] + 1, previous_row[i - 1] + cost))
+
+        if "$" in node and row[-1] <= max_edits:
+            best.append((row[-1], node["$"]))
+
+        if min(row) <= max_edits:
+            for next_char, child in node.items():
+                if next_char != "$":
+                    self._fuzzy_search(child, next_char, key, row, max_edits, best)
+
+    def _walk(self, key: str):
+        node = self.root
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node
+
+    def _collect(self, node, limit: int) -> List[str]:
+        values = []
+        stack = [node]
+        while stack and len(values) < limit:
+            current = stack.pop()
+            if "$" in current:
+                values.append(current["$"])
+            stack.extend(child for char, child in current.items() if char != "$")
+        return values
+
+
+# -------------------------
+# Local Parser
+# -------------------------
+@dataclass
+class LocalParseResult:
+    amount: Optional[float] = None
+    merchant: Optional[str] = None
+    category: Optional[str] = None
+
+    @property
+    def is_complete(self) -> bool:
+        return self.amount is not None and bool(self.merchant) and bool(self.category)
+
+    def to_transaction(self) -> Transaction:
+        return Transaction(amount=self.amount, merchant=self.merchant, category=self.category)
+
+
+# Longest merchant alias we try to assemble from consecutive words ("make my trip")
+MAX_MERCHANT_WORDS = 3
+
+# Shortest word we try to complete or fuzzy-match against the trie
+MIN_PREFIX_LENGTH = 4
+MIN_FUZZY_LENGTH = 5
+
+# Finance words that must never be read as a merchant ("book" -> BookMyShow)
+_CATEGORY_WORDS = {word for words in CATEGORY_KEYWORDS.values() for word in words}
+_MERCHANT_WORDS = {normalize_merchant_key(name) for name in MERCHANT_CATEGORIES}
+NON_MERCHANT_WORDS = (FINANCE_KEYWORDS - _MERCHANT_WORDS) | _CATEGORY_WORDS | {
+    "which", "what", "best", "should", "using", "with", "from", "this", "that",
+    "want", "going", "about", "order", "online", "today", "tomorrow", "month",
+}
+
+
+class LocalTransactionParser:
+    """
+    Merchant alias dictionary + amount grammar.
+
+    Seeded from MERCHANT_CATEGORIES (which covers the merchants listed in
+    FINANCE_KEYWORDS) and MERCHANT_ALIASES; merchants found in stored
+    reward_rules are added with add_merchants().
+    """
+
+    def __init__(self):
+        self.trie = MerchantTrie()
+        self.categories: Dict[str, str] = {}
+
+        for name, category in MERCHANT_CATEGORIES.items():
+            self.add_merchant(name, category)
+        for alias, name in MERCHANT_ALIASES.items():
+            self.trie.insert(normalize_merchant_key(alias), name)
+
+    def add_merchant(self, name: str, category: Optional[str] = None):
+        name = name.strip()
+        key = normalize_merchant_key(name)
+        if not key or key == "all":
+            return
+        # Keep the curated display name if the merchant is already known
+        if self.trie.get(key) is None:
+            self.trie.insert(key, name)
+        if category:
+            self.categories.setdefault(self.trie.get(key), category)
+
+    def add_merchants(self, names: Iterable[str]):
+        for name in names:
+            if isinstance(name, str):
+                self.add_merchant(name)
+
+    def parse(self, text: str) -> LocalParseResult:
+        merchant = self.match_merchant(text)
+        category = self.match_category(text) or self.categories.get(merchant)
+
+        return LocalParseResult(
+            amount=parse_amount(text),
+            merchant=merchant,
+            category=category,
+        )
+
+    def match_merchant(self, text: str) -> Optional[str]:
+        words = re.findall(r"[a-z0-9'.&]+", text.lower())
+        words = [w.strip(".") for w in words if w.strip(".")]
+
+        # 1. Exact match, longest run of words first ("swiggy instamart" before "swiggy")
+        for size in range(MAX_MERCHANT_WORDS, 0, -1):
+            for start in range(len(words) - size + 1):
+                key = normalize_merchant_key("".join(words[start:start + size]))
+                merchant = self.trie.get(key) if key else None
+                if merchant:
+                    return merchant
+
+        # 2. Prefix completion / typo tolerance on single words
+        for word in words:
+            key = normalize_merchant_key(word)
+            if len(key) < MIN_PREFIX_LENGTH or key in NON_MERCHANT_WORDS or key.isdigit():
+                continue
+            merchant = self.trie.complete(key)
+            if not merchant and len(key) >= MIN_FUZZY_LENGTH:
+                merchant = self.trie.fuzzy(key)
+            if merchant:
+                return merchant
+
+        return None
+
+    def match_category(self, text: str) -> Optional[str]:
+        words = set(re.findall(r"[a-z]+", text.lower()))
+        for category, keywords in CATEGORY_KEYWORDS.items():
+            if words.intersection(keywords):
+                return category
+        return None
@@ -1,9 +1,44 @@
-from langchain_openai import OpenAIEmbeddings
 import os
 
-# Initialize the embedding model once
-# 'text-embedding-3-small' is cheaper and faster than ada-002
-embedding_model = OpenAIEmbeddings(model="text-embedding-3-small")
+from app.utils.clients import get_embedding_batcher, get_embedding_model
+from app.utils.embedding_batcher import EMBEDDING_BATCH_ENABLED
+
+# Embedding width and storage type of every embedding column.
+# text-embedding-3-small returns 1536 dimensions, or fewer when asked
+# (shortened and renormalized by the API). 'halfvec' stores float16
+# (half the size, pgvector >= 0.7). Change both together with
+# migrate_embedding_storage.py, which converts the existing rows.
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "1536"))
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "vector").lower()
+if EMBEDDING_STORAGE not in ("vector", "halfvec"):
+    raise ValueError(f"EMBEDDING_STORAGE must be 'vector' or 'halfvec', not {EMBEDDING_STORAGE!r}")
+
+# Embedding backend: openai, local or hashing (app/utils/embedding_backends.py)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai").lower()
+EMBEDDING_MODEL_PATH = os.getenv("EMBEDDING_MODEL_PATH", "")
+EMBEDDING_LOCAL_WORKERS = int(os.getenv("EMBEDDING_LOCAL_WORKERS", "2"))
+# Columns declared without a width, so backends of different widths can
+# share the tables (migrate_add_embedding_model.py --mixed-widths). pgvector
+# cannot index such columns: vector searches become exact scans.
+EMBEDDING_MIXED_WIDTHS = os.getenv("EMBEDDING_MIXED_WIDTHS", "false").lower() == "true"
+
+
+def embedding_column_type():
+    """SQLAlchemy type of the embedding columns for the configured storage."""
+    from pgvector.sqlalchemy import HALFVEC, Vector
+    dimensions = None if EMBEDDING_MIXED_WIDTHS else EMBEDDING_DIMENSIONS
+    if EMBEDDING_STORAGE == "halfvec":
+        return HALFVEC(dimensions)
+    return Vector(dimensions)
+
+
+def embedding_model_id() -> str:
+    """
+    Stored in embedding_model next to every embedding; vector searches only
+    compare rows of this model.
+    """
+    return get_embedding_model().model_id
+
 
 def get_text_embedding(text: str) -> list:
     """
@@ -12,4 +47,15 @@ def get_text_embedding(text: str) -> list:
     """
     # Clean newlines to ensure consistent vectors
     clean_text = text.replace("\n", " ").strip()
-    return embedding_model.embed_query(clean_text)
\ No newline at end of file
+    # Concurrent calls share one upstream request
+    if EMBEDDING_BATCH_ENABLED:
+        return get_embedding_batcher().embed(clean_text)
+    return get_embedding_model().embed_query(clean_text)
+
+def get_text_embeddings(texts: list) -> list:
+    """
+    Batch version of get_text_embedding (imports, backfills): one API
+    request per EMBEDDING_BULK_BATCH_SIZE texts instead of one per text.
+    """
+    clean_texts = [text.replace("\n", " ").strip() for text in texts]
+    return get_embedding_batcher().embed_bulk(clean_texts)
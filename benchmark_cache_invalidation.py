@@ -0,0 +1,145 @@
+"""
+Benchmark for cross-worker cache invalidation (Postgres LISTEN/NOTIFY).
+
+Starts two worker processes against the local Postgres, each running the
+cache_bus listener like an API worker does. Then:
+1. Worker A publishes --notifications keys; worker B reports how long each
+   took to arrive (publish -> listener dispatch).
+2. Both workers cache a benchmark user's cards; worker A stores a new card
+   --cards times and we time until worker B's cached portfolio shows it.
+
+The benchmark user and its cards are deleted at the end.
+
+Usage:
+    python benchmark_cache_invalidation.py [--notifications 500] [--cards 20]
+"""
+import argparse
+import multiprocessing as mp
+import statistics
+import time
+
+BENCH_USER = "bench_cache_bus_user"
+
+
+def _worker(name: str, conn):
+    """Command loop of one worker process."""
+    from app.db.database import SessionLocal
+    from app.db.card_repository import add_card, get_user_credit_cards
+    from app.schemas.credit_card import CreditCard, RewardRule
+    from app.services import cache_bus
+
+    cache_bus.start_listener()
+    conn.send("ready")
+
+    while True:
+        command, arg = conn.recv()
+        if command == "stop":
+            cache_bus.stop_listener()
+            conn.send("stopped")
+            return
+        if command == "publish":
+            for i in range(arg):
+                cache_bus.publish(f"bench:{i}")
+                time.sleep(0.002)
+            conn.send("done")
+        elif command == "latencies":
+            conn.send(list(cache_bus.propagation_latencies))
+            cache_bus.propagation_latencies.clear()
+        elif command == "count":
+            with SessionLocal() as db:
+                conn.send(len(get_user_credit_cards(db, BENCH_USER)))
+        elif command == "wait_count":
+            # Poll the cached portfolio until it reaches the expected size
+            expected, timeout = arg
+            start = time.perf_counter()
+            while time.perf_counter() - start < timeout:
+                with SessionLocal() as db:
+                    if len(get_user_credit_cards(db, BENCH_USER)) >= expected:
+                        break
+                time.sleep(0.0005)
+            conn.send(time.perf_counter() - start)
+        elif command == "add_card":
+            card = CreditCard(
+                card_name=f"Bench Card {arg}", issuer="Bench Bank", card_type="Visa", annual_fee="Rs. 500",
+                fee_waiver_condition=None, welcome_bonus=None, reward_program_name=None,
+                reward_rules=[RewardRule(category="Others", multiplier="2X", merchants=["All"])],
+                eligibility_criteria=None, excluded_categories=[], key_benefits=[]
+            )
+            with SessionLocal() as db:
+                add_card(db, card, BENCH_USER)
+            conn.send(time.perf_counter())
+
+
+def _percentiles(values_ms: list) -> str:
+    values = sorted(values_ms)
+    p = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return f"p50 {p(0.50):.2f} ms | p95 {p(0.95):.2f} ms | p99 {p(0.99):.2f} ms | max {values[-1]:.2f} ms"
+
+
+def cleanup():
+    from sqlalchemy import text
+    from app.db.database import engine
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM credit_cards WHERE user_id = :u"), {"u": BENCH_USER})
+
+
+def main(notifications: int, cards: int):
+    ctx = mp.get_context("spawn")
+    pipes = {}
+    processes = []
+    for name in ("A", "B"):
+        parent, child = ctx.Pipe()
+        process = ctx.Process(target=_worker, args=(name, child), daemon=True)
+        process.start()
+        pipes[name] = parent
+        processes.append(process)
+    for pipe in pipes.values():
+        assert pipe.recv() == "ready"
+
+    cleanup()
+    try:
+        # 1. Raw notification propagation A -> B
+        pipes["B"].send(("latencies", None))
+        pipes["B"].recv()
+        pipes["A"].send(("publish", notifications))
+        pipes["A"].recv()
+        time.sleep(0.2)
+        pipes["B"].send(("latencies", None))
+        notify_ms = [s * 1000 for s in pipes["B"].recv()]
+
+        # 2. End to end: card stored on A becomes visible in B's cached portfolio
+        for pipe in pipes.values():
+            pipe.send(("count", None))
+            pipe.recv()
+        visible_ms = []
+        for i in range(cards):
+            pipes["A"].send(("add_card", i))
+            pipes["A"].recv()
+            pipes["B"].send(("wait_count", (i + 1, 5.0)))
+            visible_ms.append(pipes["B"].recv() * 1000)
+    finally:
+        cleanup()
+        for pipe in pipes.values():
+            pipe.send(("stop", None))
+            pipe.recv()
+        for process in processes:
+            process.join(timeout=10)
+
+    print("=" * 60)
+    print("CACHE INVALIDATION BENCHMARK (2 workers, LISTEN/NOTIFY)")
+    print("=" * 60)
+    print(f"Notifications delivered: {len(notify_ms)}/{notifications}")
+    if notify_ms:
+        print(f"  publish -> dispatch:   {_percentiles(notify_ms)}")
+        print(f"  mean:                  {statistics.mean(notify_ms):.2f} ms")
+    print(f"Cards stored on A:       {cards}")
+    print(f"  commit -> visible on B: {_percentiles(visible_ms)}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cross-worker cache invalidation")
+    parser.add_argument("--notifications", type=int, default=500)
+    parser.add_argument("--cards", type=int, default=20)
+    args = parser.parse_args()
+    main(args.notifications, args.cards)
@@ -0,0 +1,166 @@
+"""
+Benchmark for catalog-wide card suggestions (app/services/card_catalog.py).
+
+Seeds --cards synthetic cards (capped accelerated rules over a pool of
+merchants, generic rules, exclusions, milestones, fees with waivers) under
+benchmark users, and 12 months of spend rollups for a benchmark profile
+user with --lines merchant / category lines. Then reports
+- the catalog build time (load + inverted index)
+- p50/p99 of ranking every catalog card for the user (--runs times)
+- a cross-check of score_lines against the optimizer run on each card
+  alone (optimize_allocation, one card at a time) for --verify cards
+  including the top 10; values must agree to the paisa
+
+Needs the rollups and JSONB migrations. Benchmark rows are deleted at the end.
+
+Usage:
+    python benchmark_card_catalog.py [--cards 5000] [--lines 60] [--runs 50] [--verify 200]
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date
+
+from sqlalchemy import text
+
+BENCH_PREFIX = "bench_card_catalog_"
+PROFILE_USER = BENCH_PREFIX + "profile"
+MERCHANTS = ["Swiggy", "Zomato", "Amazon", "Flipkart", "Uber", "Ola", "MakeMyTrip", "BigBasket", "Netflix",
+             "Airtel", "Indian Oil", "BookMyShow", "Myntra", "Nykaa", "IRCTC", "Starbucks", "Ajio", "Tata CLiQ",
+             "Cleartrip", "Yatra", "Blinkit", "Zepto", "Dunzo", "Croma", "Reliance Digital", "PVR", "Spotify"]
+MERCHANTS += [f"Partner {i}" for i in range(300)]
+CATEGORIES = ["Food", "Shopping", "Travel", "Fuel", "Insurance", "Utilities", "Rent", "Wallet Loads", "Groceries"]
+
+
+def fake_card(i: int) -> dict:
+    rules = [{
+        "category": f"Accelerated {n}", "multiplier": f"{random.choice([2, 3, 5, 10])}X",
+        "merchants": random.sample(MERCHANTS, random.randint(1, 4)),
+        "cap": random.choice([None, "1000 points", "2500 points", "Rs. 500"]), "period": random.choice(["Month", "Year"])
+    } for n in range(random.randint(1, 3))]
+    if random.random() < 0.7:
+        rules.append({"category": "All other spends", "multiplier": f"{random.choice([1, 2])}X", "merchants": ["All"],
+                      "cap": None, "period": None})
+    fee = random.choice([0, 500, 1000, 2500, 5000, 10000])
+    milestones = [{"spend_threshold": f"Rs. {random.choice([1, 2, 3, 5])} Lakhs",
+                   "reward": f"Rs. {random.choice([500, 1000, 2500])} voucher", "period": "Annual"}
+                  for _ in range(random.randint(0, 2))]
+    return {
+        "user_id": f"{BENCH_PREFIX}{i % 100}", "card_key": f"bench|catalog card {i}",
+        "card_name": f"Catalog Card {i}", "issuer": "Bench", "card_type": "Credit Card",
+        "annual_fee": f"Rs. {fee}" if fee else "Nil",
+        "fee_waiver_condition": f"Spend Rs. {random.choice([1, 2, 3])} Lakhs in a year" if fee else None,
+        "reward_rules": json.dumps(rules), "milestone_benefits": json.dumps(milestones), "eligibility_criteria": None,
+        "excluded_categories": json.dumps(random.sample(CATEGORIES[3:], random.randint(0, 3))), "key_benefits": "[]",
+    }
+
+
+def profile_rows(lines: int) -> list:
+    today = date.today()
+    months = [f"{(today.year * 12 + today.month - 1 - k) // 12:04d}-{(today.month - 1 - k) % 12 + 1:02d}"
+              for k in range(12)]
+    spend = [(random.choice(MERCHANTS[:27] + [f"Local Store {n}" for n in range(20)]).lower(),
+              random.choice(CATEGORIES).lower(), random.uniform(200, 15000)) for _ in range(lines)]
+    return [(PROFILE_USER, month, category, merchant, "", round(amount * random.uniform(0.5, 1.5), 2), 3)
+            for month in months for merchant, category, amount in spend]
+
+
+def seed(count: int, lines: int):
+    from psycopg2.extras import execute_values
+    from app.db.database import engine
+    cards = [fake_card(i) for i in range(count)]
+    columns = list(cards[0])
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        execute_values(cursor, f"INSERT INTO credit_cards ({', '.join(columns)}) VALUES %s",
+                       [tuple(card[c] for c in columns) for card in cards], page_size=1000)
+        execute_values(cursor, """
+            INSERT INTO spend_monthly_rollups (user_id, month, category, merchant, card_name, total_amount, txn_count)
+            VALUES %s ON CONFLICT DO NOTHING
+        """, profile_rows(lines), page_size=1000)
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def cleanup():
+    from app.db.database import engine
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM credit_cards WHERE user_id LIKE :p"), {"p": BENCH_PREFIX + "%"})
+        conn.execute(text("DELETE FROM spend_monthly_rollups WHERE user_id LIKE :p"), {"p": BENCH_PREFIX + "%"})
+
+
+def _percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def verify(catalog, lines: list, sample: int) -> tuple:
+    """Max |score_lines - optimize_allocation| over the top 10 and `sample` random cards."""
+    import numpy as np
+    from app.services.card_catalog import score_lines
+    from app.services.portfolio_optimizer import optimize_allocation
+
+    scores = score_lines(catalog, lines)
+    monthly = [{"merchant": line["merchant"], "category": line["category"], "amount": line["annual_amount"] / 12}
+               for line in lines]
+    top = list(np.argsort(-scores["net_inr"])[:10])
+    checked = set(top) | set(random.sample(range(len(catalog)), min(sample, len(catalog))))
+    worst = 0.0
+    for c in checked:
+        expected = optimize_allocation([catalog.cards[c]], monthly)["net_annual_value_inr"]
+        worst = max(worst, abs(expected - round(float(scores["net_inr"][c]), 2)))
+    return len(checked), worst
+
+
+def main(count: int, lines: int, runs: int, sample: int):
+    from app.db.database import SessionLocal
+    from app.services.card_catalog import CardCatalog, _trim_profile
+    from app.services.spend_service import get_spend_profile
+
+    cleanup()
+    seed(count, lines)
+    try:
+        catalog = CardCatalog()
+        start = time.perf_counter()
+        built = catalog.get()
+        build_ms = (time.perf_counter() - start) * 1000
+
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = catalog.suggest(PROFILE_USER, limit=10)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        db = SessionLocal()
+        try:
+            profile = _trim_profile(get_spend_profile(db, PROFILE_USER)["lines"])
+        finally:
+            db.close()
+        checked, worst = verify(built, profile, sample)
+    finally:
+        cleanup()
+
+    print("=" * 70)
+    print("CARD CATALOG SUGGESTIONS (rank every catalog card on a user's spend)")
+    print("=" * 70)
+    print(f"Catalog cards: {len(built)}   Indexed merchants: {len(built.postings)}   Profile lines: {len(profile)}")
+    print(f"Catalog build: {build_ms:.0f} ms")
+    print(f"Ranking ({runs} runs): p50 {_percentile(timings, 0.5):.2f} ms   p99 {_percentile(timings, 0.99):.2f} ms")
+    best = result["suggestions"][0] if result["suggestions"] else None
+    if best:
+        print(f"Best card: {best['card_name']} (net ₹{best['net_annual_value_inr']:,.2f}/year)")
+    print(f"Cross-check vs optimize_allocation: {checked} cards, max difference ₹{worst:.2f}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark catalog-wide card suggestions")
+    parser.add_argument("--cards", type=int, default=5000)
+    parser.add_argument("--lines", type=int, default=60, help="Distinct merchant / category lines of the profile")
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--verify", type=int, default=200, help="Random cards cross-checked against the optimizer")
+    args = parser.parse_args()
+    main(args.cards, args.lines, args.runs, args.verify)
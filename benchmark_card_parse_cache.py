@@ -0,0 +1,104 @@
+"""
+Benchmark for the card extraction cache.
+
+Times extract_card_cached for one pasted card text:
+- miss: the extraction runs (a stand-in that sleeps --llm-ms, the typical
+  latency of the structured gpt-4o-mini call) and its result is stored
+- hit: the same text again, with different whitespace
+- changed prompt: the same text under an edited system prompt (a miss)
+
+The benchmark entries are deleted at the end.
+
+Usage:
+    python benchmark_card_parse_cache.py [--runs 200] [--llm-ms 3000]
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import text
+from app.db.database import engine
+from app.graph.nodes import ADD_CARD_SYSTEM_PROMPT
+from app.schemas.credit_card import CreditCard, Milestone, RewardRule
+from app.services.card_parse_cache import card_parse_key, extract_card_cached
+
+CARD_TEXT = """
+HDFC Regalia Gold Credit Card. Joining / annual fee Rs. 2,500 + GST, waived on spends of Rs. 3 Lakhs in a year.
+5X Reward Points on Nykaa, Myntra, Marks & Spencer and Reliance Digital (capped at 5,000 points per month).
+4 Reward Points per Rs. 150 on all other retail spends. Fuel, rent and wallet loads are excluded.
+Milestone: Rs. 1,500 voucher on spending Rs. 1.5 Lakhs in a calendar quarter.
+"""
+
+EXTRACTED = CreditCard(
+    extracted_from_user=True,
+    card_name="HDFC Regalia Gold",
+    issuer="HDFC Bank",
+    card_type="Visa",
+    annual_fee="Rs. 2,500 + GST",
+    fee_waiver_condition="Spend Rs. 3 Lakhs in a year",
+    welcome_bonus=None,
+    reward_program_name="Reward Points",
+    reward_rules=[
+        RewardRule(category="Partner brands", multiplier="5X", merchants=["Nykaa", "Myntra", "Marks & Spencer",
+                                                                          "Reliance Digital"],
+                   cap="5,000 points", period="Month"),
+        RewardRule(category="Others", multiplier="4 RP per Rs. 150", merchants=["All"])
+    ],
+    milestone_benefits=[Milestone(spend_threshold="Rs. 1.5 Lakhs", reward="Rs. 1,500 voucher", period="Quarterly")],
+    eligibility_criteria=None,
+    excluded_categories=["fuel", "rent", "wallet loads"],
+    key_benefits=[]
+)
+
+
+def main(runs: int, llm_ms: float):
+    calls = {"llm": 0}
+
+    def extract():
+        calls["llm"] += 1
+        time.sleep(llm_ms / 1000)
+        return EXTRACTED
+
+    edited_prompt = ADD_CARD_SYSTEM_PROMPT + "\nAlways answer in English.\n"
+    keys = [card_parse_key(CARD_TEXT, ADD_CARD_SYSTEM_PROMPT), card_parse_key(CARD_TEXT, edited_prompt)]
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM card_parse_cache WHERE content_hash = ANY(:keys)"), {"keys": keys})
+
+    try:
+        start = time.perf_counter()
+        extract_card_cached(CARD_TEXT, ADD_CARD_SYSTEM_PROMPT, extract)
+        miss_ms = (time.perf_counter() - start) * 1000
+
+        repasted = "  " + "\n\n".join(CARD_TEXT.split("\n")) + "  "
+        hit_ms = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            card = extract_card_cached(repasted, ADD_CARD_SYSTEM_PROMPT, extract)
+            hit_ms.append((time.perf_counter() - start) * 1000)
+        assert card == EXTRACTED
+
+        start = time.perf_counter()
+        extract_card_cached(CARD_TEXT, edited_prompt, extract)
+        changed_ms = (time.perf_counter() - start) * 1000
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM card_parse_cache WHERE content_hash = ANY(:keys)"), {"keys": keys})
+
+    hit_ms.sort()
+    print("=" * 60)
+    print("CARD PARSE CACHE BENCHMARK")
+    print("=" * 60)
+    print(f"Miss (extraction {llm_ms:.0f} ms): {miss_ms:9.1f} ms")
+    print(f"Hit  p50:                  {statistics.median(hit_ms):9.2f} ms")
+    print(f"Hit  p99:                  {hit_ms[int(0.99 * (len(hit_ms) - 1))]:9.2f} ms")
+    print(f"Edited prompt (miss):      {changed_ms:9.1f} ms")
+    print(f"Extractions run:           {calls['llm']} for {runs + 2} parses")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the card extraction cache")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--llm-ms", type=float, default=3000)
+    args = parser.parse_args()
+    main(args.runs, args.llm_ms)
@@ -0,0 +1,159 @@
+"""
+Benchmark for SQL-side card rule filtering (card_repository.find_cards_for_merchant).
+
+Seeds --cards synthetic cards (reward rules over a pool of merchants, some
+generic "All" rules and excluded categories) for benchmark users, then for
+--queries merchant lookups (exact, partial and longer merchant inputs, with
+a category) compares
+- python: load every stored card and filter with match_rule / exclusions
+          (how a catalog-wide query works on JSON columns)
+- sql:    find_cards_for_merchant (GIN-indexed JSONB filters, candidates only)
+and reports p50/p99 latency, rows transferred per query, and checks both
+return the same cards. Needs migrate_jsonb_card_rules.py.
+
+The benchmark cards are deleted at the end.
+
+Usage:
+    python benchmark_card_rule_queries.py [--cards 5000] [--queries 100]
+"""
+import argparse
+import json
+import random
+import time
+
+from sqlalchemy import text
+
+BENCH_PREFIX = "bench_card_rules_"
+MERCHANTS = ["Swiggy", "Zomato", "Amazon", "Flipkart", "Uber", "Ola", "MakeMyTrip", "BigBasket", "Netflix",
+             "Airtel", "Indian Oil", "BookMyShow", "Myntra", "Nykaa", "IRCTC", "Starbucks", "Ajio", "Tata CLiQ",
+             "Cleartrip", "Yatra", "Blinkit", "Zepto", "Dunzo", "Croma", "Reliance Digital", "PVR", "Spotify"]
+MERCHANTS += [f"Partner {i}" for i in range(300)]
+CATEGORIES = ["Fuel", "Insurance", "Utilities", "Rent", "Wallet Loads", "Cash Transactions", "EMI conversion"]
+
+
+def fake_card(i: int) -> dict:
+    rules = [{
+        "category": f"Accelerated {n}", "multiplier": f"{random.choice([2, 3, 5, 10])}X",
+        "merchants": random.sample(MERCHANTS, random.randint(1, 4)), "cap": None, "period": "Month"
+    } for n in range(random.randint(1, 3))]
+    if random.random() < 0.5:
+        rules.append({"category": "All other spends", "multiplier": "1X", "merchants": ["All"], "cap": None,
+                      "period": None})
+    return {
+        "user_id": f"{BENCH_PREFIX}{i % 100}", "card_key": f"bench|card {i}", "card_name": f"Bench Card {i}",
+        "issuer": "Bench Bank", "card_type": "Credit Card", "annual_fee": "Rs. 500",
+        "reward_rules": json.dumps(rules), "milestone_benefits": "[]", "eligibility_criteria": None,
+        "excluded_categories": json.dumps(random.sample(CATEGORIES, random.randint(0, 3))), "key_benefits": "[]",
+    }
+
+
+def seed(count: int):
+    from psycopg2.extras import execute_values
+    from app.db.database import engine
+    cards = [fake_card(i) for i in range(count)]
+    columns = list(cards[0])
+    raw = engine.raw_connection()
+    try:
+        execute_values(raw.cursor(), f"INSERT INTO credit_cards ({', '.join(columns)}) VALUES %s",
+                       [tuple(card[c] for c in columns) for card in cards], page_size=1000)
+        raw.commit()
+    finally:
+        raw.close()
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE credit_cards"))
+
+
+def cleanup():
+    from app.db.database import engine
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM credit_cards WHERE user_id LIKE :p"), {"p": BENCH_PREFIX + "%"})
+
+
+def python_filter(db, merchant: str, category: str) -> tuple:
+    """Baseline: every card loaded, filtered like score_card"""
+    from app.db.card_repository import to_credit_card
+    from app.db.models import CreditCardModel
+    from app.services.reward_engine import is_generic, match_rule
+    merchant_input = merchant.lower().strip()
+    rows = db.query(CreditCardModel).all()
+    cards = []
+    for row in rows:
+        card = to_credit_card(row)
+        exclusions = [e.lower() for e in card.excluded_categories]
+        if category.lower() in exclusions or merchant_input in exclusions:
+            continue
+        rule = match_rule(card, merchant_input)
+        if rule and not is_generic(rule):
+            cards.append(card)
+    return cards, len(rows)
+
+
+def _percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main(count: int, queries: int):
+    from sqlalchemy import event
+    from app.db.card_repository import find_cards_for_merchant
+    from app.db.database import SessionLocal, engine
+
+    fetched = {"rows": 0}
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def count_rows(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            fetched["rows"] += max(cursor.rowcount, 0)
+
+    lookups = []
+    for _ in range(queries):
+        merchant = random.choice(MERCHANTS[:27])
+        lookups.append((random.choice([merchant, merchant[:4], f"{merchant} order 4471"]), random.choice(CATEGORIES)))
+
+    cleanup()
+    seed(count)
+    timings = {"python": [], "sql": []}
+    transferred = {"python": 0, "sql": 0}
+    mismatches = 0
+    db = SessionLocal()
+    try:
+        for merchant, category in lookups:
+            fetched["rows"] = 0
+            start = time.perf_counter()
+            expected, _ = python_filter(db, merchant, category)
+            timings["python"].append((time.perf_counter() - start) * 1000)
+            transferred["python"] += fetched["rows"]
+            db.expunge_all()
+
+            fetched["rows"] = 0
+            start = time.perf_counter()
+            found = find_cards_for_merchant(db, merchant, category)
+            timings["sql"].append((time.perf_counter() - start) * 1000)
+            transferred["sql"] += fetched["rows"]
+            db.expunge_all()
+
+            if sorted(c.card_name for c in found) != sorted(c.card_name for c in expected):
+                mismatches += 1
+    finally:
+        db.close()
+        cleanup()
+
+    print("=" * 70)
+    print("CARD RULE QUERIES (catalog-wide merchant match + exclusions)")
+    print("=" * 70)
+    print(f"Cards: {count}   Queries: {queries}")
+    print(f"{'path':8} {'p50 ms':>9} {'p99 ms':>9} {'rows/query':>11}")
+    for path in ("python", "sql"):
+        print(f"{path:8} {_percentile(timings[path], 0.5):9.2f} {_percentile(timings[path], 0.99):9.2f} "
+              f"{transferred[path] / queries:11.1f}")
+    print(f"Speedup (p50): {_percentile(timings['python'], 0.5) / _percentile(timings['sql'], 0.5):.1f}x   "
+          f"Result mismatches: {mismatches}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark SQL-side card rule filtering")
+    parser.add_argument("--cards", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+    main(args.cards, args.queries)
@@ -0,0 +1,102 @@
+"""
+Throughput benchmark for the embedding backends (app/utils/embedding_backends.py).
+
+For each backend, embeds --texts synthetic transaction texts
+- one by one (embed_query, how memory reads and writes call it)
+- in batches of --batch-size (embed_documents, how statement imports call it)
+and reports embeddings per second and the per-call latency.
+
+Backends that cannot run here are skipped:
+- openai needs OPENAI_API_KEY
+- local needs --model-path (or EMBEDDING_MODEL_PATH) and sentence-transformers
+
+Usage:
+    python benchmark_embedding_backends.py [--backends hashing,openai,local] [--texts 500]
+                                           [--batch-size 64] [--model-path PATH] [--workers 2]
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+from app.utils.embedding_backends import HashingBackend, LocalBackend, OpenAIBackend
+
+MERCHANTS = ["Swiggy", "Zomato", "Amazon", "Flipkart", "Uber", "Ola", "MakeMyTrip", "BigBasket", "Netflix",
+             "Airtel", "Indian Oil", "BookMyShow", "Myntra", "Nykaa", "IRCTC", "Starbucks"]
+CATEGORIES = ["food", "shopping", "travel", "groceries", "entertainment", "fuel", "utilities"]
+
+
+def sample_texts(count: int) -> list:
+    return [f"Merchant: {random.choice(MERCHANTS)}, Category: {random.choice(CATEGORIES)}, "
+            f"Description: order #{random.randint(1000, 99999)}" for _ in range(count)]
+
+
+def build(name: str, dimensions: int, model_path: str, workers: int):
+    if name == "hashing":
+        return HashingBackend(dimensions)
+    if name == "openai":
+        if not os.getenv("OPENAI_API_KEY"):
+            raise RuntimeError("OPENAI_API_KEY not set")
+        return OpenAIBackend("text-embedding-3-small", dimensions)
+    if name == "local":
+        return LocalBackend(model_path, workers)
+    raise ValueError(f"Unknown backend {name!r}")
+
+
+def measure(backend, texts: list, batch_size: int) -> dict:
+    single = []
+    for text in texts[:min(len(texts), 100)]:
+        start = time.perf_counter()
+        backend.embed_query(text)
+        single.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        backend.embed_documents(texts[i:i + batch_size])
+    batched_s = time.perf_counter() - start
+    return {
+        "single_per_s": len(single) / sum(single),
+        "single_ms": statistics.median(single) * 1000,
+        "batch_per_s": len(texts) / batched_s,
+        "batch_ms": batched_s / -(-len(texts) // batch_size) * 1000,
+    }
+
+
+def main(backends: list, texts: int, batch_size: int, dimensions: int, model_path: str, workers: int):
+    corpus = sample_texts(texts)
+    results = []
+    for name in backends:
+        try:
+            backend = build(name, dimensions, model_path, workers)
+            backend.embed_documents(corpus[:2])  # warm up (connections, model load)
+            results.append((backend.model_id, measure(backend, corpus, batch_size)))
+            if isinstance(backend, LocalBackend):
+                backend.close()
+        except Exception as e:
+            results.append((name, f"skipped: {e}"))
+
+    print("=" * 78)
+    print("EMBEDDING BACKEND THROUGHPUT")
+    print("=" * 78)
+    print(f"Texts: {texts}   Batch size: {batch_size}   Local workers: {workers}")
+    print(f"{'backend':38} {'single/s':>9} {'single ms':>10} {'batch/s':>9} {'batch ms':>9}")
+    for model_id, result in results:
+        if isinstance(result, str):
+            print(f"{model_id:38} {result}")
+            continue
+        print(f"{model_id:38} {result['single_per_s']:9.1f} {result['single_ms']:10.2f} "
+              f"{result['batch_per_s']:9.1f} {result['batch_ms']:9.1f}")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark embedding backend throughput")
+    parser.add_argument("--backends", default="hashing,openai,local")
+    parser.add_argument("--texts", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--dimensions", type=int, default=1536, help="For the openai and hashing backends")
+    parser.add_argument("--model-path", default=os.getenv("EMBEDDING_MODEL_PATH", ""))
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    main(args.backends.split(","), args.texts, args.batch_size, args.dimensions, args.model_path, args.workers)
@@ -0,0 +1,145 @@
+"""
+Concurrency sweep for embedding micro-batching (app/utils/embedding_batcher.py).
+
+For each --concurrency level, that many threads each embed --calls texts one
+at a time, like concurrent chat requests calling get_text_embedding:
+- direct:  every call is its own upstream request
+- batched: calls go through EmbeddingBatcher
+and reports upstream requests, the call reduction, the batch-size
+distribution, p50/p99 latency per call and embeddings per second.
+
+The upstream is simulated by default: each request sleeps --base-ms plus
+--per-text-ms per text (roughly an embedding API round-trip) and returns
+hashing-backend vectors. --backend openai|local|hashing measures a real
+backend instead (openai needs OPENAI_API_KEY).
+
+Usage:
+    python benchmark_embedding_batching.py [--concurrency 1,4,16,64] [--calls 50]
+                                           [--base-ms 80] [--per-text-ms 0.5]
+                                           [--wait-ms 5] [--max-batch 64] [--backend simulated]
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.embedding_backends import HashingBackend
+from app.utils.embedding_batcher import EMBEDDING_BATCH_CONCURRENCY, EmbeddingBatcher
+
+MERCHANTS = ["Swiggy", "Zomato", "Amazon", "Flipkart", "Uber", "Ola", "MakeMyTrip", "BigBasket", "Netflix",
+             "Airtel", "Indian Oil", "BookMyShow", "Myntra", "Nykaa", "IRCTC", "Starbucks"]
+
+
+class SimulatedUpstream:
+    """Embedding API stand-in: fixed round-trip plus a per-text cost; counts requests."""
+
+    def __init__(self, base_ms: float, per_text_ms: float):
+        self.base = base_ms / 1000
+        self.per_text = per_text_ms / 1000
+        self._vectors = HashingBackend(256)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def embed_documents(self, texts: list) -> list:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.base + self.per_text * len(texts))
+        return self._vectors.embed_documents(texts)
+
+
+class CountingBackend:
+    def __init__(self, backend):
+        self._backend = backend
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def embed_documents(self, texts: list) -> list:
+        with self._lock:
+            self.calls += 1
+        return self._backend.embed_documents(texts)
+
+
+def build_upstream(name: str, base_ms: float, per_text_ms: float):
+    if name == "simulated":
+        return SimulatedUpstream(base_ms, per_text_ms)
+    from app.utils.clients import get_embedding_model
+    os.environ["EMBEDDING_BACKEND"] = name
+    return CountingBackend(get_embedding_model())
+
+
+def _percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(embed, threads: int, calls: int) -> dict:
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(calls):
+            text = f"Query about {random.choice(MERCHANTS)} spend #{random.randint(1, 10 ** 6)}"
+            start = time.perf_counter()
+            embed(text)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(worker) for _ in range(threads)]:
+            future.result()
+    wall = time.perf_counter() - start
+    return {"p50": _percentile(latencies, 0.5), "p99": _percentile(latencies, 0.99),
+            "per_s": len(latencies) / wall}
+
+
+def main(levels: list, calls: int, base_ms: float, per_text_ms: float, wait_ms: float, max_batch: int,
+         backend: str):
+    upstream = build_upstream(backend, base_ms, per_text_ms)
+    upstream.embed_documents(["warm up"])
+    results = []
+    for threads in levels:
+        upstream.calls = 0
+        direct = run(lambda text: upstream.embed_documents([text])[0], threads, calls)
+        direct_calls = upstream.calls
+
+        upstream.calls = 0
+        batcher = EmbeddingBatcher(upstream.embed_documents, max_wait_ms=wait_ms, max_batch=max_batch)
+        batched = run(batcher.embed, threads, calls)
+        results.append((threads, direct, direct_calls, batched, upstream.calls, batcher.report()))
+
+    print("=" * 96)
+    print("EMBEDDING MICRO-BATCHING")
+    print("=" * 96)
+    upstream_desc = f"simulated {base_ms:g} ms + {per_text_ms:g} ms/text" if backend == "simulated" else backend
+    print(f"Upstream: {upstream_desc}   Calls per thread: {calls}   Wait: {wait_ms:g} ms   "
+          f"Max batch: {max_batch}   In flight: {EMBEDDING_BATCH_CONCURRENCY}")
+    print(f"{'threads':>7} {'requests':>9} {'direct p50':>11} {'p99':>8} {'/s':>7} "
+          f"{'upstream':>9} {'batched p50':>12} {'p99':>8} {'/s':>7} {'reduction':>10}")
+    for threads, direct, direct_calls, batched, batched_calls, report in results:
+        print(f"{threads:7} {direct_calls:9} {direct['p50']:11.1f} {direct['p99']:8.1f} {direct['per_s']:7.0f} "
+              f"{batched_calls:9} {batched['p50']:12.1f} {batched['p99']:8.1f} {batched['per_s']:7.0f} "
+              f"{1 - batched_calls / direct_calls:9.1%}")
+    print("-" * 96)
+    print("Batch sizes (batches per size bucket):")
+    for threads, _, _, _, _, report in results:
+        buckets = "  ".join(f"{size}: {count}" for size, count in report["batch_sizes"].items())
+        print(f"{threads:7} threads  avg {report['avg_batch_size']:5.1f}   {buckets}")
+    print("=" * 96)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark embedding micro-batching under concurrency")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="Thread counts to sweep")
+    parser.add_argument("--calls", type=int, default=50, help="Embeddings per thread")
+    parser.add_argument("--base-ms", type=float, default=80, help="Simulated round-trip per request")
+    parser.add_argument("--per-text-ms", type=float, default=0.5, help="Simulated cost per text")
+    parser.add_argument("--wait-ms", type=float, default=5)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--backend", default="simulated", choices=["simulated", "openai", "local", "hashing"])
+    args = parser.parse_args()
+    main([int(c) for c in args.concurrency.split(",")], args.calls, args.base_ms, args.per_text_ms,
+         args.wait_ms, args.max_batch, args.backend)
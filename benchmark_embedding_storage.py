@@ -0,0 +1,157 @@
+"""
+Benchmark for embedding storage: dimensions and float32 (vector) vs
+float16 (halfvec).
+
+Loads --rows 1536-dimension embeddings into a temporary table, then for
+each of 1536 / 768 / 512 dimensions and each storage type builds a copy
+cut to that width with an HNSW cosine index (what
+migrate_embedding_storage.py does to the real tables) and reports:
+- recall@k of the HNSW search against the exact 1536 float32 neighbours
+- p50 query latency
+- table (heap + TOAST) and index size
+
+Cutting text-embedding-3 vectors to their first N dimensions ranks like
+asking the API for N dimensions (it only renormalizes, which cosine
+distance ignores).
+
+With OPENAI_API_KEY the corpus is real embeddings of synthetic transaction
+texts; --offline uses random vectors whose variance decays along the
+dimensions (a rough stand-in, so recall numbers are indicative only).
+halfvec rows are skipped on servers older than pgvector 0.7.
+
+Only temporary tables are used.
+
+Usage:
+    python benchmark_embedding_storage.py [--rows 5000] [--queries 50] [--k 10] [--offline]
+"""
+import argparse
+import io
+import random
+import statistics
+import time
+
+from app.db.database import engine
+
+DIMENSIONS = [1536, 768, 512]
+MERCHANTS = ["Swiggy", "Zomato", "Amazon", "Flipkart", "Uber", "Ola", "MakeMyTrip", "BigBasket", "Netflix",
+             "Airtel", "Indian Oil", "BookMyShow", "Myntra", "Nykaa", "IRCTC", "Starbucks"]
+PURPOSES = ["dinner", "groceries", "ride to the airport", "monthly subscription", "weekend trip", "new shoes",
+            "fuel refill", "movie tickets", "phone bill", "birthday gift", "office lunch", "train tickets"]
+QUERY_TEMPLATES = ["how much did I spend on {}", "my {} expenses", "{} last month", "what did I buy for {}"]
+
+
+def _vector_literal(values) -> str:
+    return "[" + ",".join(f"{v:.6f}" for v in values) + "]"
+
+
+def synthetic_vectors(count: int, topics: int = 40, dims: int = 1536) -> list:
+    """Clustered random vectors; early dimensions carry most of the variance."""
+    scale = [1 / (1 + i / 64) ** 0.5 for i in range(dims)]
+    centers = [[random.gauss(0, 1) * s for s in scale] for _ in range(topics)]
+    return [[c + random.gauss(0, 0.6) * s for c, s in zip(random.choice(centers), scale)] for _ in range(count)]
+
+
+def real_vectors(rows: int, queries: int) -> tuple:
+    from langchain_openai import OpenAIEmbeddings
+    model = OpenAIEmbeddings(model="text-embedding-3-small")
+    texts = [f"{random.choice(MERCHANTS)} {random.choice(PURPOSES)} Rs. {random.randint(100, 9000)}"
+             for _ in range(rows)]
+    questions = [random.choice(QUERY_TEMPLATES).format(random.choice(MERCHANTS + PURPOSES)) for _ in range(queries)]
+    corpus = []
+    for start in range(0, rows, 500):
+        corpus.extend(model.embed_documents(texts[start:start + 500]))
+    return corpus, model.embed_documents(questions)
+
+
+def main(rows: int, queries: int, k: int, offline: bool):
+    if offline:
+        vectors = synthetic_vectors(rows + queries)
+        corpus, query_vectors = vectors[:rows], vectors[rows:]
+    else:
+        corpus, query_vectors = real_vectors(rows, queries)
+
+    raw = engine.raw_connection()
+    results = []
+    try:
+        cursor = raw.cursor()
+        cursor.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        version = cursor.fetchone()[0]
+        has_halfvec = tuple(int(p) for p in version.split(".")) >= (0, 7)
+
+        cursor.execute("CREATE TEMP TABLE bench_embedding_full (id int PRIMARY KEY, embedding vector(1536))")
+        buffer = io.StringIO("".join(f"{i}\t{_vector_literal(v)}\n" for i, v in enumerate(corpus)))
+        cursor.copy_expert("COPY bench_embedding_full (id, embedding) FROM STDIN", buffer)
+
+        # Exact neighbours at full width and precision (no index: sequential scan)
+        truth = []
+        for vector in query_vectors:
+            cursor.execute("SELECT id FROM bench_embedding_full ORDER BY embedding <=> %s::vector LIMIT %s",
+                           (_vector_literal(vector), k))
+            truth.append({row[0] for row in cursor.fetchall()})
+        # Wide TOASTed rows can tempt the planner into a sequential scan: measure the index
+        cursor.execute("SET enable_seqscan = off")
+
+        for dims in DIMENSIONS:
+            for storage in ("vector", "halfvec"):
+                if storage == "halfvec" and not has_halfvec:
+                    results.append((dims, storage, None))
+                    continue
+                column = f"{storage}({dims})"
+                cursor.execute(f"""
+                    CREATE TEMP TABLE bench_embedding AS
+                    SELECT id, ((embedding::real[])[1:{dims}])::{column} AS embedding FROM bench_embedding_full
+                """)
+                start = time.perf_counter()
+                cursor.execute(f"CREATE INDEX bench_embedding_hnsw ON bench_embedding "
+                               f"USING hnsw (embedding {storage}_cosine_ops)")
+                build_s = time.perf_counter() - start
+                cursor.execute("ANALYZE bench_embedding")
+                cursor.execute("SELECT pg_table_size('bench_embedding'), pg_relation_size('bench_embedding_hnsw')")
+                table_bytes, index_bytes = cursor.fetchone()
+
+                latencies, found = [], 0
+                for vector, expected in zip(query_vectors, truth):
+                    start = time.perf_counter()
+                    cursor.execute(f"SELECT id FROM bench_embedding ORDER BY embedding <=> %s::{column} LIMIT %s",
+                                   (_vector_literal(vector[:dims]), k))
+                    ids = {row[0] for row in cursor.fetchall()}
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    found += len(ids & expected)
+                results.append((dims, storage, {
+                    "recall": found / (k * len(query_vectors)),
+                    "p50_ms": statistics.median(latencies),
+                    "table_mb": table_bytes / 2**20,
+                    "index_mb": index_bytes / 2**20,
+                    "build_s": build_s,
+                }))
+                cursor.execute("DROP TABLE bench_embedding")
+    finally:
+        raw.rollback()
+        raw.close()
+
+    print("=" * 78)
+    print("EMBEDDING STORAGE BENCHMARK")
+    print("=" * 78)
+    print(f"Rows: {rows}   Queries: {queries}   Recall@{k} vs exact vector(1536)   "
+          f"Corpus: {'synthetic' if offline else 'text-embedding-3-small'}   pgvector {version}")
+    print(f"{'column':16} {'recall':>8} {'p50 ms':>8} {'table MB':>10} {'index MB':>10} {'bytes/row':>10} "
+          f"{'build s':>8}")
+    for dims, storage, result in results:
+        column = f"{storage}({dims})"
+        if result is None:
+            print(f"{column:16} skipped (halfvec needs pgvector >= 0.7)")
+            continue
+        bytes_per_row = (result["table_mb"] + result["index_mb"]) * 2**20 / rows
+        print(f"{column:16} {result['recall']:8.3f} {result['p50_ms']:8.2f} {result['table_mb']:10.1f} "
+              f"{result['index_mb']:10.1f} {bytes_per_row:10.0f} {result['build_s']:8.1f}")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark embedding dimensions and storage types")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--offline", action="store_true", help="Synthetic vectors instead of the embedding API")
+    args = parser.parse_args()
+    main(args.rows, args.queries, args.k, args.offline)
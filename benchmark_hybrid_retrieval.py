@@ -0,0 +1,128 @@
+"""
+Benchmark for hybrid (lexical + vector) transaction retrieval.
+
+Seeds a benchmark user with --rows transactions over a merchant catalog,
+then replays a chat-like query mix through retrieve_memories:
+- merchant questions ("how much did I spend on Swiggy")
+- misspelled merchants ("swigy orders"; fuzzy with pg_trgm, prefix otherwise)
+- semantic questions ("food delivery", "weekend trips")
+and reports how many embedding calls the lexical path avoided and the
+latency of each path.
+
+--offline replaces the embedding model with random unit vectors so the
+vector SQL still runs without OPENAI_API_KEY (results are then
+meaningless, the call counts and SQL latency are not; rows are tagged with
+the hashing backend's model id).
+
+The benchmark user's rows are deleted at the end.
+
+Usage:
+    python benchmark_hybrid_retrieval.py [--rows 5000] [--offline]
+"""
+import argparse
+import io
+import os
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+BENCH_USER = "bench_hybrid_retrieval_user"
+MERCHANTS = {
+    "Swiggy": "food", "Zomato": "food", "Amazon": "shopping", "Flipkart": "shopping", "Uber": "travel",
+    "Ola": "travel", "MakeMyTrip": "travel", "BigBasket": "groceries", "Blinkit": "groceries",
+    "Netflix": "entertainment", "BookMyShow": "entertainment", "Indian Oil": "fuel", "Airtel": "utilities",
+}
+QUERIES = [
+    "How much did I spend on Swiggy?", "my amazon orders", "uber rides last month", "Netflix subscription",
+    "spent at bigbasket", "flipkart purchases", "airtel bill", "indian oil fuel",
+    "swigy orders", "amazn shopping", "make my trip booking",
+    "food delivery", "weekend trips", "streaming services", "monthly essentials", "what did I buy for the house",
+]
+
+
+def random_vector(dims: int = 1536) -> list:
+    vector = [random.gauss(0, 1) for _ in range(dims)]
+    norm = sum(v * v for v in vector) ** 0.5
+    return [v / norm for v in vector]
+
+
+def seed(rows: int):
+    from app.db.database import engine
+    from app.utils.vectors import embedding_model_id
+    model = embedding_model_id()
+    buffer = io.StringIO()
+    names = list(MERCHANTS)
+    for i in range(rows):
+        merchant = random.choice(names)
+        vector = "[" + ",".join(f"{v:.5f}" for v in random_vector()) + "]"
+        buffer.write(f"{BENCH_USER}\t{merchant}\t{MERCHANTS[merchant]}\t{random.randint(100, 5000)}\t"
+                     f"{merchant} purchase #{i}\t{vector}\t{model}\n")
+    buffer.seek(0)
+    raw = engine.raw_connection()
+    try:
+        raw.cursor().copy_expert(
+            "COPY transaction_history (user_id, merchant, category, amount, description, embedding, embedding_model) "
+            "FROM STDIN",
+            buffer
+        )
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def cleanup():
+    from app.db.database import engine
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM transaction_history WHERE user_id = :u"), {"u": BENCH_USER})
+
+
+def main(rows: int, offline: bool, rounds: int):
+    from app.services import memory_service
+
+    if offline:
+        memory_service.get_text_embedding = lambda query: random_vector()
+
+    cleanup()
+    seed(rows)
+    latencies = {"lexical": [], "vector": []}
+    try:
+        for _ in range(rounds):
+            for query in QUERIES:
+                calls_before = memory_service.retrieval_stats.embedding_calls
+                start = time.perf_counter()
+                memory_service.retrieve_memories(BENCH_USER, query)
+                elapsed = (time.perf_counter() - start) * 1000
+                path = "vector" if memory_service.retrieval_stats.embedding_calls > calls_before else "lexical"
+                latencies[path].append(elapsed)
+    finally:
+        cleanup()
+
+    report = memory_service.retrieval_stats.report()
+    print("=" * 60)
+    print("HYBRID TRANSACTION RETRIEVAL BENCHMARK")
+    print("=" * 60)
+    print(f"Transactions:             {rows}")
+    print(f"Trigram (pg_trgm):        {'yes' if memory_service.has_trigram_support() else 'no (prefix match)'}")
+    print(f"Queries:                  {report['queries']}")
+    print(f"Embedding calls:          {report['embedding_calls']}")
+    print(f"Embedding calls avoided:  {report['embedding_calls_avoided']} "
+          f"({report['embedding_calls_avoided'] / (report['embedding_calls'] + report['embedding_calls_avoided']) * 100:.0f}%"
+          f" of the separate memory and transaction lookups)")
+    for path, values in latencies.items():
+        if values:
+            print(f"{path.capitalize():8} path p50:         {statistics.median(values):7.2f} ms"
+                  f"{' (plus the embedding API call)' if path == 'vector' and offline else ''}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark hybrid transaction retrieval")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--offline", action="store_true", help="Random vectors instead of the embedding API")
+    args = parser.parse_args()
+    if args.offline:
+        os.environ.setdefault("EMBEDDING_BACKEND", "hashing")
+    main(args.rows, args.offline, args.rounds)
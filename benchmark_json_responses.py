@@ -0,0 +1,186 @@
+"""
+Benchmark for the orjson / gzip response path of the list endpoints.
+
+Seeds a benchmark user with --cards cards and --threads chat threads, then
+times (through the ASGI app, --runs requests each):
+- pydantic: the previous handlers (ORM objects -> CardResponse / ThreadInfo
+            per row -> response_model validation -> json), mounted on a
+            local app
+- orjson:   GET /user/{user_id}/cards and /user/{user_id}/threads as served
+            now (rows -> orjson), without compression
+- gzip:     the same with Accept-Encoding: gzip
+and reports p50/p99, response bytes, and checks both paths return the same
+JSON. Benchmark rows are deleted at the end.
+
+Usage:
+    python benchmark_json_responses.py [--cards 100] [--threads 5000] [--runs 50]
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+BENCH_USER = "bench_json_responses"
+MERCHANTS = ["Swiggy", "Zomato", "Amazon", "Flipkart", "Uber", "MakeMyTrip", "BigBasket", "Netflix", "Myntra",
+             "Nykaa", "IRCTC", "Starbucks", "Cleartrip", "Blinkit", "Zepto", "Croma", "PVR", "Spotify"]
+
+
+def fake_card(i: int) -> dict:
+    rules = [{
+        "category": f"Accelerated {n}", "multiplier": f"{random.choice([2, 5, 10])}X",
+        "reward_rate_description": "Reward points per Rs. 150 spent",
+        "merchants": random.sample(MERCHANTS, random.randint(1, 5)), "cap": "2500 points per month", "period": "Month"
+    } for n in range(random.randint(2, 6))]
+    return {
+        "user_id": BENCH_USER, "card_key": f"bench|json card {i}", "card_name": f"Bench JSON Card {i}",
+        "issuer": "Bench Bank", "card_type": "Credit Card", "annual_fee": "Rs. 2,500 + GST",
+        "fee_waiver_condition": "Spend Rs. 3 Lakhs in a year", "welcome_bonus": "2,500 bonus points",
+        "liability_policy": "Zero liability on fraud reported within 3 days", "reward_program_name": "Bench Rewards",
+        "reward_rules": json.dumps(rules),
+        "milestone_benefits": json.dumps([{"spend_threshold": "Rs. 5 Lakhs", "reward": "Rs. 1,500 voucher",
+                                           "period": "Annual"}]),
+        "eligibility_criteria": json.dumps({"min_income_salaried": "Rs. 12 Lakhs p.a.", "age_requirement": "21-60"}),
+        "excluded_categories": json.dumps(["Fuel", "Rent", "Wallet Loads"]),
+        "key_benefits": json.dumps(["Complimentary lounge access", "1% fuel surcharge waiver", "Golf rounds"]),
+    }
+
+
+def seed(cards: int, threads: int):
+    from psycopg2.extras import execute_values
+    from app.db.database import engine
+    rows = [fake_card(i) for i in range(cards)]
+    columns = list(rows[0])
+    now = datetime.now(timezone.utc)
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        execute_values(cursor, f"INSERT INTO credit_cards ({', '.join(columns)}) VALUES %s",
+                       [tuple(row[c] for c in columns) for row in rows], page_size=1000)
+        execute_values(cursor, """
+            INSERT INTO chat_threads (thread_id, user_id, thread_name, created_at, updated_at) VALUES %s
+        """, [(f"{BENCH_USER}_{i}", BENCH_USER, f"Which card for my trip to Goa? #{i}",
+               now - timedelta(days=1, seconds=i), now - timedelta(seconds=i)) for i in range(threads)],
+            page_size=1000)
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def cleanup():
+    from app.db.database import engine
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM credit_cards WHERE user_id = :u"), {"u": BENCH_USER})
+        conn.execute(text("DELETE FROM chat_threads WHERE user_id = :u"), {"u": BENCH_USER})
+
+
+def legacy_app():
+    """The cards / threads handlers as they were: pydantic per row, validated again by response_model"""
+    from fastapi import FastAPI
+    from app.db.card_repository import get_user_cards
+    from app.db.database import SessionLocal
+    from app.db.models import ChatThread
+    from main import CardResponse, ThreadInfo, ThreadListDetailedResponse, UserCardsResponse
+
+    app = FastAPI()
+
+    @app.get("/user/{user_id}/cards", response_model=UserCardsResponse)
+    async def cards(user_id: str):
+        db = SessionLocal()
+        try:
+            card_responses = [
+                CardResponse(
+                    id=card.id, card_name=card.card_name, issuer=card.issuer, card_type=card.card_type,
+                    annual_fee=card.annual_fee, fee_waiver_condition=card.fee_waiver_condition,
+                    welcome_bonus=card.welcome_bonus, liability_policy=card.liability_policy,
+                    reward_program_name=card.reward_program_name, reward_rules=card.reward_rules or [],
+                    milestone_benefits=card.milestone_benefits or [], eligibility_criteria=card.eligibility_criteria,
+                    excluded_categories=card.excluded_categories or [], key_benefits=card.key_benefits or []
+                )
+                for card in get_user_cards(db, user_id)
+            ]
+            return UserCardsResponse(user_id=user_id, cards=card_responses, count=len(card_responses))
+        finally:
+            db.close()
+
+    @app.get("/user/{user_id}/threads", response_model=ThreadListDetailedResponse)
+    async def threads(user_id: str):
+        db = SessionLocal()
+        try:
+            rows = db.query(ChatThread).filter(ChatThread.user_id == user_id).order_by(
+                ChatThread.updated_at.desc()).all()
+            thread_list = [
+                ThreadInfo(thread_id=t.thread_id, thread_name=t.thread_name, created_at=t.created_at.isoformat(),
+                           updated_at=t.updated_at.isoformat())
+                for t in rows
+            ]
+            return ThreadListDetailedResponse(threads=thread_list, count=len(thread_list))
+        finally:
+            db.close()
+
+    return app
+
+
+def _percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def timed_requests(client, path: str, runs: int, gzip: bool) -> tuple:
+    headers = {"Accept-Encoding": "gzip" if gzip else "identity"}
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        timings.append((time.perf_counter() - start) * 1000)
+    # Bytes on the wire (httpx decompresses .content)
+    size = int(response.headers.get("content-length", len(response.content)))
+    return timings, size, response
+
+
+def main(cards: int, threads: int, runs: int):
+    from fastapi.testclient import TestClient
+    import main as api
+
+    cleanup()
+    seed(cards, threads)
+    results = {}
+    same = {}
+    try:
+        with TestClient(legacy_app()) as legacy, TestClient(api.app) as current:
+            for name in ("cards", "threads"):
+                path = f"/user/{BENCH_USER}/{name}"
+                old = timed_requests(legacy, path, runs, gzip=False)
+                new = timed_requests(current, path, runs, gzip=False)
+                packed = timed_requests(current, path, runs, gzip=True)
+                results[name] = {"pydantic": old, "orjson": new, "gzip": packed}
+                expected, got = old[2].json(), packed[2].json()
+                if name == "cards":
+                    expected["cards"].sort(key=lambda card: card["id"])
+                same[name] = expected == got
+    finally:
+        cleanup()
+
+    print("=" * 70)
+    print("JSON RESPONSES (pydantic + response_model vs orjson, gzip)")
+    print("=" * 70)
+    for name, count in (("cards", cards), ("threads", threads)):
+        print(f"GET /user/{{id}}/{name} ({count} {name})   identical JSON: {same[name]}")
+        print(f"  {'path':9} {'p50 ms':>9} {'p99 ms':>9} {'bytes':>10}")
+        for path, (timings, size, _) in results[name].items():
+            print(f"  {path:9} {_percentile(timings, 0.5):9.2f} {_percentile(timings, 0.99):9.2f} {size:10}")
+        base = _percentile(results[name]["pydantic"][0], 0.5)
+        print(f"  Speedup (p50): orjson {base / _percentile(results[name]['orjson'][0], 0.5):.1f}x   "
+              f"gzip {base / _percentile(results[name]['gzip'][0], 0.5):.1f}x")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the orjson / gzip list responses")
+    parser.add_argument("--cards", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+    main(args.cards, args.threads, args.runs)
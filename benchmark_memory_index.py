@@ -0,0 +1,127 @@
+"""
+Benchmark for the in-process memory index against the pgvector path.
+
+Seeds one benchmark user per --sizes entry with that many transactions
+(random 1536-dimension vectors), then times semantic_search_transactions
+for each user:
+- sql:   MEMORY_INDEX_ENABLED off (one Postgres query per search)
+- load:  the first indexed search (loads the user's matrix)
+- index: warm indexed searches (one matrix-vector product)
+and reports p50/p99 latency and the index memory per user. The embedding
+call is replaced by precomputed vectors so only the search is timed (rows
+are tagged with the hashing backend's model id unless EMBEDDING_BACKEND
+is set).
+
+The benchmark users' rows are deleted at the end.
+
+Usage:
+    python benchmark_memory_index.py [--sizes 100,1000,5000] [--queries 200]
+"""
+import argparse
+import io
+import os
+import random
+import time
+
+from sqlalchemy import text
+
+BENCH_PREFIX = "bench_memory_index_"
+
+
+def random_vector(dims: int = 1536) -> list:
+    return [random.gauss(0, 1) for _ in range(dims)]
+
+
+def seed(sizes: list):
+    from app.db.database import engine
+    from app.utils.vectors import embedding_model_id
+    model = embedding_model_id()
+    buffer = io.StringIO()
+    for size in sizes:
+        for i in range(size):
+            vector = "[" + ",".join(f"{v:.5f}" for v in random_vector()) + "]"
+            buffer.write(f"{BENCH_PREFIX}{size}\tMerchant {i % 50}\tshopping\t{random.randint(100, 5000)}\t"
+                         f"purchase #{i}\t{vector}\t{model}\n")
+    buffer.seek(0)
+    raw = engine.raw_connection()
+    try:
+        raw.cursor().copy_expert(
+            "COPY transaction_history (user_id, merchant, category, amount, description, embedding, embedding_model) "
+            "FROM STDIN",
+            buffer
+        )
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def cleanup():
+    from app.db.database import engine
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM transaction_history WHERE user_id LIKE :p"), {"p": BENCH_PREFIX + "%"})
+
+
+def _percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main(sizes: list, queries: int):
+    from app.services import memory_index as index_module, memory_service
+
+    index = index_module.memory_index
+    vectors = [random_vector() for _ in range(queries)]
+    current = {"vector": vectors[0]}
+    memory_service.get_text_embedding = lambda query: current["vector"]
+
+    def timed_search(user_id: str) -> list:
+        latencies = []
+        for vector in vectors:
+            current["vector"] = vector
+            start = time.perf_counter()
+            memory_service.semantic_search_transactions(user_id, "query", threshold=0.0)
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+
+    cleanup()
+    seed(sizes)
+    results = []
+    try:
+        for size in sizes:
+            user_id = f"{BENCH_PREFIX}{size}"
+            index_module.MEMORY_INDEX_ENABLED = False
+            sql = timed_search(user_id)
+
+            index_module.MEMORY_INDEX_ENABLED = True
+            index.clear()
+            current["vector"] = vectors[0]
+            start = time.perf_counter()
+            memory_service.semantic_search_transactions(user_id, "query", threshold=0.0)
+            load_ms = (time.perf_counter() - start) * 1000
+            served = index.report()["entries"] > 0
+            indexed = timed_search(user_id)
+            results.append((size, sql, load_ms, indexed, index.report()["memory_mb"], served))
+    finally:
+        cleanup()
+
+    print("=" * 78)
+    print("MEMORY INDEX BENCHMARK")
+    print("=" * 78)
+    print(f"Queries per user: {queries}   Max rows per user: {index.max_rows}")
+    print(f"{'rows':>6} {'sql p50':>9} {'sql p99':>9} {'load ms':>9} {'index p50':>10} {'index p99':>10} "
+          f"{'speedup':>8} {'MB':>6}")
+    for size, sql, load_ms, indexed, memory_mb, served in results:
+        note = "" if served else "  (above max rows: pgvector)"
+        print(f"{size:6} {_percentile(sql, 0.5):9.2f} {_percentile(sql, 0.99):9.2f} {load_ms:9.1f} "
+              f"{_percentile(indexed, 0.5):10.3f} {_percentile(indexed, 0.99):10.3f} "
+              f"{_percentile(sql, 0.5) / _percentile(indexed, 0.5):7.0f}x {memory_mb:6.1f}{note}")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the in-process memory index")
+    parser.add_argument("--sizes", default="100,1000,5000", help="Rows per benchmark user")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    os.environ.setdefault("EMBEDDING_BACKEND", "hashing")
+    main([int(s) for s in args.sizes.split(",")], args.queries)
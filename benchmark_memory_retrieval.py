@@ -0,0 +1,160 @@
+"""
+Benchmark for combined memory retrieval.
+
+Compares, for the same queries:
+- before: semantic_search_transactions + semantic_search_general_memories
+  (two embeddings, two sessions, two queries)
+- after:  retrieve_memories (lexical query; unless it names a merchant,
+  one embedding and one UNION ALL)
+
+Seeds a benchmark user with --rows transactions spread over two years and
+--memories general memories, among --other-rows rows of other users.
+Reports p50/p99 latency, embedding calls and pool checkouts per retrieval.
+
+--offline replaces the embedding model with random unit vectors and a
+simulated --embed-ms API latency, so it runs without OPENAI_API_KEY (rows
+are tagged with the hashing backend's model id).
+
+The seeded rows are deleted at the end.
+
+Usage:
+    python benchmark_memory_retrieval.py [--rows 2000] [--memories 200] [--other-rows 20000] [--offline]
+"""
+import argparse
+import io
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, text
+
+BENCH_PREFIX = "bench_memory_retrieval_"
+MERCHANTS = ["Swiggy", "Zomato", "Amazon", "Flipkart", "Uber", "Ola", "MakeMyTrip", "BigBasket", "Netflix", "Airtel"]
+QUERIES = ["How much did I spend on Swiggy?", "food delivery", "weekend trips", "what's my name",
+           "my favourite cuisine", "airtel bill", "streaming services", "monthly essentials"]
+
+
+def random_vector(dims: int = 1536) -> list:
+    vector = [random.gauss(0, 1) for _ in range(dims)]
+    norm = sum(v * v for v in vector) ** 0.5
+    return [v / norm for v in vector]
+
+
+def _vector_literal() -> str:
+    return "[" + ",".join(f"{v:.5f}" for v in random_vector()) + "]"
+
+
+def seed(rows: int, memories: int, other_rows: int):
+    from app.db.database import engine
+    from app.utils.vectors import embedding_model_id
+    model = embedding_model_id()
+    now = datetime.now(timezone.utc)
+    transactions = io.StringIO()
+    users = [(f"{BENCH_PREFIX}user", rows)] + [(f"{BENCH_PREFIX}other_{i}", other_rows // 20) for i in range(20)]
+    for user_id, count in users:
+        for i in range(count):
+            merchant = random.choice(MERCHANTS)
+            created = now - timedelta(days=random.uniform(0, 730))
+            transactions.write(f"{user_id}\t{merchant}\tshopping\t{random.randint(100, 5000)}\t"
+                               f"{merchant} #{i}\t{_vector_literal()}\t{model}\t{created.isoformat()}\n")
+    transactions.seek(0)
+
+    facts = io.StringIO()
+    for i in range(memories):
+        facts.write(f"{BENCH_PREFIX}user\tUser fact number {i}\tpreference\t{_vector_literal()}\t{model}\n")
+    facts.seek(0)
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.copy_expert("COPY transaction_history (user_id, merchant, category, amount, description, embedding, "
+                           "embedding_model, created_at) FROM STDIN", transactions)
+        cursor.copy_expert("COPY user_memories (user_id, memory_text, category, embedding, embedding_model) "
+                           "FROM STDIN", facts)
+        raw.commit()
+        cursor.execute("ANALYZE transaction_history; ANALYZE user_memories;")
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def cleanup():
+    from app.db.database import engine
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM transaction_history WHERE user_id LIKE :p"), {"p": BENCH_PREFIX + "%"})
+        conn.execute(text("DELETE FROM user_memories WHERE user_id LIKE :p"), {"p": BENCH_PREFIX + "%"})
+
+
+def _percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main(rows: int, memories: int, other_rows: int, offline: bool, embed_ms: float, rounds: int):
+    from app.db.database import engine
+    from app.services import memory_service
+
+    counters = {"embeddings": 0, "checkouts": 0}
+    real_embedding = memory_service.get_text_embedding
+
+    def counting_embedding(query):
+        counters["embeddings"] += 1
+        if offline:
+            time.sleep(embed_ms / 1000)
+            return random_vector()
+        return real_embedding(query)
+
+    memory_service.get_text_embedding = counting_embedding
+    event.listen(engine, "checkout", lambda *args: counters.__setitem__("checkouts", counters["checkouts"] + 1))
+    user_id = f"{BENCH_PREFIX}user"
+
+    def before(query):
+        memory_service.semantic_search_transactions(user_id, query, threshold=0.75)
+        memory_service.semantic_search_general_memories(user_id, query, threshold=0.25)
+
+    def after(query):
+        memory_service.retrieve_memories(user_id, query)
+
+    cleanup()
+    seed(rows, memories, other_rows)
+    results = {}
+    try:
+        for name, retrieve in (("before", before), ("after", after)):
+            retrieve(QUERIES[0])  # warm up the pool and plans
+            counters.update(embeddings=0, checkouts=0)
+            latencies = []
+            for _ in range(rounds):
+                for query in QUERIES:
+                    start = time.perf_counter()
+                    retrieve(query)
+                    latencies.append((time.perf_counter() - start) * 1000)
+            calls = len(latencies)
+            results[name] = (latencies, counters["embeddings"] / calls, counters["checkouts"] / calls)
+    finally:
+        cleanup()
+
+    print("=" * 60)
+    print("MEMORY RETRIEVAL BENCHMARK")
+    print("=" * 60)
+    print(f"User rows: {rows} transactions, {memories} memories; other users: {other_rows} rows")
+    if offline:
+        print(f"Embedding: random vectors, {embed_ms:.0f} ms simulated latency")
+    for name, (latencies, embeddings, checkouts) in results.items():
+        print(f"{name:7} p50 {_percentile(latencies, 0.5):7.1f} ms | p99 {_percentile(latencies, 0.99):7.1f} ms | "
+              f"{embeddings:.1f} embeddings | {checkouts:.1f} pool checkouts per retrieval")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark combined memory retrieval")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--memories", type=int, default=200)
+    parser.add_argument("--other-rows", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--offline", action="store_true", help="Random vectors instead of the embedding API")
+    parser.add_argument("--embed-ms", type=float, default=150.0, help="Simulated embedding latency with --offline")
+    args = parser.parse_args()
+    if args.offline:
+        os.environ.setdefault("EMBEDDING_BACKEND", "hashing")
+    main(args.rows, args.memories, args.other_rows, args.offline, args.embed_ms, args.rounds)
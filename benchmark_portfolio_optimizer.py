@@ -0,0 +1,103 @@
+"""
+Benchmark for the spend-allocation optimizer.
+
+Builds a synthetic portfolio (30 cards by default, each with capped merchant
+rules, a generic rule, milestones and a fee waiver) and a projection of 200
+spend lines, then times optimize_allocation. Also reports how much the
+allocation gains over putting everything on the single best card.
+
+Usage:
+    python benchmark_portfolio_optimizer.py [--cards 30] [--lines 200] [--runs 20]
+"""
+import argparse
+import random
+import statistics
+
+from app.schemas.credit_card import CreditCard, Milestone, RewardRule
+from app.services.portfolio_optimizer import optimize_allocation
+
+MERCHANTS = ["Swiggy", "Zomato", "Amazon", "Flipkart", "Uber", "Ola", "MakeMyTrip", "Cleartrip", "BigBasket",
+             "Blinkit", "Zepto", "Myntra", "Ajio", "Nykaa", "BookMyShow", "Netflix", "IRCTC", "Indian Oil",
+             "Tata Cliq", "Croma", "Reliance Digital", "Dominos", "Starbucks", "Apollo Pharmacy", "Airtel"]
+CATEGORIES = ["food", "shopping", "travel", "groceries", "entertainment", "fuel", "utilities"]
+
+
+def random_card(index: int) -> CreditCard:
+    rules = []
+    for group in range(random.randint(1, 3)):
+        rules.append(RewardRule(
+            category=f"Accelerated {group}",
+            multiplier=random.choice(["5X", "10X", "3%", "5%", "10%"]),
+            merchants=random.sample(MERCHANTS, random.randint(1, 5)),
+            cap=random.choice([None, "Rs. 1000 cashback", "2,500 points", "5000 pts"]),
+            period=random.choice(["Statement Cycle", "Month", "Quarter", "Annual"])
+        ))
+    rules.append(RewardRule(category="Others", multiplier=random.choice(["1X", "2X", "1%"]), merchants=["All"]))
+
+    return CreditCard(
+        card_name=f"Card {index}",
+        issuer="Bench Bank",
+        card_type="Visa",
+        annual_fee=random.choice(["Lifetime Free", "Rs. 500 + GST", "Rs. 1,000", "Rs. 2,500", "Rs. 10,000"]),
+        fee_waiver_condition=random.choice([None, "Spend Rs. 1 Lakh in a year", "Spend Rs. 3 Lakhs annually"]),
+        welcome_bonus=None,
+        reward_program_name=None,
+        reward_rules=rules,
+        milestone_benefits=[
+            Milestone(spend_threshold=random.choice(["Rs. 50,000", "Rs. 1.5 Lakhs", "Rs. 4 Lakhs"]),
+                      reward=random.choice(["Rs. 500 voucher", "2,000 bonus points", "Rs. 1500 voucher"]),
+                      period=random.choice(["Annual", "Quarterly"]))
+        ],
+        eligibility_criteria=None,
+        excluded_categories=random.sample(["fuel", "rent", "utilities"], random.randint(0, 2)),
+        key_benefits=[]
+    )
+
+
+def random_lines(count: int) -> list:
+    lines = []
+    for i in range(count):
+        merchant = MERCHANTS[i % len(MERCHANTS)] if i < len(MERCHANTS) * 4 else None
+        lines.append({
+            "merchant": f"{merchant} {i}" if merchant and i >= len(MERCHANTS) else merchant,
+            "category": random.choice(CATEGORIES),
+            "amount": round(random.uniform(200, 15000), 2)
+        })
+    return lines
+
+
+def run(card_count: int, line_count: int, runs: int):
+    random.seed(7)
+    cards = [random_card(i) for i in range(card_count)]
+    lines = random_lines(line_count)
+
+    timings = []
+    for _ in range(runs):
+        result = optimize_allocation(cards, lines)
+        timings.append(result["elapsed_ms"])
+
+    # Baseline: everything on the single best card (the other cards' fees are still paid)
+    total_fees = sum(c["annual_fee"] for c in result["cards"])
+    single_best = max(
+        optimize_allocation([card], lines)["net_annual_value_inr"] - (total_fees - fee)
+        for card, fee in zip(cards, (c["annual_fee"] for c in result["cards"]))
+    )
+
+    print("=" * 60)
+    print(f"Portfolio Optimizer Benchmark ({card_count} cards x {line_count} spend lines)")
+    print("=" * 60)
+    print(f"Latency:             p50 {statistics.median(timings):.1f} ms | max {max(timings):.1f} ms")
+    print(f"Net annual value:    ₹{result['net_annual_value_inr']:,.0f}")
+    print(f"  rewards points:    {result['annual_reward_points']:,.0f}")
+    print(f"  milestones:        ₹{result['annual_milestone_value_inr']:,.0f}")
+    print(f"  fees paid:         ₹{result['annual_fees_inr']:,.0f} of ₹{total_fees:,.0f}")
+    print(f"Best single card:    ₹{single_best:,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Portfolio optimizer benchmark")
+    parser.add_argument("--cards", type=int, default=30)
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    run(args.cards, args.lines, args.runs)
@@ -0,0 +1,77 @@
+"""
+Benchmark for the semantic answer cache of general_flow.
+
+Replays a workload of generic card questions (each asked in a few
+paraphrases, plus personal questions that must bypass the cache) through
+general_llm_node with the real embedding model and LLM, then reports the
+hit rate, the average answer latency with and without cache hits and the
+LLM latency saved.
+
+Needs OPENAI_API_KEY and the semantic_answer_cache table
+(migrate_add_semantic_cache.py). Entries created by the run are deleted.
+
+Usage:
+    python benchmark_semantic_cache.py [--rounds 2] [--threshold 0.92]
+"""
+import argparse
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage
+from sqlalchemy import text
+
+QUESTIONS = [
+    ["What is lounge access?", "How does airport lounge access work?", "Explain lounge access on credit cards"],
+    ["How do reward points work?", "How do credit card reward points work?", "Explain reward points"],
+    ["What is a fee waiver?", "What does annual fee waiver mean?", "Explain annual fee waivers"],
+    ["What is a forex markup fee?", "What is foreign currency markup on cards?", "Explain forex markup"],
+    ["What is a credit utilization ratio?", "What does credit utilization mean?", "Explain credit utilization"],
+]
+PERSONAL = ["What is my credit limit?", "Which card should I use for my rent?", "Tell me more about that"]
+
+
+def main(rounds: int, threshold: float):
+    from app.services import semantic_cache
+    semantic_cache.SEMANTIC_CACHE_THRESHOLD = threshold
+    from app.db.database import engine
+    from app.graph.nodes import general_llm_node
+
+    with engine.connect() as conn:
+        start_id = conn.execute(text("SELECT coalesce(max(id), 0) FROM semantic_answer_cache")).scalar()
+
+    config = {"configurable": {}}
+    latencies = {"hit": [], "other": []}
+    try:
+        for _ in range(rounds):
+            for question in [q for group in QUESTIONS for q in group] + PERSONAL:
+                hits_before = semantic_cache.stats.hits
+                start = time.perf_counter()
+                general_llm_node({"messages": [HumanMessage(content=question)], "memory_context": ""}, config)
+                elapsed = (time.perf_counter() - start) * 1000
+                latencies["hit" if semantic_cache.stats.hits > hits_before else "other"].append(elapsed)
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM semantic_answer_cache WHERE id > :id"), {"id": start_id})
+
+    report = semantic_cache.stats.report()
+    print("=" * 60)
+    print("SEMANTIC CACHE BENCHMARK")
+    print("=" * 60)
+    print(f"Questions:            {sum(len(v) for v in latencies.values())} ({rounds} rounds)")
+    print(f"Hits / misses:        {report['hits']} / {report['misses']} (bypassed {report['bypassed']})")
+    print(f"Hit rate:             {report['hit_rate'] * 100:.1f}%")
+    if latencies["hit"]:
+        print(f"Answer latency (hit): {statistics.mean(latencies['hit']):8.0f} ms")
+    if latencies["other"]:
+        print(f"Answer latency (LLM): {statistics.mean(latencies['other']):8.0f} ms")
+    print(f"LLM latency saved:    {report['latency_saved_ms']:8.0f} ms total, "
+          f"{report['avg_latency_saved_ms']:.0f} ms per hit (net of lookups)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the semantic answer cache")
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--threshold", type=float, default=0.92)
+    args = parser.parse_args()
+    main(args.rounds, args.threshold)
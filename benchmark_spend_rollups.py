@@ -0,0 +1,122 @@
+"""
+Benchmark: spend breakdown from the rollups vs the raw aggregate query
+
+Loads synthetic transactions for one benchmark user (1M rows by default,
+spread over 24 months), rebuilds that user's rollups and times a monthly
+"spend by category / merchant / card" breakdown both ways.
+
+Usage:
+    python benchmark_spend_rollups.py [--rows 1000000] [--runs 20] [--keep]
+"""
+import argparse
+import io
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app.db.database import engine, SessionLocal
+from app.services.spend_service import get_spend_breakdown, rebuild_spend_rollups
+
+BENCH_USER = "bench_spend_user"
+CATEGORIES = ["food", "travel", "shopping", "groceries", "fuel", "entertainment", "utilities"]
+MERCHANTS = ["Swiggy", "Zomato", "Uber", "Amazon", "Flipkart", "BigBasket", "Indian Oil", "Netflix", "MakeMyTrip", "Myntra"]
+CARDS = ["HDFC Regalia Gold", "SBI Cashback", "ICICI Amazon Pay", "Axis Ace"]
+
+
+def load_rows(rows: int, months: int = 24):
+    """COPY synthetic rows into transaction_history (no embeddings)."""
+    start = datetime.now() - timedelta(days=30 * months)
+    span_seconds = 30 * months * 24 * 3600
+    chunk = 100_000
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for offset in range(0, rows, chunk):
+            buffer = io.StringIO()
+            for _ in range(min(chunk, rows - offset)):
+                created_at = start + timedelta(seconds=random.randint(0, span_seconds))
+                buffer.write(
+                    f"{BENCH_USER}\t{random.choice(MERCHANTS)}\t{random.choice(CATEGORIES)}\t"
+                    f"{round(random.uniform(50, 5000), 2)}\tbenchmark\t{random.choice(CARDS)}\t{created_at.isoformat()}\n"
+                )
+            buffer.seek(0)
+            cursor.copy_expert(
+                "COPY transaction_history (user_id, merchant, category, amount, description, card_name, created_at) FROM STDIN",
+                buffer
+            )
+            raw.commit()
+            print(f"   loaded {offset + min(chunk, rows - offset):,} rows")
+    finally:
+        raw.close()
+
+
+RAW_QUERY = text("""
+    SELECT LOWER(category) AS category, merchant, card_name, SUM(amount) AS total_amount, COUNT(*) AS txn_count
+    FROM transaction_history
+    WHERE user_id = :user_id
+    AND created_at >= CAST(:month_start AS date)
+    AND created_at < CAST(:month_start AS date) + INTERVAL '1 month'
+    GROUP BY 1, 2, 3
+""")
+
+
+def time_runs(fn, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def run(rows: int, runs: int, keep: bool):
+    with SessionLocal() as db:
+        existing = db.execute(
+            text("SELECT COUNT(*) FROM transaction_history WHERE user_id = :u"), {"u": BENCH_USER}
+        ).scalar()
+
+    if existing < rows:
+        print(f"🔧 Loading {rows - existing:,} synthetic transactions...")
+        load_rows(rows - existing)
+
+    print("🔧 Rebuilding rollups for the benchmark user...")
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        rebuild_spend_rollups(db, user_id=BENCH_USER)
+        db.commit()
+        db.execute(text("ANALYZE transaction_history"))
+        db.execute(text("ANALYZE spend_monthly_rollups"))
+        db.commit()
+    print(f"   rebuild took {time.perf_counter() - start:.2f}s")
+
+    month = datetime.now().strftime("%Y-%m")
+    with SessionLocal() as db:
+        raw_ms = time_runs(
+            lambda: db.execute(RAW_QUERY, {"user_id": BENCH_USER, "month_start": f"{month}-01"}).fetchall(), runs
+        )
+        rollup_ms = time_runs(lambda: get_spend_breakdown(db, BENCH_USER, month=month), runs)
+
+    print("=" * 60)
+    print(f"Monthly spend breakdown, {rows:,} rows in transaction_history")
+    print("=" * 60)
+    print(f"Raw aggregate query:  p50 {statistics.median(raw_ms):8.2f} ms | max {max(raw_ms):8.2f} ms")
+    print(f"Rollups:              p50 {statistics.median(rollup_ms):8.2f} ms | max {max(rollup_ms):8.2f} ms")
+    print(f"Speedup:              {statistics.median(raw_ms) / statistics.median(rollup_ms):.1f}x")
+
+    if not keep:
+        with SessionLocal() as db:
+            for table in ("transaction_history", "spend_daily_rollups", "spend_monthly_rollups"):
+                db.execute(text(f"DELETE FROM {table} WHERE user_id = :u"), {"u": BENCH_USER})
+            db.commit()
+        print("🧹 Removed benchmark rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Spend rollup benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic rows for later runs")
+    args = parser.parse_args()
+    run(args.rows, args.runs, args.keep)
@@ -0,0 +1,147 @@
+"""
+Benchmark for the streaming statement import.
+
+Generates a synthetic CSV statement (50k rows by default), runs it through
+import_statement for a benchmark user and reports rows/sec plus the peak
+Python heap for a small and a large file, to show memory stays bounded by
+the batch size rather than the file size.
+
+Embeddings are off by default (they would dominate the timing with network
+calls); pass --embed to include them.
+
+Usage:
+    python benchmark_statement_import.py [--rows 50000] [--embed] [--no-persist]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from sqlalchemy import text
+from app.db.database import SessionLocal
+from app.schemas.credit_card import CreditCard, RewardRule
+from app.services.statement_service import import_statement
+from app.utils.transaction_parser import LocalTransactionParser
+
+BENCH_USER = "bench_statement_user"
+DESCRIPTIONS = [
+    "UPI/SWIGGY/{ref}", "UPI/ZOMATO ORDER/{ref}", "POS AMAZON PAY IN {ref}", "ECOM FLIPKART {ref}",
+    "UPI/UBER INDIA/{ref}", "MAKEMYTRIP INDIA PVT {ref}", "INDIAN OIL PETROL {ref}", "NETFLIX.COM {ref}",
+    "UPI/BLINKIT/{ref}", "POS RAMESH KIRANA STORE {ref}", "BOOKMYSHOW {ref}", "UPI/SOME LOCAL CAFE/{ref}",
+]
+
+BENCH_CARDS = [
+    CreditCard(
+        card_name="Swiggy HDFC", issuer="HDFC", card_type="Visa", annual_fee="500",
+        fee_waiver_condition=None, welcome_bonus=None, reward_program_name=None,
+        reward_rules=[
+            RewardRule(category="Swiggy", multiplier="10%", merchants=["Swiggy"], cap="Rs. 1500 cashback", period="Statement Cycle"),
+            RewardRule(category="Online", multiplier="5%", merchants=["Amazon", "Flipkart", "Zomato", "Uber"], cap="Rs. 1500 cashback", period="Statement Cycle"),
+            RewardRule(category="Others", multiplier="1%", merchants=["All"]),
+        ],
+        eligibility_criteria=None, excluded_categories=["fuel"], key_benefits=[]
+    ),
+    CreditCard(
+        card_name="Regalia Gold", issuer="HDFC", card_type="Visa", annual_fee="2500",
+        fee_waiver_condition=None, welcome_bonus=None, reward_program_name=None,
+        reward_rules=[
+            RewardRule(category="Travel", multiplier="5X", merchants=["MakeMyTrip", "Uber"], cap="5000 points", period="Month"),
+            RewardRule(category="All", multiplier="4X", merchants=["All"]),
+        ],
+        eligibility_criteria=None, excluded_categories=["fuel"], key_benefits=[]
+    ),
+    CreditCard(
+        card_name="Fuel Card", issuer="BPCL", card_type="Visa", annual_fee="0",
+        fee_waiver_condition=None, welcome_bonus=None, reward_program_name=None,
+        reward_rules=[
+            RewardRule(category="Fuel", multiplier="13X", merchants=["Indian Oil"], cap="Rs. 250", period="Month"),
+            RewardRule(category="All", multiplier="1X", merchants=["All"]),
+        ],
+        eligibility_criteria=None, excluded_categories=[], key_benefits=[]
+    ),
+]
+
+
+def write_statement(path: str, rows: int):
+    start = date.today() - timedelta(days=365)
+    with open(path, "w", newline="") as f:
+        f.write("Statement of account\nDate,Narration,Withdrawal Amt.,Deposit Amt.\n")
+        for i in range(rows):
+            day = start + timedelta(days=i * 365 // rows)
+            if i % 50 == 0:
+                f.write(f"{day:%d/%m/%Y},NEFT SALARY,,50000.00\n")
+            desc = random.choice(DESCRIPTIONS).format(ref=random.randint(10000, 99999))
+            f.write(f"{day:%d/%m/%Y},{desc},\"{random.uniform(50, 8000):,.2f}\",\n")
+
+
+def cleanup():
+    with SessionLocal() as db:
+        for table in ("transaction_history", "spend_daily_rollups", "spend_monthly_rollups", "reward_spend_ledger"):
+            db.execute(text(f"DELETE FROM {table} WHERE user_id = :u"), {"u": BENCH_USER})
+        db.commit()
+
+
+def run_import(path: str, persist: bool, embed: bool, parser) -> dict:
+    with open(path, newline="") as f:
+        summary = None
+        for event in import_statement(BENCH_USER, f, BENCH_CARDS, parser, statement_card="Regalia Gold",
+                                      persist=persist, embed=embed):
+            if event["type"] in ("summary", "error"):
+                summary = event
+    return summary
+
+
+def peak_memory_mb(path: str, persist: bool, embed: bool, parser) -> float:
+    tracemalloc.start()
+    run_import(path, persist, embed, parser)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def run(rows: int, persist: bool, embed: bool):
+    parser = LocalTransactionParser()
+    tmp = tempfile.mkdtemp()
+    small_path, large_path = os.path.join(tmp, "small.csv"), os.path.join(tmp, "large.csv")
+    write_statement(small_path, max(rows // 10, 1))
+    write_statement(large_path, rows)
+
+    try:
+        cleanup()
+        start = time.perf_counter()
+        summary = run_import(large_path, persist, embed, parser)
+        wall = time.perf_counter() - start
+        if summary["type"] == "error":
+            print(f"❌ Import failed: {summary['message']}")
+            return
+
+        cleanup()
+        small_peak = peak_memory_mb(small_path, persist, embed, parser)
+        cleanup()
+        large_peak = peak_memory_mb(large_path, persist, embed, parser)
+
+        print("=" * 60)
+        print(f"Statement Import Benchmark ({'persist' if persist else 'score only'}, embed={embed})")
+        print("=" * 60)
+        print(f"Rows:                {summary['rows']:,} (+{summary['skipped']} skipped)")
+        print(f"Wall time:           {wall:.2f}s")
+        print(f"Throughput:          {summary['rows_per_second']:,.0f} rows/sec")
+        print(f"Missed rewards:      {summary['missed_points']:,.0f} pts (₹{summary['missed_inr']:,.0f})")
+        print(f"Peak heap {rows // 10:>7,} rows: {small_peak:.1f} MB")
+        print(f"Peak heap {rows:>7,} rows: {large_peak:.1f} MB")
+    finally:
+        cleanup()
+        for path in (small_path, large_path):
+            os.remove(path)
+        os.rmdir(tmp)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Statement import benchmark")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--embed", action="store_true", help="Embed rows (calls the embeddings API)")
+    parser.add_argument("--no-persist", action="store_true", help="Only score, don't write to the database")
+    args = parser.parse_args()
+    run(args.rows, not args.no_persist, args.embed)
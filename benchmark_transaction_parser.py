@@ -0,0 +1,99 @@
+"""
+Benchmark for the local transaction pre-parser.
+
+Runs the labeled corpus below through LocalTransactionParser and reports
+how many messages skip the LLM entirely (LLM-avoidance rate) and how
+accurate the locally resolved fields are.
+
+Usage:
+    python benchmark_transaction_parser.py
+"""
+import time
+
+from app.utils.transaction_parser import LocalTransactionParser
+
+# (message, expected amount, expected merchant, expected category)
+# None means the field cannot be resolved from the text alone.
+LABELED_CORPUS = [
+    ("2k on Swiggy", 2000, "Swiggy", "food"),
+    ("1 lakh flight on MakeMyTrip", 100000, "MakeMyTrip", "travel"),
+    ("₹499 Netflix", 499, "Netflix", "entertainment"),
+    ("Spending 5000 rupees on Amazon, which card should I use?", 5000, "Amazon", "shopping"),
+    ("Best card for groceries at BigBasket for 3200?", 3200, "BigBasket", "groceries"),
+    ("Rs. 850 zomato order", 850, "Zomato", "food"),
+    ("uber ride to airport 650rs", 650, "Uber", "travel"),
+    ("1.5L hotel booking on goibibo", 150000, "Goibibo", "travel"),
+    ("paying 1,20,000 for flights on cleartrip", 120000, "Cleartrip", "travel"),
+    ("12k on myntra", 12000, "Myntra", "shopping"),
+    ("which card for 3k on flipkart", 3000, "Flipkart", "shopping"),
+    ("₹2,499 at Blinkit", 2499, "Blinkit", "groceries"),
+    ("Zepto order of 900", 900, "Zepto", "groceries"),
+    ("BookMyShow tickets for 1200", 1200, "BookMyShow", "entertainment"),
+    ("book my show 700rs", 700, "BookMyShow", "entertainment"),
+    ("mmt 45k", 45000, "MakeMyTrip", "travel"),
+    ("Rs 4000 petrol at Indian Oil", 4000, "Indian Oil", "fuel"),
+    ("spotify subscription 119 rs", 119, "Spotify", "entertainment"),
+    ("dinner at dominos for 1.2k", 1200, "Dominos", "food"),
+    ("swigy 450rs", 450, "Swiggy", "food"),
+    ("5k on instamart", 5000, "Swiggy Instamart", "groceries"),
+    ("Ola cab 380/-", 380, "Ola", "travel"),
+    ("IRCTC train tickets 2.3k", 2300, "IRCTC", "travel"),
+    ("₹15,000 on ajio", 15000, "Ajio", "shopping"),
+    ("nykaa 2200", None, "Nykaa", "shopping"),
+    ("2 crore flat", 20000000, None, None),
+    ("I want to buy an iPhone 15", None, None, None),
+    ("buying iPhone 15 on amazon", None, "Amazon", "shopping"),
+    ("Buying a MacBook Pro M3", None, None, None),
+    ("How much cashback on Amazon?", None, "Amazon", "shopping"),
+    ("Compare my cards for this Swiggy order", None, "Swiggy", "food"),
+    ("I'm buying electronics worth 50k, recommend a card", 50000, None, "shopping"),
+    ("Spent 2000 at the local kirana", 2000, None, None),
+    ("Rs 999 at Decathlon", 999, None, None),
+    ("Best card for travel booking?", None, None, "travel"),
+    ("Which card gives most rewards on fuel at 3000", 3000, None, "fuel"),
+]
+
+
+def run():
+    parser = LocalTransactionParser()
+
+    avoided = 0
+    correct_fields = 0
+    resolved_fields = 0
+    wrong_resolutions = []
+
+    start = time.perf_counter()
+    for text, amount, merchant, category in LABELED_CORPUS:
+        result = parser.parse(text)
+
+        for field, expected in (("amount", amount), ("merchant", merchant), ("category", category)):
+            value = getattr(result, field)
+            if value is None:
+                continue
+            resolved_fields += 1
+            if expected is not None and value == expected:
+                correct_fields += 1
+            else:
+                wrong_resolutions.append((text, field, value, expected))
+
+        if result.is_complete:
+            avoided += 1
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    total = len(LABELED_CORPUS)
+    print("=" * 60)
+    print("Local Transaction Parser Benchmark")
+    print("=" * 60)
+    print(f"Messages:            {total}")
+    print(f"LLM calls avoided:   {avoided}/{total} ({avoided / total:.0%})")
+    print(f"Field precision:     {correct_fields}/{resolved_fields} ({correct_fields / max(resolved_fields, 1):.0%})")
+    print(f"Parse time:          {elapsed_ms:.2f} ms total, {elapsed_ms / total:.3f} ms/message")
+
+    if wrong_resolutions:
+        print("\nWrong resolutions:")
+        for text, field, value, expected in wrong_resolutions:
+            print(f"   - '{text}': {field}={value!r} (expected {expected!r})")
+
+
+if __name__ == "__main__":
+    run()
@@ -1,8 +1,9 @@
+import asyncio
 import uuid
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, EmailStr
 from langchain_core.messages import HumanMessage, AIMessage
 from app.graph.graph import build_graph
@@ -10,12 +11,28 @@ from langgraph.checkpoint.postgres import PostgresSaver
 from app.db.database import DATABASE_URL, engine, SessionLocal
 from app.db.models import ChatThread, UserAuth
 from app.services.auth_service import create_user, authenticate_user
-from app.db.card_repository import get_user_cards
+from app.db.card_repository import card_key, get_card_by_key, get_user_card_rows, get_user_credit_cards
+from app.services.spend_service import get_spend_breakdown
+from app.services.statement_service import import_statement
+from app.services.portfolio_optimizer import optimize_allocation
+from app.services.health_service import health_monitor
+from app.services.card_parse_cache import extract_card_cached
+from app.services import semantic_cache
+from app.services.memory_service import retrieval_stats
+from app.services import cache_bus
+from app.services.resource_versions import bump, bump_now, conditional_stats, etag_headers, not_modified, resource_etag
+from app.utils.reward_rules import NORMALIZATION_VERSION
 from app.schemas.credit_card import CreditCard, RewardRule, Milestone, Eligibility
 from sqlalchemy import text
+import io
+import re
 import json
-from typing import List
-from app.graph.nodes import llm  # Import LLM for card parsing
+from datetime import date
+from typing import List, Literal, Optional
+from app.graph.nodes import get_local_parser
+from app.utils.clients import get_llm, get_embedding_batcher  # Shared LLM for card parsing
+from app.utils.single_flight import SingleFlight
+from app.utils.fast_json import json_response
 
 # Global graph instances
 graph = None  # Graph with memory (normal mode)
@@ -53,12 +70,20 @@ async def lifespan(app: FastAPI):
     print("🔧 Building incognito graph...")
     graph_incognito = build_graph(None)
     
+    # Probes are served from a snapshot refreshed in the background
+    await health_monitor.start(lambda: graph is not None)
+    
+    # Cross-worker cache invalidation (Postgres LISTEN/NOTIFY)
+    await asyncio.to_thread(cache_bus.start_listener)
+    
     print("✅ API ready to serve requests!")
     
     yield
     
     # Shutdown
     print("🛑 Shutting down...")
+    await health_monitor.stop()
+    await asyncio.to_thread(cache_bus.stop_listener)
     if memory_context:
         memory_context.__exit__(None, None, None)  # Exit the context manager
     print("✅ Shutdown complete!")
@@ -85,6 +110,7 @@ class ChatRequest(BaseModel):
     user: UserInfo  # Required user information
     stream: bool = False
     incognito: bool = False  # Incognito mode - no data saved
+    response_mode: Literal["fast", "rich"] = "rich"  # fast = templated answer only, rich = + LLM explanation
 
 class ChatResponse(BaseModel):
     response: str
@@ -213,6 +239,15 @@ async def login(request: LoginRequest):
     finally:
         db.close()
 
+def _turn_finished(thread_id: str, incognito: bool):
+    """The thread's history changed (new turn): clients polling it get a new ETag"""
+    if incognito:
+        return
+    try:
+        bump_now(f"thread:{thread_id}")
+    except Exception as e:
+        print(f"⚠️ Could not bump version of thread {thread_id}: {e}")
+
 @app.post("/chat")
 async def chat(request: ChatRequest):  
     """
@@ -224,6 +259,12 @@ async def chat(request: ChatRequest):
     - thread_id: Session-specific conversation thread (optional)
     - stream: Enable streaming response (optional)
     - incognito: Incognito mode - no conversation or transaction data saved (optional)
+    - response_mode: "fast" or "rich" (optional, default "rich")
+    
+    Response Modes:
+    - fast: Recommendations end at the templated answer (no extra LLM call)
+    - rich: The templated answer is sent first as an "answer" event when streaming,
+      followed by the LLM explanation as an "explanation" event
     
     Incognito Mode:
     - When incognito=true, no data is saved:
@@ -294,6 +335,7 @@ async def chat(request: ChatRequest):
                     thread_name=thread_name
                 )
                 db.add(new_thread)
+                bump(db, f"threads:{request.user.id}")
                 db.commit()
                 db.refresh(new_thread)
                 print(f"✅ Saved new thread: {thread_id} - {thread_name}")
@@ -311,7 +353,10 @@ async def chat(request: ChatRequest):
     
     try:
         # Process message through graph
-        inputs = {"messages": [HumanMessage(content=request.message)]}
+        inputs = {
+            "messages": [HumanMessage(content=request.message)],
+            "response_mode": request.response_mode
+        }
         
         if request.stream:
             # Streaming response
@@ -323,7 +368,15 @@ async def chat(request: ChatRequest):
                             if "messages" in node_data and node_data["messages"]:
                                 last_msg = node_data["messages"][-1]
                                 if isinstance(last_msg, AIMessage):
-                                    yield f"data: {json.dumps({'type': 'progress', 'node': node_name, 'content': last_msg.content})}\n\n"
+                                    # The templated recommendation is a complete answer on its own,
+                                    # the LLM recommendation follows it as an explanation
+                                    if node_name == "decision":
+                                        event_type = "answer"
+                                    elif node_name == "llm_recommendation":
+                                        event_type = "explanation"
+                                    else:
+                                        event_type = "progress"
+                                    yield f"data: {json.dumps({'type': event_type, 'node': node_name, 'content': last_msg.content})}\n\n"
                     
                     # Get final response
                     if request.incognito:
@@ -343,15 +396,20 @@ async def chat(request: ChatRequest):
                     
                 except Exception as e:
                     yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+                finally:
+                    _turn_finished(thread_id, request.incognito)
             
             return StreamingResponse(event_generator(), media_type="text/event-stream")
         
         else:
             # Non-streaming response (original behavior)
             final_state = None
-            for event in active_graph.stream(inputs, config=config):
-                # Keep track of the last state
-                final_state = event
+            try:
+                for event in active_graph.stream(inputs, config=config):
+                    # Keep track of the last state
+                    final_state = event
+            finally:
+                _turn_finished(thread_id, request.incognito)
             
             # Get final response
             # In incognito mode (no checkpointer), get_state won't work, so use final_state from stream
@@ -381,34 +439,34 @@ async def chat(request: ChatRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
+def _thread_rows(db, user_id: Optional[str] = None) -> List[dict]:
+    """ThreadInfo fields of the threads (of one user), most recently updated first"""
+    query = db.query(ChatThread.thread_id, ChatThread.thread_name, ChatThread.created_at, ChatThread.updated_at)
+    if user_id:
+        query = query.filter(ChatThread.user_id == user_id)
+    return [row._asdict() for row in query.order_by(ChatThread.updated_at.desc())]
+
 @app.get("/user/{user_id}/threads", response_model=ThreadListDetailedResponse)
-async def get_user_thread_ids(user_id: str):
+async def get_user_thread_ids(user_id: str, request: Request):
     """
     Get all threads for a specific user with detailed information
+    
+    Sends an ETag; a request whose If-None-Match still matches gets 304
+    without the threads being read.
     """
     if not graph:
         raise HTTPException(status_code=503, detail="Service not initialized")
     
     try:
+        etag = resource_etag(f"threads:{user_id}")
+        if not_modified(request, etag, "user_threads"):
+            return Response(status_code=304, headers=etag_headers(etag))
         db = SessionLocal()
         try:
-            threads = db.query(ChatThread).filter(
-                ChatThread.user_id == user_id
-            ).order_by(ChatThread.updated_at.desc()).all()
-            
-            thread_list = [
-                ThreadInfo(
-                    thread_id=thread.thread_id,
-                    thread_name=thread.thread_name,
-                    created_at=thread.created_at.isoformat(),
-                    updated_at=thread.updated_at.isoformat()
-                )
-                for thread in threads
-            ]
-            
-            return ThreadListDetailedResponse(threads=thread_list, count=len(thread_list))
+            threads = _thread_rows(db, user_id)
         finally:
             db.close()
+        return json_response({"threads": threads, "count": len(threads)}, request, headers=etag_headers(etag))
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving threads: {str(e)}")
@@ -440,49 +498,45 @@ async def get_user(user_id: str):
         raise HTTPException(status_code=500, detail=f"Error retrieving user: {str(e)}")
 
 @app.get("/chat/threads", response_model=ThreadListDetailedResponse)
-async def get_all_threads(user_id: str = None):
+async def get_all_threads(request: Request, user_id: str = None):
     """
     Get all thread IDs (session IDs) with their names from the database
-    Optionally filter by user_id
+    Optionally filter by user_id (only then is an ETag sent)
     """
     if not graph:
         raise HTTPException(status_code=503, detail="Service not initialized")
     
     try:
+        etag = resource_etag(f"threads:{user_id}") if user_id else None
+        if not_modified(request, etag, "chat_threads"):
+            return Response(status_code=304, headers=etag_headers(etag))
         db = SessionLocal()
         try:
-            query = db.query(ChatThread)
-            if user_id:
-                query = query.filter(ChatThread.user_id == user_id)
-            
-            threads = query.order_by(ChatThread.updated_at.desc()).all()
-            
-            thread_list = [
-                ThreadInfo(
-                    thread_id=thread.thread_id,
-                    thread_name=thread.thread_name,
-                    created_at=thread.created_at.isoformat(),
-                    updated_at=thread.updated_at.isoformat()
-                )
-                for thread in threads
-            ]
-            
-            return ThreadListDetailedResponse(threads=thread_list, count=len(thread_list))
+            threads = _thread_rows(db, user_id)
         finally:
             db.close()
+        return json_response({"threads": threads, "count": len(threads)}, request, headers=etag_headers(etag))
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving threads: {str(e)}")
 
 @app.get("/chat/history/{thread_id}", response_model=ChatHistoryResponse)
-async def get_chat_history(thread_id: str):
+async def get_chat_history(thread_id: str, request: Request, response: Response):
     """
     Get chat history for a specific thread (only user messages and final assistant responses)
+    
+    Sends an ETag; a request whose If-None-Match still matches gets 304
+    without the checkpoints being read.
     """
     if not graph:
         raise HTTPException(status_code=503, detail="Service not initialized")
     
     try:
+        etag = resource_etag(f"thread:{thread_id}")
+        if not_modified(request, etag, "chat_history"):
+            return Response(status_code=304, headers=etag_headers(etag))
+        response.headers.update(etag_headers(etag))
+        
         config = {"configurable": {"thread_id": thread_id}}
         snapshot = graph.get_state(config)
         
@@ -532,6 +586,7 @@ async def delete_thread(thread_id: str):
             thread = db.query(ChatThread).filter(ChatThread.thread_id == thread_id).first()
             if thread:
                 db.delete(thread)
+                bump(db, f"threads:{thread.user_id}")
                 db.commit()
                 deleted_items["thread_metadata"] = True
             
@@ -547,6 +602,7 @@ async def delete_thread(thread_id: str):
                 
                 if result.rowcount > 0:
                     deleted_items["checkpoints"] = True
+            bump_now(f"thread:{thread_id}")
             
             if not deleted_items["thread_metadata"] and not deleted_items["checkpoints"]:
                 raise HTTPException(status_code=404, detail=f"Thread {thread_id} not found")
@@ -566,49 +622,173 @@ async def delete_thread(thread_id: str):
         raise HTTPException(status_code=500, detail=f"Error deleting thread: {str(e)}")
 
 @app.get("/user/{user_id}/cards", response_model=UserCardsResponse)
-async def get_user_cards_endpoint(user_id: str):
+async def get_user_cards_endpoint(user_id: str, request: Request):
     """
     Get all credit cards for a specific user
+    
+    Rows are serialized straight to JSON with orjson (gzipped when large and
+    accepted); the response has the UserCardsResponse shape. Sends an ETag;
+    a request whose If-None-Match still matches gets 304 without the cards
+    being read.
     """
     try:
+        # Stored rules change shape when the normalization is bumped
+        etag = resource_etag(f"cards:{user_id}", f"n{NORMALIZATION_VERSION}")
+        if not_modified(request, etag, "cards"):
+            return Response(status_code=304, headers=etag_headers(etag))
         db = SessionLocal()
         try:
-            # Fetch cards from database
-            cards = get_user_cards(db, user_id)
-            
-            # Convert to response format
-            card_responses = [
-                CardResponse(
-                    id=card.id,
-                    card_name=card.card_name,
-                    issuer=card.issuer,
-                    card_type=card.card_type,
-                    annual_fee=card.annual_fee,
-                    fee_waiver_condition=card.fee_waiver_condition,
-                    welcome_bonus=card.welcome_bonus,
-                    liability_policy=card.liability_policy,
-                    reward_program_name=card.reward_program_name,
-                    reward_rules=card.reward_rules or [],
-                    milestone_benefits=card.milestone_benefits or [],
-                    eligibility_criteria=card.eligibility_criteria,
-                    excluded_categories=card.excluded_categories or [],
-                    key_benefits=card.key_benefits or []
-                )
-                for card in cards
-            ]
-            
-            return UserCardsResponse(
-                user_id=user_id,
-                cards=card_responses,
-                count=len(card_responses)
-            )
+            cards = get_user_card_rows(db, user_id)
         finally:
             db.close()
+        return json_response({"user_id": user_id, "cards": cards, "count": len(cards)}, request,
+                             headers=etag_headers(etag))
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error retrieving cards: {str(e)}")
 
+class SpendBreakdownResponse(BaseModel):
+    user_id: str
+    period: str
+    total: float
+    count: int
+    by_category: List[dict]
+    by_merchant: List[dict]
+    by_card: List[dict]
+    unattributed: dict
+
+@app.get("/user/{user_id}/spend", response_model=SpendBreakdownResponse)
+async def get_user_spend(user_id: str, month: str = None, day: date = None, category: str = None):
+    """
+    Spend breakdown by category, merchant and card
+    
+    Parameters:
+    - month: Month as YYYY-MM (optional, defaults to the current month)
+    - day: Single day as YYYY-MM-DD (optional, overrides month)
+    - category: Only include this category, e.g. "food" (optional)
+    
+    Served from the incrementally maintained spend rollups, so the cost
+    does not grow with the size of the transaction history. Spend recorded
+    without a card is totalled in unattributed instead of by_card.
+    """
+    if month and not re.fullmatch(r"\d{4}-\d{2}", month):
+        raise HTTPException(status_code=400, detail="month must be in YYYY-MM format")
+    
+    try:
+        db = SessionLocal()
+        try:
+            breakdown = get_spend_breakdown(db, user_id, month=month, day=day, category=category)
+            return SpendBreakdownResponse(user_id=user_id, **breakdown)
+        finally:
+            db.close()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving spend: {str(e)}")
+
+@app.post("/user/{user_id}/statement")
+async def import_user_statement(user_id: str, file: UploadFile = File(...), card_name: Optional[str] = None,
+                                persist: bool = True, embed: bool = True):
+    """
+    Import a CSV bank / card statement
+    
+    Parameters:
+    - file: CSV with date, description/narration and amount/debit columns
+    - card_name: Card the statement belongs to (optional). Missed rewards are
+      measured against it, otherwise against the base rate.
+    - persist: Save the rows to the transaction history (default true).
+      Rows already saved (same day, description and amount) are skipped.
+    - embed: Embed the saved rows for semantic search (default true)
+    
+    Streams NDJSON: one "row" event per debit with the best card and the
+    missed rewards, then a "summary" event with totals and rows/sec.
+    """
+    db = SessionLocal()
+    try:
+        cards = get_user_credit_cards(db, user_id)
+    finally:
+        db.close()
+    
+    if not cards:
+        raise HTTPException(status_code=400, detail="No cards found. Add your credit cards first.")
+    if card_name and card_name not in {card.card_name for card in cards}:
+        raise HTTPException(status_code=404, detail=f"Card '{card_name}' not found for user {user_id}")
+    
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="replace", newline="")
+    
+    def event_generator():
+        try:
+            for event in import_statement(user_id, lines, cards, get_local_parser(),
+                                          statement_card=card_name, persist=persist, embed=embed):
+                yield json.dumps(event) + "\n"
+        except ValueError as e:
+            yield json.dumps({"type": "error", "message": str(e)}) + "\n"
+    
+    return StreamingResponse(event_generator(), media_type="application/x-ndjson")
+
+class SpendLine(BaseModel):
+    merchant: Optional[str] = None
+    category: Optional[str] = None
+    amount: float  # Projected monthly spend (INR)
+
+class OptimizeRequest(BaseModel):
+    spend: List[SpendLine]
+
+@app.post("/user/{user_id}/optimize")
+async def optimize_user_spend(user_id: str, request: OptimizeRequest):
+    """
+    Split a projected monthly spend across the user's cards
+    
+    Each spend line names a merchant and/or category with a monthly amount.
+    The allocation respects reward caps and their periods, and moves spend
+    onto a card when reaching a milestone or fee waiver is worth more than
+    the points given up elsewhere. Values are reported per year.
+    """
+    lines = [line.model_dump() for line in request.spend]
+    if not lines:
+        raise HTTPException(status_code=400, detail="spend must contain at least one line")
+    if any(not (line["merchant"] or line["category"]) or line["amount"] <= 0 for line in lines):
+        raise HTTPException(status_code=400, detail="Each spend line needs a merchant or category and a positive amount")
+    
+    db = SessionLocal()
+    try:
+        cards = get_user_credit_cards(db, user_id)
+    finally:
+        db.close()
+    
+    if not cards:
+        raise HTTPException(status_code=400, detail="No cards found. Add your credit cards first.")
+    
+    return {"user_id": user_id, **optimize_allocation(cards, lines)}
+
+@app.get("/user/{user_id}/card_suggestions")
+async def suggest_new_cards(user_id: str, limit: int = 10, include_owned: bool = False):
+    """
+    Which card to apply for: every card in the catalog ranked on the user's spend
+    
+    Parameters:
+    - limit: Number of cards to return (default 10, at most 100)
+    - include_owned: Also rank cards the user already has (default false)
+    
+    The catalog is every distinct card stored by any user. Each card is
+    valued as if it carried all of the user's last 12 months of spend
+    (annualized): rewards within caps, milestones reached, net of the annual
+    fee unless the spend waives it. top_earners shows where a card's points
+    come from. thin_history is set when the spend covers too few months for
+    the yearly figures to be reliable.
+    """
+    if not 1 <= limit <= 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+    
+    from app.services.card_catalog import card_catalog  # numpy: loaded on first use
+    try:
+        result = await asyncio.to_thread(card_catalog.suggest, user_id, limit, include_owned)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error ranking cards: {str(e)}")
+    
+    if not result["profile_months"]:
+        raise HTTPException(status_code=400, detail="No spend history found. Log transactions or import a statement first.")
+    return {"user_id": user_id, **result}
+
 class AddCardRequest(BaseModel):
     bank_name: str
     card_name: str
@@ -619,25 +799,38 @@ class AddCardResponse(BaseModel):
     message: str
     card_details: dict | None = None
 
-@app.post("/add_card", response_model=AddCardResponse)
-async def add_card_endpoint(request: AddCardRequest):
-    """
-    Add a credit card by searching for its details online
-    
-    Parameters:
-    - bank_name: Name of the bank/issuer (e.g., "HDFC", "ICICI", "American Express")
-    - card_name: Name of the card (e.g., "Regalia Gold", "Amazon Pay", "Platinum Travel")
-    - user_id: User ID to associate the card with
-    
-    This endpoint will:
-    1. Search for card details online using web search
-    2. Parse and extract structured card information
-    3. Save the card to the database
-    """
+def _card_details(db_card) -> dict:
+    """Stored card as returned by /add_card"""
+    return {
+        "id": db_card.id,
+        "card_name": db_card.card_name,
+        "issuer": db_card.issuer,
+        "card_type": db_card.card_type,
+        "annual_fee": db_card.annual_fee,
+        "reward_program_name": db_card.reward_program_name,
+        "reward_rules": db_card.reward_rules,
+        "key_benefits": db_card.key_benefits
+    }
+
+def _search_and_add_card(request: AddCardRequest) -> AddCardResponse:
+    """Search, extraction and storage behind /add_card (blocking)"""
     try:
         from app.tools.web_search import search_product_price
         from langchain_core.messages import SystemMessage
         
+        # Step 0: A retry of a request that already went through
+        db = SessionLocal()
+        try:
+            existing = get_card_by_key(db, request.user_id, card_key(request.bank_name, request.card_name))
+            if existing:
+                return AddCardResponse(
+                    success=True,
+                    message=f"{existing.card_name} is already in your portfolio",
+                    card_details=_card_details(existing)
+                )
+        finally:
+            db.close()
+        
         # Step 1: Search for card details online
         search_query = f"{request.bank_name} {request.card_name} credit card features benefits rewards India"
         print(f"🔍 Searching for: {search_query}")
@@ -653,7 +846,7 @@ async def add_card_endpoint(request: AddCardRequest):
         print(f"✅ Found search results (length: {len(search_results)})")
         
         # Step 2: Parse the card details using the card parser
-        structured_llm = llm.with_structured_output(CreditCard)
+        structured_llm = get_llm().with_structured_output(CreditCard)
         
         CARD_EXTRACTION_PROMPT = """
 You are a STRICT Financial Data Extractor. Your goal is to map unstructured text to a structured schema with 100% fidelity to the source text.
@@ -678,10 +871,16 @@ You are a STRICT Financial Data Extractor. Your goal is to map unstructured text
 Return strictly valid JSON matching the provided schema.
 """
         
-        card_data: CreditCard = structured_llm.invoke([
-            SystemMessage(content=CARD_EXTRACTION_PROMPT),
-            f"Extract credit card details from this search result:\n\n{search_results}"
-        ])
+        extraction_input = f"Extract credit card details from this search result:\n\n{search_results}"
+        card_data: CreditCard = extract_card_cached(
+            extraction_input,
+            CARD_EXTRACTION_PROMPT,
+            lambda: structured_llm.invoke([
+                SystemMessage(content=CARD_EXTRACTION_PROMPT),
+                extraction_input
+            ]),
+            model=get_llm().model_name
+        )
         
         if not card_data.extracted_from_user:
             raise HTTPException(
@@ -695,24 +894,14 @@ Return strictly valid JSON matching the provided schema.
         db = SessionLocal()
         try:
             from app.db.card_repository import add_card
+            from app.graph.nodes import register_card_merchants
             db_card = add_card(db, card_data, request.user_id)
-            
-            # Convert to dict for response
-            card_dict = {
-                "id": db_card.id,
-                "card_name": db_card.card_name,
-                "issuer": db_card.issuer,
-                "card_type": db_card.card_type,
-                "annual_fee": db_card.annual_fee,
-                "reward_program_name": db_card.reward_program_name,
-                "reward_rules": db_card.reward_rules,
-                "key_benefits": db_card.key_benefits
-            }
+            register_card_merchants(card_data)
             
             return AddCardResponse(
                 success=True,
                 message=f"Successfully added {card_data.card_name} to your portfolio",
-                card_details=card_dict
+                card_details=_card_details(db_card)
             )
         finally:
             db.close()
@@ -727,48 +916,97 @@ Return strictly valid JSON matching the provided schema.
             detail=f"Error adding card: {str(e)}"
         )
 
-@app.get("/health")
-async def health_check():
+# Concurrent duplicates (double taps, client retries) share one search + extraction
+_add_card_flight = SingleFlight()
+
+@app.post("/add_card", response_model=AddCardResponse)
+async def add_card_endpoint(request: AddCardRequest):
     """
-    Health check endpoint - verifies server and database connectivity
+    Add a credit card by searching for its details online
+    
+    Parameters:
+    - bank_name: Name of the bank/issuer (e.g., "HDFC", "ICICI", "American Express")
+    - card_name: Name of the card (e.g., "Regalia Gold", "Amazon Pay", "Platinum Travel")
+    - user_id: User ID to associate the card with
+    
+    This endpoint will:
+    1. Search for card details online using web search
+    2. Parse and extract structured card information
+    3. Save the card to the database
+    
+    Concurrent requests for the same user, bank and card (compared after
+    normalization) are coalesced into one search, and a card the user
+    already has is returned without searching again. Cards are unique per
+    user in the database, so adding one twice updates the stored terms.
     """
-    health_status = {
-        "status": "healthy",
-        "database": "disconnected",
-        "graph": "not_initialized",
-        "checkpoint_tables": "unknown"
+    key = (request.user_id, card_key(request.bank_name, request.card_name))
+    return await _add_card_flight.run(key, lambda: asyncio.to_thread(_search_and_add_card, request))
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Cache effectiveness counters of this worker
+    
+    semantic_cache: hits / misses of the general-question answer cache, the
+    hit rate, and the LLM latency saved net of lookup cost (plus the size and
+    lifetime hit count of the shared cache table).
+    transaction_retrieval: memory lookups answered by the lexical index
+    alone (embedding_calls_avoided) vs. those that needed the vector search.
+    memory_index: users held by the in-process vector index, its size, and
+    searches it served vs. fell back to pgvector.
+    embedding_batching: single-text embeddings merged into shared upstream
+    requests (batch-size distribution, calls saved) and bulk import calls.
+    card_catalog: cards in the suggestion catalog, its builds, and the
+    average time to rank it for a user.
+    conditional_get: polled GETs (cards, threads, chat history), how many
+    sent If-None-Match and the share answered 304 Not Modified.
+    """
+    from app.services.card_catalog import card_catalog
+    from app.services.memory_index import memory_index
+    report = {
+        "semantic_cache": semantic_cache.stats.report(),
+        "transaction_retrieval": retrieval_stats.report(),
+        "memory_index": memory_index.report(),
+        "embedding_batching": get_embedding_batcher().report(),
+        "card_catalog": card_catalog.report(),
+        "conditional_get": conditional_stats.report()
     }
-    
-    # Check database connection and checkpoint tables
     try:
-        with engine.connect() as conn:
-            # Test basic connectivity
-            conn.execute(text("SELECT 1"))
-            health_status["database"] = "connected"
-            
-            # Check if checkpoint tables exist (in a separate connection)
-            with engine.connect() as conn2:
-                result = conn2.execute(text("""
-                    SELECT table_name 
-                    FROM information_schema.tables 
-                    WHERE table_schema = 'public' 
-                    AND table_name IN ('checkpoints', 'checkpoint_blobs', 'checkpoint_writes')
-                    ORDER BY table_name
-                """))
-                tables = [row[0] for row in result]
-                health_status["checkpoint_tables"] = tables if tables else "missing"
-            
+        report["semantic_cache"].update(await asyncio.to_thread(semantic_cache.cache_summary))
     except Exception as e:
-        health_status["status"] = "unhealthy"
-        health_status["database"] = f"error: {str(e)}"
-    
-    # Check graph initialization
-    if graph:
-        health_status["graph"] = "initialized"
-    else:
-        health_status["status"] = "unhealthy"
-    
-    if health_status["status"] != "healthy":
-        raise HTTPException(status_code=503, detail=health_status)
+        report["semantic_cache"]["error"] = str(e)
+    return report
+
+@app.get("/livez")
+async def liveness_check():
+    """
+    Liveness probe - the process is up and the event loop is responsive.
+    Does no I/O.
+    """
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness_check():
+    """
+    Readiness probe - served from the background health snapshot
+    (database, checkpoint tables, pool saturation, graph), never
+    queries the database itself. 503 when not ready.
+    """
+    report = health_monitor.report()
+    if not report["ready"]:
+        raise HTTPException(status_code=503, detail=report)
+    return report
+
+@app.get("/health")
+async def health_check():
+    """
+    Health check endpoint - verifies server and database connectivity
     
-    return health_status
+    Served from the background health snapshot. 503 only when the database
+    is unreachable or the graph is not initialized; missing checkpoint
+    tables and pool saturation are reported by /readyz.
+    """
+    report = health_monitor.report()
+    if report["status"] != "healthy":
+        raise HTTPException(status_code=503, detail=report)
+    return report
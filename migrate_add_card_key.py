@@ -0,0 +1,113 @@
+"""
+Migration script for duplicate-free card storage
+- Adds card_key (normalized "issuer|card name") to credit_cards and backfills it
+- Removes duplicate cards of a user (keeps the most recently added row)
+- Adds the unique constraint on (user_id, card_key) that add_card upserts on
+
+--dry-run changes nothing: it computes the keys in Python from a SELECT
+and lists the duplicates that would be removed.
+
+Usage:
+    python migrate_add_card_key.py [--dry-run]
+"""
+import argparse
+from sqlalchemy import text
+from app.db.database import engine
+from app.db.card_repository import card_key
+from app.services.cache_bus import publish
+
+def add_column():
+    with engine.connect() as conn:
+        conn.execute(text("""
+            ALTER TABLE credit_cards ADD COLUMN IF NOT EXISTS card_key VARCHAR;
+        """))
+        conn.commit()
+
+def backfill():
+    with engine.begin() as conn:
+        rows = conn.execute(text("SELECT id, issuer, card_name FROM credit_cards WHERE card_key IS NULL")).fetchall()
+        for row in rows:
+            conn.execute(
+                text("UPDATE credit_cards SET card_key = :key WHERE id = :id"),
+                {"key": card_key(row.issuer, row.card_name), "id": row.id}
+            )
+    return len(rows)
+
+def find_duplicates(conn):
+    return conn.execute(text("""
+        SELECT id, user_id, card_name FROM (
+            SELECT id, user_id, card_name,
+                   ROW_NUMBER() OVER (PARTITION BY user_id, card_key ORDER BY id DESC) AS rank
+            FROM credit_cards
+        ) ranked
+        WHERE rank > 1
+        ORDER BY user_id, id
+    """)).fetchall()
+
+def planned_duplicates():
+    """find_duplicates() as it would be after backfill(), without writing anything"""
+    with engine.connect() as conn:
+        has_key = conn.execute(text("""
+            SELECT 1 FROM information_schema.columns WHERE table_name = 'credit_cards' AND column_name = 'card_key'
+        """)).scalar()
+        rows = conn.execute(text(f"""
+            SELECT id, user_id, issuer, card_name, {'card_key' if has_key else 'NULL'} AS card_key
+            FROM credit_cards ORDER BY id DESC
+        """)).fetchall()
+    kept, duplicates = set(), []
+    for row in rows:
+        key = (row.user_id, row.card_key or card_key(row.issuer, row.card_name))
+        if key in kept:
+            duplicates.append(row)
+        kept.add(key)
+    missing = sum(1 for row in rows if not row.card_key)
+    return missing, sorted(duplicates, key=lambda row: (row.user_id, row.id))
+
+def remove_duplicates():
+    with engine.begin() as conn:
+        duplicates = find_duplicates(conn)
+        for row in duplicates:
+            print(f"   removing duplicate #{row.id} '{row.card_name}' of {row.user_id}")
+        if duplicates:
+            conn.execute(text("DELETE FROM credit_cards WHERE id = ANY(:ids)"), {"ids": [r.id for r in duplicates]})
+            for user_id in {r.user_id for r in duplicates}:
+                publish(f"cards:{user_id}", conn, local=False)
+    return duplicates
+
+def add_constraint():
+    with engine.connect() as conn:
+        conn.execute(text("""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_credit_cards_user_card_key') THEN
+                    ALTER TABLE credit_cards
+                        ADD CONSTRAINT uq_credit_cards_user_card_key UNIQUE (user_id, card_key);
+                END IF;
+            END $$;
+        """))
+        conn.commit()
+
+def migrate(dry_run: bool = False):
+    if dry_run:
+        missing, duplicates = planned_duplicates()
+        for row in duplicates:
+            print(f"   would remove duplicate #{row.id} '{row.card_name}' of {row.user_id}")
+        print(f"✅ Dry run (nothing changed): {missing} keys would be backfilled, "
+              f"{len(duplicates)} duplicates would be removed")
+        return
+
+    add_column()
+    filled = backfill()
+    duplicates = remove_duplicates()
+    add_constraint()
+
+    print("✅ Migration completed successfully!")
+    print(f"✅ Backfilled card_key for {filled} cards")
+    print(f"✅ Removed {len(duplicates)} duplicate cards")
+    print("✅ Added unique constraint uq_credit_cards_user_card_key (user_id, card_key)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add card_key and make cards unique per user")
+    parser.add_argument("--dry-run", action="store_true", help="Only report the keys and duplicates, change nothing")
+    args = parser.parse_args()
+    migrate(args.dry_run)
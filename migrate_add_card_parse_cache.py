@@ -0,0 +1,16 @@
+"""
+Migration script for the card extraction cache
+- Creates the card_parse_cache table (see app/services/card_parse_cache.py)
+Run this once to update your database schema
+"""
+from app.db.database import engine
+from app.db.models import CardParseCache
+
+def migrate():
+    CardParseCache.__table__.create(bind=engine, checkfirst=True)
+
+    print("✅ Migration completed successfully!")
+    print("✅ Created card_parse_cache table")
+
+if __name__ == "__main__":
+    migrate()
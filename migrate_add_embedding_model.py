@@ -0,0 +1,89 @@
+"""
+Migration script for pluggable embedding backends
+- Adds embedding_model ("<backend>:<model>:<dimensions>") to transaction_history,
+  user_memories and semantic_answer_cache; vector searches only compare rows
+  of the active backend (app/utils/embedding_backends.py)
+- Backfills existing rows as OpenAI text-embedding-3-small at the width the
+  column stores (declared width, or each row's for width-less columns), not
+  the configured EMBEDDING_DIMENSIONS (in throttled batches, so the tables
+  stay writable; see app/db/migrations.py)
+- --mixed-widths: declares the embedding columns without a width, so
+  backends of different widths (e.g. a 384-dimension local model next to
+  OpenAI rows) can share the tables. Vector indexes on them are dropped:
+  pgvector only indexes fixed-width columns. Run the app with
+  EMBEDDING_MIXED_WIDTHS=true afterwards.
+
+Usage:
+    python migrate_add_embedding_model.py [--mixed-widths]
+"""
+import argparse
+import re
+from sqlalchemy import text
+from app.db.database import engine
+from app.db.migrations import backfill as backfill_rows
+
+TABLES = ["transaction_history", "user_memories", "semantic_answer_cache"]
+BACKFILL_MODEL = "openai:text-embedding-3-small"
+
+
+def add_column():
+    with engine.connect() as conn:
+        for table in TABLES:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS embedding_model VARCHAR(80)"))
+        conn.commit()
+
+
+def declared_type(conn, table: str) -> str:
+    """The embedding column's type as declared: 'vector(1536)', or 'vector' without a width."""
+    return conn.execute(text("""
+        SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+        WHERE attrelid = to_regclass(:table) AND attname = 'embedding' AND NOT attisdropped
+    """), {"table": table}).scalar()
+
+
+def backfill(table: str) -> int:
+    with engine.connect() as conn:
+        width = re.search(r"\((\d+)\)", declared_type(conn, table))
+    return backfill_rows(
+        table,
+        f"embedding_model = :model || ':' || {width.group(1) if width else 'vector_dims(embedding)'}",
+        "embedding_model IS NULL AND embedding IS NOT NULL",
+        {"model": BACKFILL_MODEL}
+    )
+
+
+def drop_widths():
+    with engine.begin() as conn:
+        for table in TABLES:
+            declared = declared_type(conn, table)
+            storage = re.match(r"\w+", declared).group(0)
+            if declared == storage:
+                print(f"✅ {table}.embedding already has no fixed width")
+                continue
+            indexes = conn.execute(text("""
+                SELECT indexname FROM pg_indexes WHERE tablename = :table AND indexdef ~ '\\(embedding '
+            """), {"table": table}).scalars().all()
+            for index in indexes:
+                conn.execute(text(f'DROP INDEX "{index}"'))
+                print(f"   dropped {index} (exact scans from now on)")
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN embedding TYPE {storage}"))
+            print(f"✅ {table}.embedding: {declared} -> {storage}")
+
+
+def migrate(mixed_widths: bool = False):
+    add_column()
+    for table in TABLES:
+        print(f"✅ {table}: tagged {backfill(table)} existing embeddings as {BACKFILL_MODEL}")
+    if mixed_widths:
+        drop_widths()
+
+    print("✅ Migration completed successfully!")
+    print("✅ Added embedding_model to transaction_history, user_memories and semantic_answer_cache")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record the embedding backend of every embedding row")
+    parser.add_argument("--mixed-widths", action="store_true",
+                        help="Declare embedding columns without a width (backends of different widths)")
+    args = parser.parse_args()
+    migrate(args.mixed_widths)
@@ -0,0 +1,18 @@
+"""
+Migration script for combined memory retrieval
+- Adds (user_id, created_at) indexes on transaction_history and user_memories,
+  used by the recency-aware retrieval in memory_service.retrieve_memories
+  (built CONCURRENTLY: writes continue during the build)
+Run this once to update your database schema
+"""
+from app.db.migrations import create_index_concurrently
+
+def migrate():
+    create_index_concurrently("ix_transaction_history_user_created", "transaction_history", "(user_id, created_at)")
+    create_index_concurrently("ix_user_memories_user_created", "user_memories", "(user_id, created_at)")
+
+    print("✅ Migration completed successfully!")
+    print("✅ Added (user_id, created_at) indexes to transaction_history and user_memories")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,17 @@
+"""
+Migration script for ETag / conditional GET support
+Creates resource_versions: one version counter per polled resource
+(cards:<user_id>, threads:<user_id>, thread:<thread_id>), bumped with every
+write that changes it (see app/services/resource_versions.py)
+Run this once to update your database schema
+"""
+from app.db.database import engine
+from app.db.models import ResourceVersion
+
+def migrate():
+    ResourceVersion.__table__.create(bind=engine, checkfirst=True)
+    print("✅ Created resource_versions table")
+    print("✅ Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,24 @@
+"""
+Migration script for the semantic answer cache
+- Creates the semantic_answer_cache table (see app/services/semantic_cache.py)
+- Adds an HNSW index for the cosine-distance lookup
+Run this once to update your database schema
+"""
+from app.db.database import engine
+from app.db.migrations import create_index_concurrently
+from app.db.models import SemanticAnswerCache
+from app.utils.vectors import EMBEDDING_STORAGE
+
+def migrate():
+    SemanticAnswerCache.__table__.create(bind=engine, checkfirst=True)
+
+    create_index_concurrently(
+        "ix_semantic_answer_cache_embedding", "semantic_answer_cache",
+        f"USING hnsw (embedding {EMBEDDING_STORAGE}_cosine_ops)"
+    )
+
+    print("✅ Migration completed successfully!")
+    print("✅ Created semantic_answer_cache table with HNSW embedding index")
+
+if __name__ == "__main__":
+    migrate()
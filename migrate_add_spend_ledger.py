@@ -0,0 +1,27 @@
+"""
+Migration script for cap-aware reward scoring
+- Adds card_name to transaction_history
+- Creates the reward_spend_ledger table
+Run this once to update your database schema
+"""
+from sqlalchemy import text
+from app.db.database import engine
+from app.db.models import RewardSpendLedger
+
+def migrate():
+    with engine.connect() as conn:
+        # Card the spend was attributed to
+        conn.execute(text("""
+            ALTER TABLE transaction_history ADD COLUMN IF NOT EXISTS card_name VARCHAR;
+        """))
+        conn.commit()
+
+    # Running spend per (user, card, rule, period)
+    RewardSpendLedger.__table__.create(bind=engine, checkfirst=True)
+
+    print("✅ Migration completed successfully!")
+    print("✅ Added card_name to transaction_history")
+    print("✅ Created reward_spend_ledger table")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,19 @@
+"""
+Migration script to add the daily/monthly spend rollup tables
+Creates the tables and backfills them from transaction_history
+Run this once to update your database schema
+"""
+from app.db.database import engine
+from app.db.models import SpendDailyRollup, SpendMonthlyRollup
+from rebuild_spend_rollups import rebuild
+
+def migrate():
+    SpendDailyRollup.__table__.create(bind=engine, checkfirst=True)
+    SpendMonthlyRollup.__table__.create(bind=engine, checkfirst=True)
+    print("✅ Created spend_daily_rollups and spend_monthly_rollups tables")
+
+    rebuild()
+    print("✅ Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
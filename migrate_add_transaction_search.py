@@ -0,0 +1,39 @@
+"""
+Migration script for hybrid (lexical + vector) transaction retrieval
+- Adds the generated search_tsv column to transaction_history with a GIN index
+- Enables pg_trgm (when the server ships it) and adds a trigram index on
+  lower(merchant) for fuzzy merchant matches
+  (indexes are built CONCURRENTLY: writes continue during the build)
+Run this once to update your database schema
+"""
+from sqlalchemy import text
+from app.db.database import engine
+from app.db.migrations import create_index_concurrently
+from app.db.models import TRANSACTION_SEARCH_TSV
+
+def migrate():
+    with engine.connect() as conn:
+        conn.execute(text(f"""
+            ALTER TABLE transaction_history
+                ADD COLUMN IF NOT EXISTS search_tsv tsvector
+                GENERATED ALWAYS AS ({TRANSACTION_SEARCH_TSV}) STORED;
+        """))
+        conn.commit()
+    create_index_concurrently("ix_transaction_history_search_tsv", "transaction_history", "USING gin (search_tsv)")
+    print("✅ Added search_tsv to transaction_history with GIN index")
+
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.commit()
+        create_index_concurrently(
+            "ix_transaction_history_merchant_trgm", "transaction_history", "USING gin (lower(merchant) gin_trgm_ops)"
+        )
+        print("✅ Enabled pg_trgm and added trigram index on merchant")
+    except Exception as e:
+        print(f"⚠️  pg_trgm not available ({e.__class__.__name__}); merchant matching falls back to prefix search")
+
+    print("✅ Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,131 @@
+"""
+Migration script for the embedding storage settings
+- Converts the embedding columns of transaction_history, user_memories and
+  semantic_answer_cache to EMBEDDING_DIMENSIONS / EMBEDDING_STORAGE
+  (app/utils/vectors.py), e.g. vector(1536) -> halfvec(512)
+- Drops and recreates the vector indexes on those columns with the
+  matching operator class (vector_cosine_ops <-> halfvec_cosine_ops)
+
+No re-embedding: text-embedding-3 vectors keep their meaning when cut to
+their first N dimensions. Truncated rows are not unit length, which cosine
+distance (<=>, the only operator the app uses) ignores. Their
+embedding_model is retagged to the new width in the same transaction
+("openai:text-embedding-3-small:1536" -> ":512"), so they keep matching the
+app's embedding_model_id(); rows of other backends keep their tag and drop
+out of searches, since cut vectors no longer match their model.
+Dimensions can only go down; going back up needs the texts re-embedded.
+halfvec needs pgvector >= 0.7 (ALTER EXTENSION vector UPDATE).
+
+Each table is rewritten under an exclusive lock: run it in a quiet window.
+
+Usage:
+    EMBEDDING_DIMENSIONS=512 EMBEDDING_STORAGE=halfvec python migrate_embedding_storage.py [--dry-run]
+"""
+import argparse
+import re
+import time
+from sqlalchemy import text
+from app.db.database import engine
+from app.utils.vectors import EMBEDDING_DIMENSIONS, EMBEDDING_STORAGE
+
+TABLES = ["transaction_history", "user_memories", "semantic_answer_cache"]
+
+_OPCLASS = re.compile(r"\b(vector|halfvec)_(l2|ip|cosine|l1)_ops\b")
+
+# Models whose first N dimensions are their N-dimension embedding (Matryoshka)
+_TRUNCATABLE_MODELS = r"^openai:text-embedding-3-[^:]+:[0-9]+$"
+
+
+def pgvector_version(conn) -> tuple:
+    version = conn.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+    return tuple(int(part) for part in version.split(".")) if version else (0,)
+
+
+def column_type(conn, table: str) -> tuple:
+    """('vector', 1536) for an embedding column declared vector(1536)."""
+    declared = conn.execute(text("""
+        SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+        WHERE attrelid = to_regclass(:table) AND attname = 'embedding' AND NOT attisdropped
+    """), {"table": table}).scalar()
+    storage, dims = re.match(r"(\w+)\((\d+)\)", declared).groups()
+    return storage, int(dims)
+
+
+def embedding_indexes(conn, table: str) -> list:
+    return conn.execute(text("""
+        SELECT indexname, indexdef FROM pg_indexes
+        WHERE tablename = :table AND indexdef ~ '\\(embedding '
+    """), {"table": table}).fetchall()
+
+
+def convert_table(conn, table: str, dims: int, storage: str) -> bool:
+    """Converts one table's embedding column in the caller's transaction. False if already converted."""
+    current_storage, current_dims = column_type(conn, table)
+    if (current_storage, current_dims) == (storage, dims):
+        return False
+    if dims > current_dims:
+        raise SystemExit(f"❌ {table}.embedding has {current_dims} dimensions, cannot widen to {dims} "
+                         f"without re-embedding")
+
+    indexes = embedding_indexes(conn, table)
+    for index in indexes:
+        conn.execute(text(f'DROP INDEX "{index.indexname}"'))
+    conn.execute(text(f"""
+        ALTER TABLE {table} ALTER COLUMN embedding TYPE {storage}({dims})
+        USING ((embedding::real[])[1:{dims}])::{storage}({dims})
+    """))
+    for index in indexes:
+        conn.execute(text(_OPCLASS.sub(lambda m: f"{storage}_{m.group(2)}_ops", index.indexdef)))
+    if dims != current_dims and has_embedding_model(conn, table):
+        retagged = conn.execute(text(f"""
+            UPDATE {table} SET embedding_model = regexp_replace(embedding_model, '[0-9]+$', :dims)
+            WHERE embedding_model ~ :truncatable
+        """), {"dims": str(dims), "truncatable": _TRUNCATABLE_MODELS}).rowcount
+        print(f"   {table}: {retagged} rows retagged to {dims} dimensions")
+    return True
+
+
+def has_embedding_model(conn, table: str) -> bool:
+    return bool(conn.execute(text("""
+        SELECT 1 FROM information_schema.columns WHERE table_name = :table AND column_name = 'embedding_model'
+    """), {"table": table}).scalar())
+
+
+def table_size(conn, table: str) -> int:
+    return conn.execute(text("SELECT pg_total_relation_size(to_regclass(:table))"), {"table": table}).scalar()
+
+
+def migrate(dims: int = EMBEDDING_DIMENSIONS, storage: str = EMBEDDING_STORAGE, dry_run: bool = False):
+    with engine.connect() as conn:
+        if storage == "halfvec" and pgvector_version(conn) < (0, 7):
+            raise SystemExit("❌ halfvec needs pgvector >= 0.7; run ALTER EXTENSION vector UPDATE first")
+        for table in TABLES:
+            current_storage, current_dims = column_type(conn, table)
+            print(f"   {table}: {current_storage}({current_dims}) -> {storage}({dims})")
+    if dry_run:
+        return
+
+    for table in TABLES:
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            size_before = table_size(conn, table)
+            if not convert_table(conn, table, dims, storage):
+                print(f"✅ {table} already stores {storage}({dims})")
+                continue
+        with engine.connect() as conn:
+            size_after = table_size(conn, table)
+        print(f"✅ {table}: {size_before / 2**20:.1f} MB -> {size_after / 2**20:.1f} MB "
+              f"in {time.perf_counter() - start:.1f}s")
+
+    print("✅ Migration completed successfully!")
+    print(f"✅ Embedding columns store {storage}({dims}); run the app with the same "
+          f"EMBEDDING_DIMENSIONS / EMBEDDING_STORAGE")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the embedding columns to the configured storage")
+    parser.add_argument("--dimensions", type=int, default=EMBEDDING_DIMENSIONS)
+    parser.add_argument("--storage", choices=["vector", "halfvec"], default=EMBEDDING_STORAGE)
+    parser.add_argument("--dry-run", action="store_true", help="Only print the planned conversions")
+    args = parser.parse_args()
+    migrate(args.dimensions, args.storage, args.dry_run)
@@ -0,0 +1,115 @@
+"""
+Migration script for SQL-side card rule queries
+- Converts reward_rules, milestone_benefits, eligibility_criteria,
+  excluded_categories and key_benefits of credit_cards from JSON to JSONB
+  (one table rewrite; credit_cards is locked while it runs)
+- Adds generated (STORED) text[] columns, kept in sync by Postgres:
+    reward_merchants           lowercased merchants of every reward rule
+    reward_merchant_substrings every substring of those
+    excluded_terms             lowercased excluded_categories
+  They are not mapped in CreditCardModel, so loading cards never reads them
+- GIN indexes (built CONCURRENTLY) on reward_merchants (a rule merchant
+  inside the searched text) and reward_merchant_substrings (the searched
+  text inside a rule merchant), used by
+  card_repository.find_cards_for_merchant; neither needs pg_trgm.
+  No request path calls it yet (see its docstring), so today only
+  benchmark_card_rule_queries.py uses the indexes; the JSONB conversion
+  is what every card read and write goes through
+  excluded_terms is not indexed: it is only checked as NOT (... && ...)
+  on the candidates those indexes return, which GIN cannot answer
+Run this once to update your database schema
+"""
+from sqlalchemy import text
+from app.db.database import engine
+from app.db.migrations import create_index_concurrently, timed
+
+JSONB_COLUMNS = ["reward_rules", "milestone_benefits", "eligibility_criteria", "excluded_categories", "key_benefits"]
+GENERATED_COLUMNS = {
+    "reward_merchants": "card_reward_merchants(reward_rules)",
+    "reward_merchant_substrings": "card_reward_merchant_substrings(reward_rules)",
+    "excluded_terms": "card_excluded_terms(excluded_categories)",
+}
+
+FUNCTIONS = """
+    CREATE OR REPLACE FUNCTION card_reward_merchants(rules jsonb) RETURNS text[]
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT coalesce(array_agg(DISTINCT lower(m)), '{}')
+        FROM jsonb_array_elements(CASE WHEN jsonb_typeof(rules) = 'array' THEN rules ELSE '[]' END) r,
+             jsonb_array_elements_text(
+                 CASE WHEN jsonb_typeof(r->'merchants') = 'array' THEN r->'merchants' ELSE '[]' END
+             ) m
+    $$;
+
+    CREATE OR REPLACE FUNCTION card_reward_merchant_substrings(rules jsonb) RETURNS text[]
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT coalesce(array_agg(DISTINCT substr(m, start, len)), '{}')
+        FROM unnest(card_reward_merchants(rules)) m,
+             generate_series(1, length(m)) start,
+             generate_series(1, length(m) - start + 1) len
+    $$;
+
+    CREATE OR REPLACE FUNCTION card_excluded_terms(terms jsonb) RETURNS text[]
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT coalesce(array_agg(DISTINCT lower(t)), '{}')
+        FROM jsonb_array_elements_text(CASE WHEN jsonb_typeof(terms) = 'array' THEN terms ELSE '[]' END) t
+    $$;
+"""
+
+
+def convert_columns():
+    with engine.begin() as conn:
+        types = dict(conn.execute(text("""
+            SELECT column_name, data_type FROM information_schema.columns
+            WHERE table_name = 'credit_cards' AND column_name = ANY(:columns)
+        """), {"columns": JSONB_COLUMNS}).all())
+        pending = [column for column in JSONB_COLUMNS if types.get(column) == "json"]
+        if not pending:
+            print("✅ credit_cards JSON columns are already JSONB")
+            return
+        with timed(f"convert {', '.join(pending)} to JSONB"):
+            conn.execute(text("ALTER TABLE credit_cards " + ", ".join(
+                f"ALTER COLUMN {column} TYPE jsonb USING {column}::jsonb" for column in pending
+            )))
+    print(f"✅ Converted {', '.join(pending)} to JSONB")
+
+
+def add_generated_columns():
+    with engine.begin() as conn:
+        conn.execute(text(FUNCTIONS))
+        existing = set(conn.execute(text("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = 'credit_cards' AND column_name = ANY(:columns)
+        """), {"columns": list(GENERATED_COLUMNS)}).scalars())
+        pending = [column for column in GENERATED_COLUMNS if column not in existing]
+        if not pending:
+            print("✅ credit_cards already has the generated rule columns")
+            return
+        with timed(f"add {', '.join(pending)}"):
+            conn.execute(text("ALTER TABLE credit_cards " + ", ".join(
+                f"ADD COLUMN {column} text[] GENERATED ALWAYS AS ({GENERATED_COLUMNS[column]}) STORED"
+                for column in pending
+            )))
+    print(f"✅ Added {', '.join(pending)} to credit_cards")
+
+
+def migrate():
+    convert_columns()
+    add_generated_columns()
+
+    # fastupdate off: cards are read far more often than written, and a
+    # pending list makes every lookup scan the recently added cards
+    create_index_concurrently(
+        "ix_credit_cards_reward_merchants", "credit_cards", "USING gin (reward_merchants) WITH (fastupdate = off)"
+    )
+    create_index_concurrently(
+        "ix_credit_cards_reward_merchant_substrings", "credit_cards",
+        "USING gin (reward_merchant_substrings) WITH (fastupdate = off)"
+    )
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE credit_cards"))
+
+    print("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,75 @@
+"""
+Migration script for ingest-time normalization of card terms
+- Adds annual_fee_inr, fee_waiver_spend_inr and normalized_version to credit_cards
+- Backfills them, and the numeric keys of every reward rule, for existing cards
+
+The backfill runs in batches and commits after each one. Rows are picked by
+normalized_version, so an interrupted run resumes where it stopped, and a
+bump of NORMALIZATION_VERSION re-normalizes everything.
+
+Usage:
+    python migrate_normalize_card_rules.py [--batch-size 200]
+"""
+import argparse
+from sqlalchemy import or_, text
+from app.db.database import engine, SessionLocal
+from app.db.models import CreditCardModel
+from app.db.card_repository import normalize_card_row
+from app.utils.reward_rules import NORMALIZATION_VERSION
+from app.services.cache_bus import publish
+
+def add_columns():
+    with engine.connect() as conn:
+        conn.execute(text("""
+            ALTER TABLE credit_cards ADD COLUMN IF NOT EXISTS annual_fee_inr DOUBLE PRECISION;
+            ALTER TABLE credit_cards ADD COLUMN IF NOT EXISTS fee_waiver_spend_inr DOUBLE PRECISION;
+            ALTER TABLE credit_cards ADD COLUMN IF NOT EXISTS normalized_version INTEGER;
+        """))
+        conn.commit()
+
+def backfill(batch_size: int = 200):
+    done = 0
+    last_id = 0
+    while True:
+        with SessionLocal() as db:
+            rows = (
+                db.query(CreditCardModel)
+                .filter(CreditCardModel.id > last_id)
+                .filter(or_(
+                    CreditCardModel.normalized_version.is_(None),
+                    CreditCardModel.normalized_version < NORMALIZATION_VERSION
+                ))
+                .order_by(CreditCardModel.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if not rows:
+                break
+
+            for row in rows:
+                normalize_card_row(row)
+            # Running API workers drop their cached cards for these users
+            for user_id in {row.user_id for row in rows}:
+                publish(f"cards:{user_id}", db)
+            db.commit()
+
+            done += len(rows)
+            last_id = rows[-1].id
+            print(f"   normalized {done} cards (last id {last_id})")
+
+    return done
+
+def migrate(batch_size: int = 200):
+    add_columns()
+    done = backfill(batch_size)
+
+    print("✅ Migration completed successfully!")
+    print("✅ Added annual_fee_inr, fee_waiver_spend_inr and normalized_version to credit_cards")
+    print(f"✅ Normalized {done} cards to version {NORMALIZATION_VERSION}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normalize stored card terms")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+    migrate(args.batch_size)
@@ -1,95 +1,265 @@
-import sqlite3
-import psycopg2
+"""
+Migration script for legacy SQLite card exports (cards.db) into Postgres
+- Streams credit_cards from SQLite in id order, --chunk-size rows at a time
+  (never the whole table in memory)
+- Validates every row against the CreditCard schema and parses its numbers
+  (reward rules, fees) in a pool of --workers processes; rows that fail are
+  skipped and listed (--rejects writes them to a JSONL file)
+- Writes each chunk with one execute_values upsert on (user_id, card_key),
+  so re-running or resuming never duplicates a card
+- Checkpoints the last SQLite id in sqlite_migration_checkpoints in the same
+  transaction as the chunk: after a failure, running the same command again
+  resumes where it stopped (--restart starts over)
+- Prints progress and rows per second
+
+The legacy export has no users: cards are stored for --user-id.
+Connection settings come from DATABASE_URL / DB_* like the app.
+
+Usage:
+    python migrate_sqlite_to_postgres.py [--sqlite cards.db] [--user-id default_user]
+                                         [--chunk-size 1000] [--workers N] [--rejects PATH] [--restart]
+"""
+import argparse
 import json
+import multiprocessing
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+JSON_FIELDS = ["reward_rules", "milestone_benefits", "eligibility_criteria", "excluded_categories", "key_benefits"]
+LIST_FIELDS = {"reward_rules", "milestone_benefits", "excluded_categories", "key_benefits"}
+COLUMNS = [
+    "user_id", "card_key", "card_name", "issuer", "card_type", "annual_fee", "annual_fee_inr",
+    "fee_waiver_condition", "fee_waiver_spend_inr", "welcome_bonus", "liability_policy", "reward_program_name",
+    "reward_rules", "milestone_benefits", "eligibility_criteria", "excluded_categories", "key_benefits",
+    "normalized_version"
+]
+
+
+def prepare_chunk(rows: list) -> tuple:
+    """
+    Validates one chunk of SQLite rows (runs in a worker process).
+
+    Returns:
+        (cards, rejects): column dicts (without user_id / card_key) of the
+        valid rows, and (id, card_name, error) of the others.
+    """
+    from app.schemas.credit_card import CreditCard
+    from app.utils.reward_rules import NORMALIZATION_VERSION, normalize_rule, parse_fee, parse_fee_waiver_spend
+
+    cards, rejects = [], []
+    for row in rows:
+        try:
+            data = dict(row)
+            for field in JSON_FIELDS:
+                if isinstance(data.get(field), str):
+                    data[field] = json.loads(data[field])
+                # Missing lists read back as empty (see card_repository.to_credit_card)
+                if data.get(field) is None and field in LIST_FIELDS:
+                    data[field] = []
+            card = CreditCard.model_validate(data)
+        except Exception as e:
+            rejects.append((row["id"], row["card_name"], " ".join(str(e).split())[:300]))
+            continue
+        cards.append({
+            "card_name": card.card_name,
+            "issuer": card.issuer,
+            "card_type": card.card_type,
+            "annual_fee": card.annual_fee,
+            "annual_fee_inr": parse_fee(card.annual_fee),
+            "fee_waiver_condition": card.fee_waiver_condition,
+            "fee_waiver_spend_inr": parse_fee_waiver_spend(card.fee_waiver_condition),
+            "welcome_bonus": card.welcome_bonus,
+            "liability_policy": card.liability_policy,
+            "reward_program_name": card.reward_program_name,
+            "reward_rules": json.dumps([normalize_rule(r.model_dump()) for r in card.reward_rules]),
+            "milestone_benefits": json.dumps([m.model_dump() for m in card.milestone_benefits]),
+            "eligibility_criteria": json.dumps(card.eligibility_criteria.model_dump())
+            if card.eligibility_criteria else None,
+            "excluded_categories": json.dumps(card.excluded_categories),
+            "key_benefits": json.dumps(card.key_benefits),
+            "normalized_version": NORMALIZATION_VERSION,
+        })
+    return cards, rejects
+
+
+def read_chunks(sqlite_path: str, after_id: int, chunk_size: int):
+    """Yields (last_id, rows) chunks of credit_cards with id > after_id, in id order."""
+    conn = sqlite3.connect(sqlite_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        while True:
+            rows = conn.execute(
+                "SELECT * FROM credit_cards WHERE id > ? ORDER BY id LIMIT ?", (after_id, chunk_size)
+            ).fetchall()
+            if not rows:
+                return
+            after_id = rows[-1]["id"]
+            # Plain dicts: sqlite3.Row does not pickle to the workers
+            yield after_id, [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def count_remaining(sqlite_path: str, after_id: int) -> int:
+    conn = sqlite3.connect(sqlite_path)
+    try:
+        return conn.execute("SELECT count(*) FROM credit_cards WHERE id > ?", (after_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def prepared_chunks(chunks, workers: int):
+    """
+    prepare_chunk over chunks, in order. With several workers, up to two
+    chunks per worker are validated ahead of the one being written.
+    """
+    if workers <= 1:
+        for last_id, rows in chunks:
+            yield last_id, len(rows), prepare_chunk(rows)
+        return
 
-# Connect SQLite
-sqlite_conn = sqlite3.connect("cards.db")
-sqlite_cursor = sqlite_conn.cursor()
-
-# Connect Postgres
-pg_conn = psycopg2.connect(
-    dbname="credit_card_ai",
-    user="jatinverma",
-    password="1234",
-    host="localhost",
-    port="5432"
-)
-
-pg_cursor = pg_conn.cursor()
-
-# ---- Create Table (Run Once) ----
-pg_cursor.execute("""
-CREATE TABLE IF NOT EXISTS credit_cards (
-    id SERIAL PRIMARY KEY,
-    card_name TEXT UNIQUE,
-    issuer TEXT,
-    card_type TEXT,
-    annual_fee TEXT,
-    fee_waiver_condition TEXT,
-    welcome_bonus TEXT,
-    reward_program_name TEXT,
-    reward_rules JSONB,
-    milestone_benefits JSONB,
-    eligibility_criteria JSONB,
-    excluded_categories JSONB,
-    key_benefits JSONB,
-    liability_policy TEXT
-);
-""")
-
-pg_conn.commit()
-
-# ---- Fetch SQLite Data ----
-sqlite_cursor.execute("SELECT * FROM credit_cards")
-rows = sqlite_cursor.fetchall()
-
-columns = [desc[0] for desc in sqlite_cursor.description]
-
-for row in rows:
-    data = dict(zip(columns, row))
-
-    # Convert JSON strings safely
-    for field in [
-        "reward_rules",
-        "milestone_benefits",
-        "eligibility_criteria",
-        "excluded_categories",
-        "key_benefits"
-    ]:
-        if data.get(field):
-            if isinstance(data[field], str):
-                data[field] = json.loads(data[field])
-
-    pg_cursor.execute("""
-        INSERT INTO credit_cards (
-            card_name, issuer, card_type, annual_fee,
-            fee_waiver_condition, welcome_bonus,
-            reward_program_name, reward_rules,
-            milestone_benefits, eligibility_criteria,
-            excluded_categories, key_benefits,
-            liability_policy
+    # spawn: forking a process with open connections is unsafe
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = deque()
+        for last_id, rows in chunks:
+            pending.append((last_id, len(rows), pool.submit(prepare_chunk, rows)))
+            if len(pending) >= workers * 2:
+                last_id, count, future = pending.popleft()
+                yield last_id, count, future.result()
+        while pending:
+            last_id, count, future = pending.popleft()
+            yield last_id, count, future.result()
+
+
+def ensure_checkpoint_table(conn):
+    from sqlalchemy import text
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS sqlite_migration_checkpoints (
+            source TEXT PRIMARY KEY,
+            last_id BIGINT NOT NULL,
+            rows_written BIGINT NOT NULL DEFAULT 0,
+            rows_rejected BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
         )
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (card_name) DO NOTHING;
-    """, (
-        data["card_name"],
-        data["issuer"],
-        data["card_type"],
-        data["annual_fee"],
-        data["fee_waiver_condition"],
-        data["welcome_bonus"],
-        data["reward_program_name"],
-        json.dumps(data["reward_rules"]),
-        json.dumps(data["milestone_benefits"]),
-        json.dumps(data["eligibility_criteria"]),
-        json.dumps(data["excluded_categories"]),
-        json.dumps(data["key_benefits"]),
-        data["liability_policy"]
-    ))
-
-pg_conn.commit()
-
-print("✅ Migration Completed Successfully!")
-
-sqlite_conn.close()
-pg_conn.close()
+    """))
+
+
+def write_chunk(raw, source: str, user_id: str, last_id: int, cards: list, rejected: int):
+    """Upserts one chunk of cards and advances the checkpoint, in one transaction."""
+    from psycopg2.extras import execute_values
+    from app.db.card_repository import card_key
+
+    # A card seen twice in the chunk would hit the same row twice in one
+    # upsert (not allowed): the later row wins, as it would across chunks
+    by_key = {}
+    for card in cards:
+        by_key[card_key(card["issuer"], card["card_name"])] = card
+    values = [
+        tuple([user_id, key] + [card[column] for column in COLUMNS[2:]])
+        for key, card in by_key.items()
+    ]
+
+    cursor = raw.cursor()
+    try:
+        if values:
+            updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in COLUMNS[2:])
+            execute_values(
+                cursor,
+                f"INSERT INTO credit_cards ({', '.join(COLUMNS)}) VALUES %s "
+                f"ON CONFLICT (user_id, card_key) DO UPDATE SET {updates}",
+                values,
+                page_size=len(values)
+            )
+        cursor.execute("""
+            INSERT INTO sqlite_migration_checkpoints (source, last_id, rows_written, rows_rejected)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (source) DO UPDATE SET
+                last_id = EXCLUDED.last_id,
+                rows_written = sqlite_migration_checkpoints.rows_written + EXCLUDED.rows_written,
+                rows_rejected = sqlite_migration_checkpoints.rows_rejected + EXCLUDED.rows_rejected,
+                updated_at = now()
+        """, (source, last_id, len(cards), rejected))
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def migrate(sqlite_path: str = "cards.db", user_id: str = "default_user", chunk_size: int = 1000,
+            workers: int = None, rejects_path: str = None, restart: bool = False):
+    from sqlalchemy import text
+    from app.db.database import engine
+    from app.services.cache_bus import publish
+    from app.services.resource_versions import bump_now
+
+    if not os.path.exists(sqlite_path):
+        raise FileNotFoundError(f"SQLite database not found: {sqlite_path}")
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    source = f"{os.path.abspath(sqlite_path)}#{user_id}"
+
+    with engine.begin() as conn:
+        ensure_checkpoint_table(conn)
+        if restart:
+            conn.execute(text("DELETE FROM sqlite_migration_checkpoints WHERE source = :source"), {"source": source})
+        checkpoint = conn.execute(text("""
+            SELECT last_id, rows_written, rows_rejected FROM sqlite_migration_checkpoints WHERE source = :source
+        """), {"source": source}).first()
+
+    last_id, written, rejected = checkpoint if checkpoint else (0, 0, 0)
+    remaining = count_remaining(sqlite_path, last_id)
+    if checkpoint:
+        print(f"↻ Resuming after SQLite id {last_id} ({written} cards already written)")
+    print(f"📦 {remaining} rows to migrate from {sqlite_path} for user '{user_id}' "
+          f"(chunks of {chunk_size}, {workers} worker(s))")
+
+    rejects_file = open(rejects_path, "a", encoding="utf-8") if rejects_path else None
+    raw = engine.raw_connection()
+    # Card names carry symbols like ™; don't depend on the server's default
+    raw.set_client_encoding("UTF8")
+    done = 0
+    start = time.perf_counter()
+    try:
+        for last_id, count, (cards, chunk_rejects) in prepared_chunks(
+                read_chunks(sqlite_path, last_id, chunk_size), workers):
+            write_chunk(raw, source, user_id, last_id, cards, len(chunk_rejects))
+            for row_id, card_name, error in chunk_rejects:
+                if rejects_file:
+                    rejects_file.write(json.dumps({"id": row_id, "card_name": card_name, "error": error}) + "\n")
+                else:
+                    print(f"   ⚠️ Skipped id {row_id} ({card_name!r}): {error}")
+            done += count
+            written += len(cards)
+            rejected += len(chunk_rejects)
+            elapsed = time.perf_counter() - start
+            print(f"   {done}/{remaining} rows ({done / remaining:.0%})  written {written}  rejected {rejected}  "
+                  f"{done / elapsed:.0f} rows/s")
+    finally:
+        raw.close()
+        if rejects_file:
+            rejects_file.close()
+
+    # Running workers drop their cached copy of the user's cards, clients their ETag
+    bump_now(f"cards:{user_id}")
+    publish(f"cards:{user_id}")
+    elapsed = time.perf_counter() - start
+    print(f"✅ Migration completed successfully! {done} rows in {elapsed:.1f}s "
+          f"({done / elapsed if elapsed else 0:.0f} rows/s)")
+    print(f"✅ {written} cards stored for '{user_id}', {rejected} rows rejected"
+          + (f" (see {rejects_path})" if rejected and rejects_path else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a legacy SQLite cards.db into Postgres (resumable)")
+    parser.add_argument("--sqlite", default="cards.db", help="Path of the SQLite export")
+    parser.add_argument("--user-id", default="default_user", help="User the legacy cards are stored for")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Rows read, validated and written at a time")
+    parser.add_argument("--workers", type=int, default=None, help="Validation processes (default: CPU count)")
+    parser.add_argument("--rejects", default=None, help="Append rows that fail validation to this JSONL file")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the first row")
+    args = parser.parse_args()
+    migrate(args.sqlite, args.user_id, args.chunk_size, args.workers, args.rejects, args.restart)
@@ -0,0 +1,27 @@
+"""
+Batch job: rebuild the daily/monthly spend rollups from transaction_history
+
+The rollups are maintained incrementally on every insert; run this to
+repair them or after bulk-loading transactions outside the app.
+
+Usage:
+    python rebuild_spend_rollups.py              # all users
+    python rebuild_spend_rollups.py --user-id u1 # one user
+"""
+import argparse
+import time
+from app.db.database import SessionLocal
+from app.services.spend_service import rebuild_spend_rollups
+
+def rebuild(user_id: str = None):
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        rebuild_spend_rollups(db, user_id=user_id)
+        db.commit()
+    print(f"✅ Rebuilt spend rollups for {user_id or 'all users'} in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild spend rollups")
+    parser.add_argument("--user-id", help="Only rebuild this user's rollups")
+    args = parser.parse_args()
+    rebuild(args.user_id)
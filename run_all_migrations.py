@@ -1,45 +1,81 @@
 """
-Run all migrations in the correct order
+Run all pending migrations in version order (see app/db/migrations.py)
+
+schema_migrations records each applied version with its duration, so this
+is safe to run on every deploy. A database migrated by hand with the
+individual scripts can be marked as up to date with --baseline.
+
+Usage:
+    python run_all_migrations.py [--list] [--dry-run] [--to VERSION] [--baseline]
+                                 [--batch-size N] [--pause-ms MS]
 """
+import argparse
+import importlib
 import sys
 
-print("=" * 60)
-print("Running All Migrations")
-print("=" * 60)
-
-# Migration 1: Add users table
-print("\n[1/3] Running migrate_add_users.py...")
-try:
-    from migrate_add_users import migrate as migrate_users
-    migrate_users()
-except Exception as e:
-    print(f"❌ Migration 1 failed: {e}")
-    sys.exit(1)
-
-# Migration 2: Add user_id to credit_cards
-print("\n[2/3] Running migrate_add_user_to_cards.py...")
-try:
-    from migrate_add_user_to_cards import migrate as migrate_cards
-    migrate_cards()
-except Exception as e:
-    print(f"❌ Migration 2 failed: {e}")
-    sys.exit(1)
-
-# Migration 3: Add authentication table
-print("\n[3/3] Running migrate_add_auth.py...")
-try:
-    from migrate_add_auth import migrate as migrate_auth
-    migrate_auth()
-except Exception as e:
-    print(f"❌ Migration 3 failed: {e}")
-    sys.exit(1)
-
-print("\n" + "=" * 60)
-print("✅ All migrations completed successfully!")
-print("=" * 60)
-print("\nYou can now:")
-print("1. Test signup: POST /auth/signup")
-print("2. Test login: POST /auth/login")
-print("3. Use chat with authenticated users")
-print("\nServer is running at: http://127.0.0.1:8000")
-print("API docs at: http://127.0.0.1:8000/docs")
+from app.db import migrations
+
+
+def script(module: str):
+    """A migration that runs the migrate() of a root-level migration script"""
+    return lambda: importlib.import_module(module).migrate()
+
+
+MIGRATIONS = [
+    migrations.Migration("001", "add_users", script("migrate_add_users")),
+    migrations.Migration("002", "add_user_to_cards", script("migrate_add_user_to_cards")),
+    migrations.Migration("003", "add_auth", script("migrate_add_auth")),
+    migrations.Migration("004", "add_spend_ledger", script("migrate_add_spend_ledger")),
+    migrations.Migration("005", "add_spend_rollups", script("migrate_add_spend_rollups")),
+    migrations.Migration("006", "normalize_card_rules", script("migrate_normalize_card_rules")),
+    migrations.Migration("007", "add_card_key", script("migrate_add_card_key")),
+    migrations.Migration("008", "add_card_parse_cache", script("migrate_add_card_parse_cache")),
+    migrations.Migration("009", "add_semantic_cache", script("migrate_add_semantic_cache")),
+    migrations.Migration("010", "add_transaction_search", script("migrate_add_transaction_search")),
+    migrations.Migration("011", "add_memory_recency_indexes", script("migrate_add_memory_recency_indexes")),
+    migrations.Migration("012", "add_embedding_model", script("migrate_add_embedding_model")),
+    migrations.Migration("013", "jsonb_card_rules", script("migrate_jsonb_card_rules")),
+    migrations.Migration("014", "add_resource_versions", script("migrate_add_resource_versions")),
+]
+
+
+def list_migrations():
+    applied = migrations.applied_migrations()
+    print(f"{'version':8} {'name':30} {'applied at':26} {'duration':>9}")
+    for migration in MIGRATIONS:
+        if migration.version in applied:
+            _, applied_at, duration_ms = applied[migration.version]
+            duration = f"{duration_ms / 1000:8.2f}s" if duration_ms is not None else "baseline"
+            print(f"{migration.version:8} {migration.name:30} {applied_at:%Y-%m-%d %H:%M:%S %Z}{'':6} {duration:>9}")
+        else:
+            print(f"{migration.version:8} {migration.name:30} {'pending':26}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--list", action="store_true", help="Show applied and pending migrations")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the pending migrations")
+    parser.add_argument("--to", default=None, help="Stop after this version")
+    parser.add_argument("--baseline", action="store_true",
+                        help="Record pending migrations as applied without running them")
+    parser.add_argument("--batch-size", type=int, default=None, help="Rows per backfill batch")
+    parser.add_argument("--pause-ms", type=float, default=None, help="Pause between backfill batches")
+    args = parser.parse_args()
+
+    if args.batch_size:
+        migrations.BACKFILL_BATCH_SIZE = args.batch_size
+    if args.pause_ms is not None:
+        migrations.BACKFILL_PAUSE_MS = args.pause_ms
+
+    if args.list:
+        list_migrations()
+        sys.exit(0)
+
+    print("=" * 60)
+    print("Running All Migrations")
+    print("=" * 60)
+    try:
+        migrations.run_migrations(MIGRATIONS, target=args.to, dry_run=args.dry_run, baseline=args.baseline)
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,86 @@
+"""
+Checks the cache bus: "*" (sent when the listener reconnects) reaches
+prefixed subscribers, a value read before an invalidation is not cached
+after it, invalidation tracking stays bounded, and a failed NOTIFY does
+not abort the writer's transaction.
+
+Usage:
+    python test_cache_bus.py
+"""
+from sqlalchemy import text
+
+from app.db import card_repository
+from app.db.database import SessionLocal
+from app.services import cache_bus
+from app.services.cache_bus import KeyedCache
+
+
+def test_reconnect_clears_prefixed_caches():
+    cache = KeyedCache("cachebustest:")
+    cache.set("u1", ["card"])
+    cache_bus._dispatch("*")
+    assert cache.get("u1") is None
+
+
+def test_invalidation_during_read_is_not_lost():
+    cache = KeyedCache("cachebustest:")
+    generation = cache.generation("u1")
+    # Published between the reader's DB query and its set()
+    cache_bus._dispatch("cachebustest:u1")
+    assert not cache.set("u1", ["stale card"], generation=generation)
+    assert cache.get("u1") is None
+
+    generation = cache.generation("u1")
+    cache_bus._dispatch("cachebustest:*")
+    assert not cache.set("u1", ["stale card"], generation=generation)
+
+    # Other keys are unaffected by a single-key invalidation
+    generation = cache.generation("u2")
+    cache_bus._dispatch("cachebustest:u1")
+    assert cache.set("u2", ["card"], generation=generation)
+    assert cache.get("u2") == ["card"]
+
+
+def test_user_cards_not_cached_over_concurrent_write():
+    user_id = "cachebustest_user"
+    get_user_cards = card_repository.get_user_cards
+
+    def racing_read(db, uid):
+        # A card write commits and is published while the rows are being read
+        cache_bus._dispatch(f"cards:{uid}")
+        return []
+
+    card_repository.get_user_cards = racing_read
+    try:
+        assert card_repository.get_user_credit_cards(None, user_id) == []
+    finally:
+        card_repository.get_user_cards = get_user_cards
+    assert card_repository._user_cards_cache.get(user_id) is None
+
+
+def test_invalidation_tracking_is_bounded():
+    cache = KeyedCache("cachebustest:", max_tracked=3)
+    generation = cache.generation("u0")
+    for i in range(10):
+        cache_bus._dispatch(f"cachebustest:u{i}")
+    assert len(cache._invalidated) == 3
+    # u0 was forgotten: a read that started before its invalidation is still not cached
+    assert not cache.set("u0", ["stale card"], generation=generation)
+    assert cache.set("u0", ["card"], generation=cache.generation("u0"))
+
+
+def test_failed_notify_keeps_writer_transaction():
+    with SessionLocal() as db:
+        # NOTIFY payloads are limited to 8000 bytes: this one fails in Postgres
+        publish_key = "cachebustest:" + "x" * 9000
+        cache_bus.publish(publish_key, db, local=False)
+        assert db.execute(text("SELECT 1")).scalar() == 1
+        db.commit()
+
+
+if __name__ == "__main__":
+    for test in (test_reconnect_clears_prefixed_caches, test_invalidation_during_read_is_not_lost,
+                 test_user_cards_not_cached_over_concurrent_write, test_invalidation_tracking_is_bounded,
+                 test_failed_notify_keeps_writer_transaction):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,66 @@
+"""
+Checks that EmbeddingBatcher never leaves a caller waiting on a failed
+batch: backend errors and short responses fail every caller, and a call
+with no answer times out.
+
+Usage:
+    python test_embedding_batcher.py
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.embedding_batcher import EmbeddingBatcher
+
+
+def _embed_all(batcher: EmbeddingBatcher, texts: list) -> list:
+    """Each text embedded from its own thread; the result or the exception per text"""
+    def call(text):
+        try:
+            return batcher.embed(text)
+        except Exception as e:
+            return e
+    with ThreadPoolExecutor(len(texts)) as pool:
+        return list(pool.map(call, texts))
+
+
+def test_batch_returns_each_callers_vector():
+    batcher = EmbeddingBatcher(lambda texts: [[float(len(t))] for t in texts], max_wait_ms=20, timeout_seconds=5)
+    assert _embed_all(batcher, ["a", "bb", "ccc", "bb"]) == [[1.0], [2.0], [3.0], [2.0]]
+
+
+def test_short_response_fails_every_caller():
+    batcher = EmbeddingBatcher(lambda texts: [[0.0]] * (len(texts) - 1), max_wait_ms=20, timeout_seconds=5)
+    results = _embed_all(batcher, ["a", "b", "c"])
+    assert all(isinstance(r, ValueError) for r in results), results
+
+
+def test_backend_error_fails_every_caller():
+    def broken(texts):
+        raise RuntimeError("upstream down")
+    batcher = EmbeddingBatcher(broken, max_wait_ms=20, timeout_seconds=5)
+    results = _embed_all(batcher, ["a", "b"])
+    assert all(isinstance(r, RuntimeError) for r in results), results
+
+
+def test_call_times_out():
+    release = threading.Event()
+
+    def stuck(texts):
+        release.wait(5)
+        return [[0.0] for _ in texts]
+    batcher = EmbeddingBatcher(stuck, max_wait_ms=1, timeout_seconds=0.2)
+    try:
+        batcher.embed("a")
+    except TimeoutError:
+        pass
+    else:
+        raise AssertionError("embed() did not time out")
+    finally:
+        release.set()
+
+
+if __name__ == "__main__":
+    for test in (test_batch_returns_each_callers_vector, test_short_response_fails_every_caller,
+                 test_backend_error_fails_every_caller, test_call_times_out):
+        test()
+        print(f"✅ {test.__name__}")
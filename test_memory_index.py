@@ -0,0 +1,66 @@
+"""
+Checks the in-process memory index on users it holds no rows for: the
+first saved row is appended and found, and a row the index cannot take
+drops the entry instead of raising.
+
+The index loads from the real database (the test users have no rows).
+
+Usage:
+    python test_memory_index.py
+"""
+import time
+
+import numpy as np
+
+from app.services import memory_index as memory_index_module
+from app.services.memory_index import MemoryIndex
+from app.utils.vectors import EMBEDDING_DIMENSIONS
+
+ROW = (1, "I prefer cashback over points", "preference", None)
+
+
+def _vector(dims: int = EMBEDDING_DIMENSIONS) -> list:
+    vector = np.random.default_rng(7).normal(size=dims)
+    return list(vector / np.linalg.norm(vector))
+
+
+def _enabled(test):
+    def wrapper():
+        enabled = memory_index_module.MEMORY_INDEX_ENABLED
+        memory_index_module.MEMORY_INDEX_ENABLED = True
+        try:
+            test()
+        finally:
+            memory_index_module.MEMORY_INDEX_ENABLED = enabled
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+
+@_enabled
+def test_first_row_of_empty_user():
+    index = MemoryIndex()
+    user_id = "memindextest_empty_user"
+    assert index.search("memories", user_id, _vector(), 5, 0.5) == []
+
+    index.add("memories", user_id, ROW, _vector(), time.time())
+    hits = index.search("memories", user_id, _vector(), 5, 0.5)
+    assert [row for row, _, _ in hits] == [ROW]
+
+
+@_enabled
+def test_failed_append_drops_entry():
+    index = MemoryIndex()
+    user_id = "memindextest_bad_vector"
+    index.search("memories", user_id, _vector(), 5, 0.5)
+    index.add("memories", user_id, ROW, _vector(), time.time())
+
+    # Wrong width: must not raise, the entry reloads on the next search
+    index.add("memories", user_id, (2,) + ROW[1:], _vector(8), time.time())
+    assert ("memories", user_id) not in index._entries
+    assert index.report()["memory_mb"] == 0
+
+
+if __name__ == "__main__":
+    for test in (test_first_row_of_empty_user, test_failed_append_drops_entry):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,102 @@
+"""
+Checks that general_llm_node only shares answers that are safe to share:
+a cache miss on a thread's first question stores the answer, a miss in a
+thread with earlier turns does not (the answer saw those turns).
+
+The LLM, the embedding and the embedding model id are replaced by fakes
+(no OPENAI_API_KEY needed); the cache table is real.
+
+Usage:
+    python test_semantic_cache.py
+"""
+import random
+
+from langchain_core.messages import AIMessage, HumanMessage
+from sqlalchemy import text
+
+from app.db.database import engine
+from app.graph import nodes
+from app.services import semantic_cache
+from app.utils.vectors import EMBEDDING_DIMENSIONS
+
+QUESTION = "what is airport lounge access semcachetest"
+
+
+class FakeLLM:
+    model_name = "fake-llm"
+
+    def invoke(self, messages):
+        return AIMessage(content="Lounge access lets you wait in an airport lounge.")
+
+
+def _random_embedding():
+    vector = [random.gauss(0, 1) for _ in range(EMBEDDING_DIMENSIONS)]
+    norm = sum(v * v for v in vector) ** 0.5
+    return [v / norm for v in vector]
+
+
+def _cached_rows() -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT count(*) FROM semantic_answer_cache WHERE question = :q"),
+                            {"q": QUESTION}).scalar()
+
+
+def _cleanup():
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM semantic_answer_cache WHERE question = :q"), {"q": QUESTION})
+
+
+def _run(messages: list, **state):
+    nodes.general_llm_node({"messages": messages, "memory_context": "", **state},
+                           {"configurable": {"incognito": False}})
+
+
+def _with_fakes(test):
+    def wrapper():
+        get_llm, get_text_embedding = nodes.get_llm, nodes.get_text_embedding
+        embedding_model_id = semantic_cache.embedding_model_id
+        nodes.get_llm = lambda: FakeLLM()
+        # A fresh random vector per call: never close to a stored entry
+        nodes.get_text_embedding = lambda _: _random_embedding()
+        semantic_cache.embedding_model_id = lambda: f"fake:semcachetest:{EMBEDDING_DIMENSIONS}"
+        _cleanup()
+        try:
+            test()
+        finally:
+            nodes.get_llm, nodes.get_text_embedding = get_llm, get_text_embedding
+            semantic_cache.embedding_model_id = embedding_model_id
+            _cleanup()
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+
+@_with_fakes
+def test_first_question_is_cached():
+    _run([HumanMessage(content=QUESTION)])
+    assert _cached_rows() == 1
+
+
+@_with_fakes
+def test_miss_with_prior_history_is_not_cached():
+    _run([
+        HumanMessage(content="I earn 40 lakhs and fly to Dubai every month"),
+        AIMessage(content="Noted, you travel a lot."),
+        HumanMessage(content=QUESTION),
+    ])
+    assert _cached_rows() == 0
+
+
+@_with_fakes
+def test_reuses_query_embedding_from_memory_retrieval():
+    def no_embedding(_):
+        raise AssertionError("question embedded twice")
+    nodes.get_text_embedding = no_embedding
+    _run([HumanMessage(content=QUESTION)], query_embedding=_random_embedding())
+    assert _cached_rows() == 1
+
+
+if __name__ == "__main__":
+    for test in (test_first_question_is_cached, test_miss_with_prior_history_is_not_cached,
+                 test_reuses_query_embedding_from_memory_retrieval):
+        test()
+        print(f"✅ {test.__name__}")
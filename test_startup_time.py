@@ -0,0 +1,128 @@
+"""
+Startup regression test
+
+Guards the import time of the API and the cold start of the server:
+1. Importing app.graph.nodes / main must not load the provider SDKs
+   (openai, langchain_openai, Tavily) or numpy (memory index, card
+   catalog); they are loaded on first use.
+2. `python -X importtime -c "import main"` must stay under
+   STARTUP_IMPORT_BUDGET_S. Wall-clock time depends on the machine, so this
+   only runs when the variable is set.
+3. A fresh `uvicorn main:app` must answer GET /health with 200 within
+   STARTUP_COLD_START_BUDGET_S (default 30s; needs the database, skipped
+   when it is not reachable).
+
+Run with pytest, or directly for a report:
+    python test_startup_time.py
+"""
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_BUDGET_S = float(os.getenv("STARTUP_IMPORT_BUDGET_S", "0")) or None
+COLD_START_BUDGET_S = float(os.getenv("STARTUP_COLD_START_BUDGET_S", "30.0"))
+
+# Modules that must only be imported when first used
+LAZY_MODULES = ["openai", "langchain_openai", "langchain_community", "langchain_google_genai", "tavily",
+                "sqlite3", "numpy", "app.services.memory_index", "app.services.card_catalog"]
+
+
+def _run_python(*args) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, timeout=120)
+
+
+def loaded_lazy_modules(module: str) -> list:
+    """Which LAZY_MODULES a fresh interpreter has loaded after importing `module`."""
+    code = f"import sys, json, {module}; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    result = _run_python("-c", code)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def import_time_seconds(module: str = "main") -> float:
+    """Cumulative import time of `module` as reported by -X importtime."""
+    result = _run_python("-X", "importtime", "-c", f"import {module}")
+    assert result.returncode == 0, result.stderr
+    for line in reversed(result.stderr.splitlines()):
+        match = re.match(rf"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s+{re.escape(module)}$", line)
+        if match:
+            return int(match.group(1)) / 1_000_000
+    raise AssertionError(f"No importtime entry for {module}")
+
+
+def _database_reachable() -> bool:
+    result = _run_python("-c", "from sqlalchemy import text; from app.db.database import engine; "
+                               "engine.connect().execute(text('SELECT 1'))")
+    return result.returncode == 0
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def cold_start_seconds() -> float:
+    """Seconds from spawning uvicorn to the first 200 from /health."""
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < COLD_START_BUDGET_S * 4:
+            if server.poll() is not None:
+                raise AssertionError(f"Server exited with code {server.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.05)
+        raise AssertionError("Server did not answer /health in time")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def test_graph_import_does_not_build_clients():
+    assert loaded_lazy_modules("app.graph.nodes") == []
+
+
+def test_main_import_does_not_build_clients():
+    assert loaded_lazy_modules("main") == []
+
+
+def test_import_time_budget():
+    if IMPORT_BUDGET_S is None:
+        import pytest
+        pytest.skip("set STARTUP_IMPORT_BUDGET_S to check the import time")
+    seconds = import_time_seconds("main")
+    assert seconds < IMPORT_BUDGET_S, f"import main took {seconds:.2f}s (budget {IMPORT_BUDGET_S}s)"
+
+
+def test_cold_start_to_health():
+    if not _database_reachable():
+        import pytest
+        pytest.skip("database not reachable")
+    seconds = cold_start_seconds()
+    assert seconds < COLD_START_BUDGET_S, f"cold start took {seconds:.2f}s (budget {COLD_START_BUDGET_S}s)"
+
+
+if __name__ == "__main__":
+    print("🔍 Startup regression check")
+    print(f"   Lazy modules loaded by app.graph.nodes: {loaded_lazy_modules('app.graph.nodes')}")
+    print(f"   Lazy modules loaded by main:            {loaded_lazy_modules('main')}")
+    print(f"   import main:          {import_time_seconds('main'):.2f}s (budget {IMPORT_BUDGET_S or 'not set'})")
+    if _database_reachable():
+        print(f"   Cold start to /health: {cold_start_seconds():.2f}s (budget {COLD_START_BUDGET_S}s)")
+    else:
+        print("   Cold start to /health: skipped (database not reachable)")
@@ -0,0 +1,99 @@
+"""
+Checks statement imports against what the user already has: importing a
+file twice adds nothing the second time (identical rows within one file are
+still kept), and caps start from the spend already on the reward ledger.
+
+Usage:
+    python test_statement_import.py
+"""
+from datetime import date
+
+from sqlalchemy import text
+
+from app.db.database import SessionLocal
+from app.schemas.credit_card import CreditCard, RewardRule
+from app.services.statement_service import import_statement
+from app.utils.transaction_parser import LocalTransactionParser
+
+USER_ID = "statementtest_user"
+
+CARDS = [
+    CreditCard(
+        card_name="Swiggy HDFC", issuer="HDFC", card_type="Visa", annual_fee="500",
+        fee_waiver_condition=None, welcome_bonus=None, reward_program_name=None,
+        reward_rules=[
+            RewardRule(category="Swiggy", multiplier="10%", merchants=["Swiggy"], cap="Rs. 1500 cashback", period="Month"),
+            RewardRule(category="Others", multiplier="1%", merchants=["All"]),
+        ],
+        eligibility_criteria=None, excluded_categories=[], key_benefits=[]
+    ),
+]
+
+
+def _statement(*rows) -> list:
+    day = date.today().strftime("%d/%m/%Y")
+    return ["Date,Narration,Withdrawal Amt.,Deposit Amt.\n"] + [f"{day},{desc},{amount},\n" for desc, amount in rows]
+
+
+def _import(lines, persist=True) -> list:
+    return list(import_statement(USER_ID, lines, CARDS, LocalTransactionParser(), statement_card="Swiggy HDFC",
+                                 persist=persist, embed=False))
+
+
+def _cleanup():
+    with SessionLocal() as db:
+        for table in ("transaction_history", "spend_daily_rollups", "spend_monthly_rollups", "reward_spend_ledger"):
+            db.execute(text(f"DELETE FROM {table} WHERE user_id = :u"), {"u": USER_ID})
+        db.commit()
+
+
+def _history() -> tuple:
+    with SessionLocal() as db:
+        count = db.execute(text("SELECT count(*) FROM transaction_history WHERE user_id = :u"), {"u": USER_ID}).scalar()
+        rollup = db.execute(text("SELECT coalesce(sum(total_amount), 0) FROM spend_monthly_rollups WHERE user_id = :u"),
+                            {"u": USER_ID}).scalar()
+    return count, rollup
+
+
+def _with_cleanup(test):
+    def run():
+        _cleanup()
+        try:
+            test()
+        finally:
+            _cleanup()
+    run.__name__ = test.__name__
+    return run
+
+
+@_with_cleanup
+def test_reimport_adds_nothing():
+    lines = _statement(("UPI/SWIGGY/1", "400.00"), ("UPI/SWIGGY/1", "400.00"), ("NETFLIX.COM", "649.00"))
+    first = _import(lines)[-1]
+    assert first["imported"] == 3 and first["duplicates"] == 0
+    before = _history()
+    assert before == (3, 1449.0)
+
+    second = _import(lines)[-1]
+    assert second["imported"] == 0 and second["duplicates"] == 3
+    assert _history() == before
+
+    # An overlapping statement only adds its new rows
+    third = _import(_statement(("UPI/SWIGGY/1", "400.00"), ("UPI/SWIGGY/1", "400.00"), ("UPI/SWIGGY/1", "400.00")))
+    assert third[-1]["imported"] == 1
+    assert _history() == (4, 1849.0)
+
+
+@_with_cleanup
+def test_caps_start_from_the_ledger():
+    # Uses up this month's Rs. 1500 Swiggy cashback (Rs. 15,000 at 10%)
+    _import(_statement(("UPI/SWIGGY/2", "15000.00")))
+    row = next(e for e in _import(_statement(("UPI/SWIGGY/3", "1000.00")), persist=False) if e["type"] == "row")
+    assert row["merchant"] == "Swiggy"
+    assert row["used_points"] < 100
+
+
+if __name__ == "__main__":
+    for test in (test_reimport_adds_nothing, test_caps_start_from_the_ledger):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,58 @@
+"""
+Checks the local transaction pre-parser: amounts it must resolve,
+numbers it must leave to the LLM (model numbers, counts), and which
+messages report spend to be recorded.
+
+Usage:
+    python test_transaction_parser.py
+"""
+from app.utils.transaction_parser import LocalTransactionParser, parse_amount, reports_spend
+
+parser = LocalTransactionParser()
+
+
+def test_currency_and_units_resolve():
+    assert parse_amount("₹499 Netflix") == 499
+    assert parse_amount("uber ride to airport 650rs") == 650
+    assert parse_amount("2k on Swiggy") == 2000
+    assert parse_amount("1.5L hotel booking on goibibo") == 150000
+    assert parse_amount("2 lakh on MakeMyTrip") == 200000
+    assert parse_amount("1 lac for rent") == 100000
+
+
+def test_bare_l_is_not_lakh():
+    # Litres, not ₹2,00,000
+    assert parse_amount("2l milk") is None
+    assert parse_amount("bought 2l milk for 120 on blinkit") == 120
+
+
+def test_bare_number_needs_an_amount_cue():
+    assert parse_amount("paid 5000 on amazon") == 5000
+    assert parse_amount("5000 on Amazon") == 5000
+    assert parse_amount("nykaa 2200") is None
+
+
+def test_model_number_is_not_an_amount():
+    result = parser.parse("buying iPhone 15 on amazon")
+    assert result.amount is None
+    assert result.merchant == "Amazon"
+    # Incomplete: transaction_parser_node falls back to the LLM and price search
+    assert not result.is_complete
+    assert parse_amount("Samsung Galaxy S24 Ultra 256 at croma") is None
+    assert parse_amount("iPhone 15 for 79900 on amazon") == 79900
+
+
+def test_only_reported_spend_is_recorded():
+    assert reports_spend("paid 2000 on swiggy")
+    assert reports_spend("Spent 1.5L on flights with my Regalia card")
+    assert not reports_spend("2k on Swiggy")
+    assert not reports_spend("which card should I use for 5000 on amazon")
+    assert not reports_spend("I paid 500 at Zomato, which card should I have used?")
+    assert not reports_spend("planning to book a 40k flight")
+
+
+if __name__ == "__main__":
+    for test in (test_currency_and_units_resolve, test_bare_l_is_not_lakh, test_bare_number_needs_an_amount_cue,
+                 test_model_number_is_not_an_amount, test_only_reported_spend_is_recorded):
+        test()
+        print(f"✅ {test.__name__}")